@@ -0,0 +1,75 @@
+"""Throughput (filas/s) de la importación y exportación masiva del catálogo.
+
+Uso: python benchmarks/bench_catalog_import.py [--url sqlite:////tmp/bench.db] [--rows 50000]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import sys
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--url", default="sqlite://", help="SQLALCHEMY_DATABASE_URI de una BD desechable")
+parser.add_argument("--rows", type=int, default=50000)
+parser.add_argument("--batch-size", type=int, default=1000)
+args = parser.parse_args()
+
+os.environ["FLASK_ENV"] = "development"
+os.environ["SQLITE_URL"] = args.url
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from openpyxl import Workbook  # noqa: E402
+
+from petmaison import catalog, create_app  # noqa: E402
+from petmaison.extensions import db  # noqa: E402
+
+app = create_app(web=False)
+
+HEADER = ["sku", "name", "brand", "category", "cost_net", "price_gross", "min_stock"]
+
+
+def _row(i: int, price: int) -> list:
+    return [f"SKU{i:07}", f"Producto {i}", f"Marca {i % 50}", f"Cat {i % 20}", price, round(price * 1.19), i % 7]
+
+
+def _csv(n: int, price: int) -> io.BytesIO:
+    lines = [",".join(HEADER)] + [",".join(map(str, _row(i, price))) for i in range(n)]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def _xlsx(n: int, price: int) -> io.BytesIO:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    for i in range(n):
+        ws.append(_row(i, price))
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def main() -> None:
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        print(f"{'caso':<22} {'filas':>8} {'s':>7} {'filas/s':>9}")
+        for label, data in [
+            ("csv (insert)", _csv(args.rows, 1000)),
+            ("csv (update)", _csv(args.rows, 1100)),
+            ("xlsx (update)", _xlsx(args.rows, 1200)),
+        ]:
+            name = "bench.xlsx" if "xlsx" in label else "bench.csv"
+            r = catalog.import_products(data, name, args.batch_size)
+            assert not r.error_count, r.errors[:5]
+            print(f"{label:<22} {r.rows:>8} {r.seconds:>7.2f} {r.rows_per_sec:>9.0f}")
+        t0 = time.perf_counter()
+        n = catalog.export_products(io.BytesIO())
+        elapsed = time.perf_counter() - t0
+        print(f"{'xlsx export':<22} {n:>8} {elapsed:>7.2f} {n / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
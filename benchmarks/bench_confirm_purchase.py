@@ -0,0 +1,90 @@
+"""Sentencias SQL y latencia de `confirm_purchase` para compras de 10/100/1000 líneas.
+
+Uso: python benchmarks/bench_confirm_purchase.py [--url sqlite:////tmp/bench.db]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--url", default="sqlite://", help="SQLALCHEMY_DATABASE_URI de una BD desechable")
+parser.add_argument("--sizes", default="10,100,1000")
+args = parser.parse_args()
+
+os.environ["FLASK_ENV"] = "development"
+os.environ["SQLITE_URL"] = args.url
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import event  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from petmaison import create_app  # noqa: E402
+from petmaison.extensions import db  # noqa: E402
+from petmaison.models import Product, Purchase, PurchaseItem, Supplier, User  # noqa: E402
+
+app = create_app()
+
+
+def main() -> None:
+    app.config.update(WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(
+            User(email="bench@petmaison.cl", name="Bench", password_hash=generate_password_hash("x"), role="admin")
+        )
+        supplier = Supplier(name="Proveedor bench")
+        db.session.add(supplier)
+        db.session.commit()
+
+        client = app.test_client()
+        client.post("/login", data={"email": "bench@petmaison.cl", "password": "x"})
+
+        statements = 0
+
+        def count(*_):
+            nonlocal statements
+            statements += 1
+
+        event.listen(db.engine, "before_cursor_execute", count)
+        print(f"{'líneas':>8} {'sentencias':>11} {'ms':>9}")
+        for n in [int(x) for x in args.sizes.split(",")]:
+            purchase_id = _purchase(supplier.id, n)
+            statements = 0
+            t0 = time.perf_counter()
+            resp = client.post(f"/purchases/{purchase_id}/confirm")
+            elapsed = (time.perf_counter() - t0) * 1000
+            assert resp.status_code == 302, resp.status_code
+            print(f"{n:>8} {statements:>11} {elapsed:>9.1f}")
+
+
+def _purchase(supplier_id: int, lines: int) -> int:
+    start = db.session.execute(db.select(db.func.count(Product.id))).scalar() or 0
+    db.session.execute(
+        db.insert(Product),
+        [
+            {"sku": f"B{start + i:07}", "name": f"Bench {start + i}", "cost_net": 100, "price_gross": 119}
+            for i in range(lines)
+        ],
+    )
+    ids = db.session.execute(db.select(Product.id).order_by(Product.id.desc()).limit(lines)).scalars().all()
+    p = Purchase(supplier_id=supplier_id)
+    db.session.add(p)
+    db.session.flush()
+    db.session.execute(
+        db.insert(PurchaseItem),
+        [
+            {"purchase_id": p.id, "product_id": pid, "qty": 5, "unit_cost_net": Decimal("100"), "line_total": 595}
+            for pid in ids
+        ],
+    )
+    db.session.commit()
+    return p.id
+
+
+if __name__ == "__main__":
+    main()
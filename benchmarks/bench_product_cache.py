@@ -0,0 +1,113 @@
+"""Memoria y latencia de la foto del catálogo (petmaison/productcache.py).
+
+Carga N productos, arma la foto y compara búsquedas en memoria (id, SKU,
+prefijo) contra la misma búsqueda en la base; mide la memoria de la foto
+con tracemalloc y el costo de un refresco con y sin cambios.
+
+Uso: python benchmarks/bench_product_cache.py [--url sqlite:////tmp/bench.db] [--products 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--url", default="sqlite://", help="SQLALCHEMY_DATABASE_URI de una BD desechable")
+parser.add_argument("--products", type=int, default=100_000)
+parser.add_argument("--lookups", type=int, default=20_000)
+args = parser.parse_args()
+
+os.environ["FLASK_ENV"] = "development"
+os.environ["SQLITE_URL"] = args.url
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from petmaison import create_app, productcache  # noqa: E402
+from petmaison.extensions import db  # noqa: E402
+from petmaison.models import Product  # noqa: E402
+
+app = create_app(web=False)
+CATEGORIES = ("Alimento perro", "Alimento gato", "Arena", "Snacks", "Accesorios", "Higiene", "Juguetes", "Farmacia")
+
+
+def _seed(n: int) -> None:
+    # Catálogo "en reposo": ediciones repartidas en el último año, ninguna en la última hora.
+    now = datetime.utcnow() - timedelta(hours=1)
+    rows = [
+        {
+            "sku": f"78{i:011}",
+            "name": f"Producto de prueba número {i} 3kg",
+            "brand": f"Marca {i % 60}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "cost_net": Decimal(1000 + i % 5000),
+            "price_gross": Decimal(1990 + i % 9000),
+            "stock": i % 80,
+            "min_stock": 5,
+            "created_at": now - timedelta(days=365),
+            "updated_at": now - timedelta(seconds=n - i),
+        }
+        for i in range(n)
+    ]
+    for k in range(0, n, 10_000):
+        db.session.execute(db.insert(Product), rows[k : k + 10_000])
+    db.session.commit()
+
+
+def _per_op(fn, keys) -> float:
+    t0 = time.perf_counter()
+    for k in keys:
+        fn(k)
+    return (time.perf_counter() - t0) / len(keys) * 1e6
+
+
+def main() -> None:
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        _seed(args.products)
+
+        t0 = time.perf_counter()
+        snap = productcache.load()
+        load_s = time.perf_counter() - t0
+        del snap
+        # Al volver de load() solo queda viva la foto (las filas de SQLAlchemy ya se liberaron).
+        tracemalloc.start()
+        snap = productcache.load()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"productos: {len(snap)}  carga: {load_s:.2f} s  memoria: {retained / 2**20:.1f} MiB "
+            f"({retained / len(snap):.0f} B/producto; pico al cargar {peak / 2**20:.1f} MiB)"
+        )
+
+        rng = random.Random(1)
+        ids = [rng.randint(1, args.products) for _ in range(args.lookups)]
+        skus = [f"78{i - 1:011}" for i in ids]
+        db_keys = ids[: max(args.lookups // 20, 100)]
+        print(f"{'búsqueda':<22} {'µs/op':>9}")
+        print(f"{'foto: id':<22} {_per_op(snap.get, ids):>9.2f}")
+        print(f"{'foto: sku':<22} {_per_op(snap.by_sku, skus):>9.2f}")
+        print(f"{'foto: prefijo sku':<22} {_per_op(lambda s: snap.sku_prefix(s[:8]), skus):>9.2f}")
+        q = db.select(Product.id, Product.price_gross, Product.vat_included)
+        by_id = _per_op(lambda k: db.session.execute(q.filter(Product.id == k)).one(), db_keys)
+        by_sku = _per_op(lambda k: db.session.execute(q.filter(Product.sku == k)).one(), skus[: len(db_keys)])
+        print(f"{'base: id':<22} {by_id:>9.2f}")
+        print(f"{'base: sku':<22} {by_sku:>9.2f}")
+
+        t0 = time.perf_counter()
+        productcache.refresh(snap)
+        print(f"refresco sin cambios: {(time.perf_counter() - t0) * 1000:.1f} ms")
+        db.session.execute(db.update(Product).where(Product.id <= 100).values(price_gross=Product.price_gross + 10))
+        db.session.commit()
+        t0 = time.perf_counter()
+        productcache.refresh(snap)
+        print(f"refresco con 100 cambios: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Tiempo de arranque: importar modelos, construir la app y correr un comando CLI.
+
+Cada caso corre en un proceso nuevo (mediana de --rounds) e informa qué
+dependencias pesadas quedaron cargadas. Importar `petmaison.models` (Alembic,
+scripts) no debe construir la app; `create_app(web=False)` es lo que usan
+`flask worker` y los comandos de mantenimiento.
+
+Uso: python benchmarks/bench_startup.py [--rounds 7]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY = ("flask_admin", "flask_smorest", "flask_migrate", "flask_wtf", "pandas", "openpyxl", "PIL", "xhtml2pdf")
+PROBE = "import sys; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+CASES = {
+    "import petmaison.models": "import petmaison.models",
+    "create_app(web=False)": "from petmaison import create_app; create_app(web=False)",
+    "create_app()": "from petmaison import create_app; create_app()",
+    "create_app() + warm_up": (
+        "from petmaison import create_app; from petmaison.app import warm_up; warm_up(create_app())"
+    ),
+}
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rounds", type=int, default=7)
+args = parser.parse_args()
+
+
+def _run(code: str) -> tuple[float, str]:
+    env = dict(os.environ, FLASK_ENV="development", SQLITE_URL="sqlite://", PYTHONPATH=ROOT)
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", f"{code}\n{PROBE.format(heavy=HEAVY)}"],
+        env=env,
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return (time.perf_counter() - t0) * 1000, out.strip().splitlines()[-1] if out.strip() else ""
+
+
+def main() -> None:
+    baseline = statistics.median(_run("pass")[0] for _ in range(args.rounds))
+    print(f"{'caso':<26} {'mediana ms':>11} {'sin intérprete':>15}  cargados")
+    for name, code in CASES.items():
+        runs = [_run(code) for _ in range(args.rounds)]
+        median = statistics.median(ms for ms, _ in runs)
+        print(f"{name:<26} {median:>11.0f} {median - baseline:>15.0f}  {runs[-1][1] or '-'}")
+    cli = [_run_cli() for _ in range(args.rounds)]
+    median = statistics.median(cli)
+    print(f"{'flask worker --help':<26} {median:>11.0f} {median - baseline:>15.0f}")
+
+
+def _run_cli() -> float:
+    env = dict(os.environ, FLASK_ENV="development", SQLITE_URL="sqlite://", PYTHONPATH=ROOT)
+    t0 = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "petmaison:create_app(web=False)", "worker", "--help"],
+        env=env,
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+    )
+    return (time.perf_counter() - t0) * 1000
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Medición y comparación contra baseline para `benchmarks/bench_endpoints.py`.
+
+Cada caso registra latencia (min / mediana / p95 en ms), consultas SQL por
+request y memoria Python pico (tracemalloc, en una ronda aparte para no
+distorsionar los tiempos). Los resultados se comparan con
+`benchmarks/baseline-<dialecto>.json`:
+
+- más consultas que el baseline: falla siempre (es determinista);
+- latencia o memoria sobre `BENCH_TOLERANCE` (default 0.5 = +50%): warning,
+  o falla con `BENCH_STRICT=1`.
+
+`BENCH_SAVE_BASELINE=1` reescribe el baseline con la corrida actual.
+"""
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+import warnings
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+from sqlalchemy import event
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.5"))
+STRICT = os.getenv("BENCH_STRICT") == "1"
+SAVE_BASELINE = os.getenv("BENCH_SAVE_BASELINE") == "1"
+
+
+class BenchRegression(AssertionError):
+    pass
+
+
+@dataclass
+class Result:
+    rounds: int
+    min_ms: float
+    median_ms: float
+    p95_ms: float
+    queries: int
+    peak_kib: float
+
+
+class QueryCounter:
+    def __init__(self, engine: Any) -> None:
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_: Any) -> None:
+        self.count += 1
+
+
+class Recorder:
+    def __init__(self, dialect: str, engine: Any) -> None:
+        self.dialect = dialect
+        self.counter = QueryCounter(engine)
+        self.results: dict[str, Result] = {}
+        self.baseline_path = os.path.join(HERE, f"baseline-{dialect}.json")
+        self.results_path = os.path.join(HERE, "results", f"latest-{dialect}.json")
+        try:
+            with open(self.baseline_path) as f:
+                self.baseline: dict[str, dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self.baseline = {}
+
+    def measure(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        setup: Callable[[], Any] | None = None,
+        rounds: int = 20,
+    ) -> Result:
+        """Ejecuta `fn(setup())` `rounds` veces; `setup` no se mide."""
+        times, queries = [], []
+        fn(setup() if setup else None)  # calentamiento: caches de compilación y plantillas
+        for _ in range(rounds):
+            arg = setup() if setup else None
+            before = self.counter.count
+            t0 = time.perf_counter()
+            fn(arg)
+            times.append((time.perf_counter() - t0) * 1000)
+            queries.append(self.counter.count - before)
+
+        arg = setup() if setup else None
+        tracemalloc.start()
+        try:
+            fn(arg)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        times.sort()
+        result = Result(
+            rounds=rounds,
+            min_ms=round(times[0], 3),
+            median_ms=round(statistics.median(times), 3),
+            p95_ms=round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+            queries=max(queries),
+            peak_kib=round(peak / 1024, 1),
+        )
+        self.results[name] = result
+        self._check(name, result)
+        return result
+
+    def _check(self, name: str, result: Result) -> None:
+        base = self.baseline.get(name)
+        if not base or SAVE_BASELINE:
+            return
+        if result.queries > base["queries"]:
+            raise BenchRegression(f"{name}: {result.queries} consultas (baseline {base['queries']})")
+        slow = [
+            f"{key} {getattr(result, key)} vs {base[key]}"
+            for key in ("median_ms", "peak_kib")
+            if base.get(key) and getattr(result, key) > base[key] * (1 + TOLERANCE)
+        ]
+        if slow:
+            message = f"{name}: regresión sobre {TOLERANCE:.0%}: " + ", ".join(slow)
+            if STRICT:
+                raise BenchRegression(message)
+            warnings.warn(message)
+
+    def report(self) -> list[str]:
+        os.makedirs(os.path.dirname(self.results_path), exist_ok=True)
+        data = {name: asdict(r) for name, r in sorted(self.results.items())}
+        with open(self.results_path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        if SAVE_BASELINE:
+            with open(self.baseline_path, "w") as f:
+                json.dump({**self.baseline, **data}, f, indent=2, sort_keys=True)
+        lines = [f"{'caso':<40} {'mediana ms':>11} {'p95 ms':>9} {'consultas':>10} {'pico KiB':>10} {'baseline ms':>12}"]
+        for name, r in sorted(self.results.items()):
+            base = self.baseline.get(name, {}).get("median_ms", "-")
+            lines.append(f"{name:<40} {r.median_ms:>11.2f} {r.p95_ms:>9.2f} {r.queries:>10} {r.peak_kib:>10.1f} {base:>12}")
+        lines.append(f"Resultados: {os.path.relpath(self.results_path)}")
+        return lines
@@ -1,7 +1,31 @@
+import os
+
 bind = "0.0.0.0:8000"
-workers = 4
+# WEB_CONCURRENCY / GUNICORN_THREADS también dimensionan el pool de conexiones
+# (ver petmaison/config.py: engine_options).
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
 worker_class = "gthread"
-threads = 2
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+# La app se importa una vez en el master y los workers la heredan al hacer
+# fork (arranque más rápido, páginas compartidas). GUNICORN_PRELOAD=0 vuelve a
+# construirla en cada worker (útil con --reload).
+wsgi_app = "petmaison.wsgi:app"
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    if preload_app:
+        from petmaison.app import warm_up
+
+        warm_up(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    # Las conexiones abiertas por el master no se comparten entre procesos.
+    from petmaison.app import after_fork
+
+    after_fork(server.app.wsgi())
@@ -0,0 +1,29 @@
+"""partial index for low stock reorder alerts
+
+Revision ID: 0b5e7d3c9f42
+Revises: 6d0f2b8e9a17
+Create Date: 2025-09-18 16:05:27.731402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5e7d3c9f42'
+down_revision = '6d0f2b8e9a17'
+branch_labels = None
+depends_on = None
+
+# Mismo predicado que models.LOW_STOCK (SQLite solo usa el índice si coincide tal cual)
+LOW_STOCK = sa.and_(sa.column('active').is_(True), sa.column('stock') <= sa.column('min_stock'))
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_low_stock', ['id'], unique=False, postgresql_where=LOW_STOCK, sqlite_where=LOW_STOCK)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_low_stock')
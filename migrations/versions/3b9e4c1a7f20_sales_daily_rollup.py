@@ -0,0 +1,44 @@
+"""sales daily rollup
+
+Revision ID: 3b9e4c1a7f20
+Revises: d757f338881d
+Create Date: 2025-09-02 10:14:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e4c1a7f20'
+down_revision = 'd757f338881d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sales_daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('net', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('vat', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('total', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('tickets', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('day', 'product_id')
+    )
+    op.create_table('sales_daily_totals',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('net', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('vat', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('total', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('tickets', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    # Tras migrar: `flask rebuild-rollups` para poblar con el histórico.
+
+
+def downgrade():
+    op.drop_table('sales_daily_totals')
+    op.drop_table('sales_daily_rollup')
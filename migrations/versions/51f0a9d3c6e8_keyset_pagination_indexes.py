@@ -0,0 +1,29 @@
+"""keyset pagination indexes
+
+Revision ID: 51f0a9d3c6e8
+Revises: 8c2d7e5f1b43
+Create Date: 2025-09-06 11:02:45.903311
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '51f0a9d3c6e8'
+down_revision = '8c2d7e5f1b43'
+branch_labels = None
+depends_on = None
+
+TABLES = ('customers', 'suppliers', 'purchases', 'sales', 'orders')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(f'ix_{table}_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_created_at_id')
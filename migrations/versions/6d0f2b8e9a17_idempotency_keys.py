@@ -0,0 +1,39 @@
+"""idempotency keys for pos and sale confirmation
+
+Revision ID: 6d0f2b8e9a17
+Revises: e3b71c0d4a96
+Create Date: 2025-09-15 09:41:03.218845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d0f2b8e9a17'
+down_revision = 'e3b71c0d4a96'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('idempotency_keys',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('fingerprint', sa.String(length=16), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('location', sa.String(length=255), nullable=True),
+    sa.Column('body', sa.LargeBinary(), nullable=True),
+    sa.Column('mimetype', sa.String(length=64), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_idempotency_keys_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_idempotency_keys_created_at'))
+
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,55 @@
+"""product search index
+
+Revision ID: 8c2d7e5f1b43
+Revises: 3b9e4c1a7f20
+Create Date: 2025-09-04 16:40:02.551870
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d7e5f1b43'
+down_revision = '3b9e4c1a7f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_products_sku_trgm ON products USING gin (sku gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+            "name, sku, content='products', content_rowid='id', "
+            "tokenize=\"unicode61 remove_diacritics 2 tokenchars '-_.'\")"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+            "INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+            "INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, sku ON products BEGIN "
+            "INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku); "
+            "INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku); END"
+        )
+        op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_products_sku_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_products_name_trgm')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS products_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS products_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS products_fts_ai')
+        op.execute('DROP TABLE IF EXISTS products_fts')
@@ -0,0 +1,91 @@
+"""customer stats, lookup keys and sales by customer index
+
+Revision ID: 9a4c2e7f1b63
+Revises: c41a9e6d2b58
+Create Date: 2025-09-26 10:12:44.518203
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c2e7f1b63'
+down_revision = 'c41a9e6d2b58'
+branch_labels = None
+depends_on = None
+
+
+# Copia congelada de models.rut_key / phone_key / email_key
+def _rut_key(rut):
+    return re.sub(r'[^0-9K]', '', (rut or '').upper()) or None
+
+
+def _phone_key(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('56') and (len(digits) == 11 or (phone or '').lstrip().startswith('+')):
+        digits = digits[2:]
+    return digits or None
+
+
+def _email_key(email):
+    return (email or '').strip().lower() or None
+
+
+def upgrade():
+    op.create_table('customer_stats',
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('tickets', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('first_sale_at', sa.DateTime(), nullable=False),
+    sa.Column('last_sale_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('customer_id')
+    )
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rut_key', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('phone_key', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('email_key', sa.String(length=255), nullable=True))
+        batch_op.create_index('ix_customers_rut_key', ['rut_key'], unique=False, postgresql_ops={'rut_key': 'text_pattern_ops'})
+        batch_op.create_index('ix_customers_phone_key', ['phone_key'], unique=False, postgresql_ops={'phone_key': 'text_pattern_ops'})
+        batch_op.create_index('ix_customers_email_key', ['email_key'], unique=False, postgresql_ops={'email_key': 'text_pattern_ops'})
+
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.create_index('ix_sales_customer_id_date', ['customer_id', 'date'], unique=False)
+
+    # Datos existentes: claves normalizadas y estadísticas desde las ventas confirmadas
+    conn = op.get_bind()
+    customers = sa.table('customers', sa.column('id'), sa.column('rut'), sa.column('phone'), sa.column('email'),
+                         sa.column('rut_key'), sa.column('phone_key'), sa.column('email_key'))
+    rows = [
+        {'cid': cid, 'rut_key': _rut_key(rut), 'phone_key': _phone_key(phone), 'email_key': _email_key(email)}
+        for cid, rut, phone, email in conn.execute(sa.select(customers.c.id, customers.c.rut, customers.c.phone, customers.c.email))
+    ]
+    if rows:
+        conn.execute(
+            customers.update().where(customers.c.id == sa.bindparam('cid'))
+            .values(rut_key=sa.bindparam('rut_key'), phone_key=sa.bindparam('phone_key'), email_key=sa.bindparam('email_key')),
+            rows,
+        )
+    op.execute(
+        "INSERT INTO customer_stats (customer_id, tickets, total, first_sale_at, last_sale_at) "
+        "SELECT customer_id, count(id), sum(total), min(date), max(date) FROM sales "
+        "WHERE status = 'CONFIRMED' AND customer_id IS NOT NULL GROUP BY customer_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.drop_index('ix_sales_customer_id_date')
+
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_index('ix_customers_email_key')
+        batch_op.drop_index('ix_customers_phone_key')
+        batch_op.drop_index('ix_customers_rut_key')
+        batch_op.drop_column('email_key')
+        batch_op.drop_column('phone_key')
+        batch_op.drop_column('rut_key')
+
+    op.drop_table('customer_stats')
@@ -0,0 +1,37 @@
+"""stock snapshots
+
+Revision ID: a47c0e92d15b
+Revises: 51f0a9d3c6e8
+Create Date: 2025-09-09 09:31:18.240716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a47c0e92d15b'
+down_revision = '51f0a9d3c6e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_snapshots',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('qty', sa.Integer(), nullable=False),
+    sa.Column('avg_cost', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'period')
+    )
+    with op.batch_alter_table('stock_movements', schema=None) as batch_op:
+        batch_op.create_index('ix_stock_movements_product_id_created_at', ['product_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stock_movements', schema=None) as batch_op:
+        batch_op.drop_index('ix_stock_movements_product_id_created_at')
+
+    op.drop_table('stock_snapshots')
@@ -0,0 +1,25 @@
+"""reset sales period totals written by report reads
+
+Revision ID: b6d1e4f8a230
+Revises: f2c8a61d7e05
+Create Date: 2025-10-02 09:21:37.845120
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d1e4f8a230'
+down_revision = 'f2c8a61d7e05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las filas las escribía el GET del reporte y pueden haber quedado viejas.
+    # Ahora las arma `flask rebuild-rollups`; mientras tanto se lee de `sales`.
+    op.execute("DELETE FROM sales_period_totals")
+
+
+def downgrade():
+    pass
@@ -0,0 +1,35 @@
+"""sales period report cache and covering index
+
+Revision ID: e3b71c0d4a96
+Revises: a47c0e92d15b
+Create Date: 2025-09-10 10:12:44.502113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b71c0d4a96'
+down_revision = 'a47c0e92d15b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sales_period_totals',
+    sa.Column('unit', sa.String(length=8), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('unit', 'period')
+    )
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.create_index('ix_sales_status_date', ['status', 'date'], unique=False, postgresql_include=['total'])
+
+
+def downgrade():
+    with op.batch_alter_table('sales', schema=None) as batch_op:
+        batch_op.drop_index('ix_sales_status_date')
+
+    op.drop_table('sales_period_totals')
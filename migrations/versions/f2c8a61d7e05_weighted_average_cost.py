@@ -0,0 +1,39 @@
+"""weighted average cost per product and stock movement ref index
+
+Revision ID: f2c8a61d7e05
+Revises: 9a4c2e7f1b63
+Create Date: 2025-09-30 15:48:21.607319
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8a61d7e05'
+down_revision = '9a4c2e7f1b63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('avg_cost', sa.Numeric(precision=18, scale=2), nullable=True))
+
+    # Punto de partida: el costo de lista. `flask recompute-costs` lo corrige
+    # reproduciendo los movimientos (y el costo de las salidas ya registradas).
+    op.execute("UPDATE products SET avg_cost = cost_net")
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.alter_column('avg_cost', existing_type=sa.Numeric(precision=18, scale=2), nullable=False)
+
+    with op.batch_alter_table('stock_movements', schema=None) as batch_op:
+        batch_op.create_index('ix_stock_movements_ref', ['ref_type', 'ref_id', 'product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stock_movements', schema=None) as batch_op:
+        batch_op.drop_index('ix_stock_movements_ref')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('avg_cost')
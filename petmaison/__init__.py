@@ -1,18 +1,12 @@
-from .app import app, create_app
-from .seed import run_seed as seed_command
+"""PetMaison. La app se construye con `create_app()`; `petmaison.wsgi:app` es
+el punto de entrada de gunicorn y `flask`.
 
-# Flask CLI command registration
-from flask import Flask
-from flask.cli import AppGroup
+Importar el paquete (o `petmaison.models`, p.ej. desde Alembic o un script)
+no construye la app ni carga Flask-Admin, flask-smorest o pandas.
+"""
 
 
-def register_cli(app: Flask) -> None:
-    import click
+def create_app(web: bool = True):
+    from .app import create_app as factory
 
-    @app.cli.command("seed")
-    def seed():
-        """Crea datos de ejemplo"""
-        seed_command()
-
-
-register_cli(app)
+    return factory(web)
@@ -1,43 +1,47 @@
 from __future__ import annotations
 
+import hmac
 import locale
+import mimetypes
 import os
 from datetime import datetime
 from decimal import Decimal
 
-from flask import Flask, jsonify, send_from_directory
-from flask_admin import Admin
-from flask_admin.contrib.sqla import ModelView
+from functools import wraps
+
+from flask import Flask, abort, current_app, jsonify, request, send_from_directory
 from flask_login import current_user
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import safe_join
 
 from .config import get_config
-from .extensions import api, csrf, db, login_manager, migrate
-from .models import (
-    Customer,
-    Order,
-    Product,
-    Purchase,
-    PurchaseItem,
-    Sale,
-    SaleItem,
-    StockMovement,
-    Supplier,
-    User,
-)
-
-
-def create_app() -> Flask:
+from . import dbpool, idempotency, images, instrument, jobs, querybudget, replicas
+from .extensions import db, login_manager
+from .models import User
+
+
+def create_app(web: bool = True) -> Flask:
+    """Construye la app. Con `web=False` (worker y comandos CLI que no sirven
+    HTTP) se omiten blueprints, API, admin y CSRF: arranca bastante más rápido.
+    """
+    from flask_migrate import Migrate
+
+    from .cli import register_cli
+
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(get_config())
+    if app.config["PROXY_FIX_X_FOR"]:
+        hops = app.config["PROXY_FIX_X_FOR"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)  # type: ignore[method-assign]
 
     os.makedirs(app.config["MEDIA_ROOT"], exist_ok=True)
     os.makedirs(os.path.join(app.instance_path), exist_ok=True)
 
     db.init_app(app)
-    migrate.init_app(app, db)
-    csrf.init_app(app)
+    Migrate(app, db)
     login_manager.init_app(app)
-    api.init_app(app)
+    dbpool.init_app(app)
+    replicas.init_app(app)
 
     # Locale for es-CL formatting
     try:
@@ -46,9 +50,24 @@ def create_app() -> Flask:
         pass
 
     register_jinja_filters(app)
+    register_cli(app)
+    if not web:
+        return app
+
+    from flask_wtf.csrf import CSRFProtect
+
+    from .blueprints.api.views import init_api
+
+    CSRFProtect(app)
+    init_api(app)
+    querybudget.init_app(app)
+    instrument.init_app(app)
+    idempotency.init_app(app)
+
     register_error_handlers(app)
     register_blueprints(app)
     register_admin(app)
+    register_internal(app)
 
     @app.get("/health")
     def health() -> tuple[dict, int]:
@@ -56,17 +75,72 @@ def create_app() -> Flask:
 
     @app.route('/media/<path:filename>')
     def media(filename: str):
-        return send_from_directory(app.config['MEDIA_ROOT'], filename)
+        return serve_media(app, filename)
 
     return app
 
 
+def warm_up(app: Flask) -> None:
+    """Trabajo de arranque que conviene hacer una vez en el master de gunicorn
+    (`preload_app`): los workers heredan mappers configurados y plantillas
+    compiladas por copy-on-write en vez de pagarlo cada uno en su primer request.
+    """
+    from sqlalchemy.orm import configure_mappers
+
+    configure_mappers()
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        app.jinja_env.get_template(name)
+
+
+def after_fork(app: Flask) -> None:
+    """En cada worker recién forkeado: no reutilizar conexiones heredadas del master."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    replicas.dispose(app)
+
+
+def serve_media(app: Flask, filename: str):
+    """Archivos de `MEDIA_ROOT` con caché larga y descarga delegada al proxy.
+
+    Con `MEDIA_ACCEL_REDIRECT` (p.ej. `/_media/`, una location `internal` de
+    nginx) el worker solo responde encabezados y nginx envía el archivo; con
+    `USE_X_SENDFILE` Flask emite `X-Sendfile` (Apache / lighttpd). Sin proxy
+    se sirve con `send_from_directory` (ETag / Last-Modified → 304).
+    """
+    path = safe_join(app.config["MEDIA_ROOT"], filename)
+    if path is None:
+        abort(404)
+    # Ruta ya normalizada: `./jobs/...` o `x/../jobs/...` también apuntan a jobs/
+    filename = os.path.relpath(path, app.config["MEDIA_ROOT"]).replace(os.sep, "/")
+    # Resultados de trabajos: privados, solo por /jobs/<id>/download
+    if filename.split("/")[0] == jobs.RESULTS_DIR or not os.path.isfile(path):
+        abort(404)
+    max_age = 365 * 24 * 3600 if images.is_immutable(filename) else app.config["MEDIA_MAX_AGE"]
+    accel = app.config.get("MEDIA_ACCEL_REDIRECT")
+    if accel:
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = accel.rstrip("/") + "/" + filename
+    else:
+        response = send_from_directory(app.config["MEDIA_ROOT"], filename, max_age=max_age)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if images.is_immutable(filename):
+        response.cache_control.immutable = True
+    return response
+
+
 @login_manager.user_loader
 def load_user(user_id: str):
     return db.session.get(User, int(user_id))
 
 
 def register_admin(app: Flask) -> None:
+    from flask_admin import Admin
+    from flask_admin.contrib.sqla import ModelView
+
+    from .models import Customer, Product, Supplier
+
     class SecureModelView(ModelView):
         def is_accessible(self):  # type: ignore[override]
             return current_user.is_authenticated and getattr(current_user, "role", "") == "admin"
@@ -78,6 +152,42 @@ def register_admin(app: Flask) -> None:
     admin.add_view(SecureModelView(Supplier, db.session))
 
 
+def internal_only(f):
+    """Endpoints operativos: admins, `INTERNAL_TOKEN` (scrapers) o IPs de `INTERNAL_ALLOWLIST`.
+
+    No se confía en loopback: detrás de un nginx en el mismo host todos los
+    requests llegan desde 127.0.0.1.
+    """
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        token = current_app.config["INTERNAL_TOKEN"]
+        auth = request.headers.get("Authorization", "")
+        by_token = bool(token) and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode())
+        allowed = request.remote_addr in current_app.config["INTERNAL_ALLOWLIST"]
+        admin = current_user.is_authenticated and getattr(current_user, "role", "") == "admin"
+        if not (by_token or allowed or admin):
+            abort(403)
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+def register_internal(app: Flask) -> None:
+    @app.get("/internal/pool")
+    @internal_only
+    def pool_status():
+        stats = dbpool.pool_stats()
+        if app.extensions.get("replicas"):
+            stats["replicas"] = replicas.status()
+        return stats
+
+    @app.get("/metrics")
+    @internal_only
+    def metrics():
+        return app.response_class(instrument.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 def register_blueprints(app: Flask) -> None:
     from .blueprints.auth.views import bp as auth_bp
     from .blueprints.dashboard.views import bp as dashboard_bp
@@ -89,6 +199,7 @@ def register_blueprints(app: Flask) -> None:
     from .blueprints.orders.views import bp as orders_bp
     from .blueprints.inventory.views import bp as inventory_bp
     from .blueprints.reports.views import bp as reports_bp
+    from .blueprints.jobs.views import bp as jobs_bp
     from .blueprints.api.views import api_bp
 
     app.register_blueprint(auth_bp)
@@ -101,6 +212,7 @@ def register_blueprints(app: Flask) -> None:
     app.register_blueprint(orders_bp)
     app.register_blueprint(inventory_bp)
     app.register_blueprint(reports_bp)
+    app.register_blueprint(jobs_bp)
     app.register_blueprint(api_bp, url_prefix="/api")
 
 
@@ -134,6 +246,4 @@ def register_jinja_filters(app: Flask) -> None:
 
     app.jinja_env.filters["clp"] = clp
     app.jinja_env.filters["es_date"] = es_date
-
-
-app = create_app()
+    app.jinja_env.filters["image_variant"] = images.variant_url
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime
+from decimal import Decimal
 
-from flask import Blueprint
-from flask_smorest import Blueprint as SmorestBlueprint
-from marshmallow import Schema, fields
+from flask import Blueprint, Flask, url_for
+from flask_login import current_user, login_required
+from flask_smorest import Api, Blueprint as SmorestBlueprint, abort
+from marshmallow import Schema, fields, validate
 
-from ...extensions import api, db
-from ...models import Product, Sale
+from ... import cart, costing, customers, jobs, productcache, reorder, reporting, respcache
+from ...extensions import db
+from ...idempotency import idempotent
+from ...models import PAYMENT_METHOD, Product, Sale, SaleItem
+from ...pagination import Page, paginate
+from ...search import search_products
 
 api_bp = Blueprint("api_bp", __name__)
 
@@ -17,6 +24,8 @@ class ProductQuerySchema(Schema):
     category = fields.String(load_default=None)
     brand = fields.String(load_default=None)
     active = fields.Boolean(load_default=None)
+    cursor = fields.String(load_default=None)
+    limit = fields.Integer(load_default=200, validate=validate.Range(min=1, max=200))
 
 
 class ProductSchema(Schema):
@@ -32,20 +41,28 @@ sm_products = SmorestBlueprint("api_products", __name__, url_prefix="/products",
 
 
 @sm_products.route("")
+@respcache.cached("products")
 @sm_products.arguments(ProductQuerySchema, location="query")
 @sm_products.response(200, ProductSchema(many=True))
 def list_products(args):
+    snapshot = productcache.get_snapshot() if not args.get("search") else None
+    if snapshot is not None:
+        page = snapshot.page(args["cursor"], args["limit"], args.get("category"), args.get("brand"), args.get("active"))
+        return page.items, {"X-Pagination": json.dumps({"next": page.next_cursor, "prev": page.prev_cursor})}
     q = db.select(Product)
-    if args.get("search"):
-        like = f"%{args['search']}%"
-        q = q.filter(db.or_(Product.name.ilike(like), Product.sku.ilike(like)))
     if args.get("category"):
         q = q.filter(Product.category == args["category"])
     if args.get("brand"):
         q = q.filter(Product.brand == args["brand"])
     if args.get("active") is not None:
         q = q.filter(Product.active == args["active"])
-    return db.session.execute(q.limit(200)).scalars().all()
+    if args.get("search"):
+        # Resultados por relevancia: una sola página, sin cursores.
+        page = Page(items=list(db.session.execute(search_products(q, args["search"]).limit(args["limit"])).scalars()))
+    else:
+        page = paginate(q, Product, args["cursor"], args["limit"])
+    pagination = {"next": page.next_cursor, "prev": page.prev_cursor}
+    return page.items, {"X-Pagination": json.dumps(pagination)}
 
 
 sm_reports = SmorestBlueprint("api_reports", __name__, url_prefix="/reports", description="Reportes")
@@ -54,7 +71,7 @@ sm_reports = SmorestBlueprint("api_reports", __name__, url_prefix="/reports", de
 class SalesQuerySchema(Schema):
     fro = fields.Date(required=True, data_key="from")
     to = fields.Date(required=True)
-    groupBy = fields.String(load_default="month")
+    groupBy = fields.String(load_default="month", validate=validate.OneOf(reporting.UNITS))
 
 
 class SalesReportItem(Schema):
@@ -63,20 +80,317 @@ class SalesReportItem(Schema):
 
 
 @sm_reports.route("/sales")
+@respcache.cached("sales")
 @sm_reports.arguments(SalesQuerySchema, location="query")
 @sm_reports.response(200, SalesReportItem(many=True))
 def report_sales(args):
-    fro = args["fro"]
-    to = args["to"]
-    rows = db.session.execute(
-        db.select(db.func.to_char(Sale.date, "YYYY-MM").label("period"), db.func.sum(Sale.total))
-        .filter(Sale.date >= fro, Sale.date <= to, Sale.status == "CONFIRMED")
-        .group_by(db.text("period"))
-        .order_by(db.text("period"))
-    ).all()
-    return [{"period": p, "total": t or 0} for p, t in rows]
-
-
-# Register smorest blueprints with the Api
-api.register_blueprint(sm_products)
-api.register_blueprint(sm_reports)
+    rows = reporting.sales_by_period(args["fro"], args["to"], args["groupBy"])
+    return [{"period": p, "total": t} for p, t in rows]
+
+
+class MarginQuerySchema(Schema):
+    fro = fields.Date(required=True, data_key="from")
+    to = fields.Date(required=True)
+    by = fields.String(load_default="category", validate=validate.OneOf(costing.GROUPS))
+    groupBy = fields.String(load_default=None, validate=validate.OneOf(reporting.UNITS))
+
+
+class MarginReportItem(Schema):
+    period = fields.String(allow_none=True)
+    product_id = fields.Integer(allow_none=True)
+    sku = fields.String(allow_none=True)
+    name = fields.String(allow_none=True)
+    category = fields.String(allow_none=True)
+    qty = fields.Integer()
+    revenue = fields.Decimal(as_string=True)
+    cost = fields.Decimal(as_string=True)
+    margin = fields.Decimal(as_string=True)
+    margin_pct = fields.Decimal(as_string=True, allow_none=True)
+
+
+@sm_reports.route("/margins")
+@login_required
+@respcache.cached("sales")
+@sm_reports.arguments(MarginQuerySchema, location="query")
+@sm_reports.response(200, MarginReportItem(many=True))
+def report_margins(args):
+    return costing.margins(args["fro"], args["to"], args["by"], args["groupBy"])
+
+
+sm_inventory = SmorestBlueprint("api_inventory", __name__, url_prefix="/inventory", description="Inventario")
+
+
+class ReorderQuerySchema(Schema):
+    velocityDays = fields.Integer(load_default=28, validate=validate.Range(min=1, max=365))
+    coverDays = fields.Integer(load_default=21, validate=validate.Range(min=0, max=365))
+
+
+class ReorderItemSchema(Schema):
+    product_id = fields.Integer()
+    sku = fields.String()
+    name = fields.String()
+    stock = fields.Integer()
+    min_stock = fields.Integer()
+    daily_velocity = fields.Float()
+    suggested_qty = fields.Integer()
+    last_cost_net = fields.Decimal(as_string=True, allow_none=True)
+
+
+class ReorderGroupSchema(Schema):
+    supplier_id = fields.Integer(allow_none=True)
+    supplier_name = fields.String()
+    estimated_cost_net = fields.Decimal(as_string=True)
+    items = fields.List(fields.Nested(ReorderItemSchema))
+
+
+@sm_inventory.route("/reorder")
+@login_required
+@respcache.cached("products", "sales")
+@sm_inventory.arguments(ReorderQuerySchema, location="query")
+@sm_inventory.response(200, ReorderGroupSchema(many=True))
+def reorder_alerts(args):
+    """Productos bajo stock mínimo por proveedor, con cantidad sugerida"""
+    return reorder.low_stock(args["velocityDays"], args["coverDays"])
+
+
+sm_customers = SmorestBlueprint("api_customers", __name__, url_prefix="/customers", description="Clientes")
+
+
+class CustomerQuerySchema(Schema):
+    q = fields.String(required=True, validate=validate.Length(min=2, max=100))
+    limit = fields.Integer(load_default=10, validate=validate.Range(min=1, max=50))
+
+
+class CustomerStatsSchema(Schema):
+    tickets = fields.Integer()
+    total = fields.Decimal(as_string=True)
+    avg_ticket = fields.Decimal(as_string=True)
+    first_sale_at = fields.DateTime()
+    last_sale_at = fields.DateTime()
+    days_between_tickets = fields.Float(allow_none=True)
+
+
+class CustomerSchema(Schema):
+    id = fields.Integer()
+    name = fields.String()
+    rut = fields.String(allow_none=True)
+    email = fields.String(allow_none=True)
+    phone = fields.String(allow_none=True)
+    balance = fields.Decimal(as_string=True)
+    stats = fields.Nested(CustomerStatsSchema, allow_none=True)
+
+
+@sm_customers.route("")
+@login_required
+@sm_customers.arguments(CustomerQuerySchema, location="query")
+@sm_customers.response(200, CustomerSchema(many=True))
+def search_customers(args):
+    """Clientes por prefijo de RUT, teléfono o email (selector de cliente de la caja)"""
+    return customers.search(args["q"], args["limit"])
+
+
+sm_jobs = SmorestBlueprint("api_jobs", __name__, url_prefix="/jobs", description="Trabajos en segundo plano")
+
+# Tareas que se pueden pedir por API (products_import entra por /products/import)
+API_JOB_KINDS = ("report_csv", "products_export", "sale_ticket_pdf")
+
+
+class JobCreateSchema(Schema):
+    kind = fields.String(required=True, validate=validate.OneOf(API_JOB_KINDS))
+    params = fields.Dict(keys=fields.String(), load_default=dict)
+
+
+class JobSchema(Schema):
+    id = fields.Integer()
+    kind = fields.String()
+    status = fields.String()
+    done = fields.Integer()
+    total = fields.Integer(allow_none=True)
+    percent = fields.Integer(allow_none=True)
+    message = fields.String(allow_none=True)
+    error = fields.String(allow_none=True)
+    created_at = fields.DateTime()
+    finished_at = fields.DateTime(allow_none=True)
+    download_url = fields.Function(
+        lambda job: url_for("jobs.download", jid=job.id) if job.status == "DONE" and job.result_path else None
+    )
+
+
+@sm_jobs.route("", methods=["POST"])
+@login_required
+@sm_jobs.arguments(JobCreateSchema)
+@sm_jobs.response(202, JobSchema)
+def create_job(args):
+    try:
+        return jobs.enqueue(args["kind"], args["params"], user_id=current_user.id)
+    except jobs.UnknownJob as e:
+        abort(422, message=str(e))
+
+
+@sm_jobs.route("/<int:jid>")
+@login_required
+@sm_jobs.response(200, JobSchema)
+def get_job(jid: int):
+    job = jobs.get_for_user(jid, current_user)
+    if job is None:
+        abort(404, message="Trabajo no encontrado")
+    return job
+
+
+sm_pos = SmorestBlueprint("api_pos", __name__, url_prefix="/pos", description="Punto de venta")
+
+
+class CartLineInSchema(Schema):
+    product_id = fields.Integer(required=True)
+    qty = fields.Integer(load_default=1, validate=validate.Range(min=1))
+    unit_price_net = fields.Decimal(load_default=None, allow_none=True)
+    discount = fields.Decimal(load_default=Decimal("0"))
+
+
+class CartLinesInSchema(Schema):
+    lines = fields.List(fields.Nested(CartLineInSchema), required=True, validate=validate.Length(min=1))
+
+
+class CartCreateSchema(Schema):
+    payment_method = fields.String(load_default="EFECTIVO", validate=validate.OneOf(PAYMENT_METHOD))
+    customer_id = fields.Integer(load_default=None, allow_none=True)
+    lines = fields.List(fields.Nested(CartLineInSchema), load_default=list)
+
+
+class CartLineUpdateSchema(Schema):
+    qty = fields.Integer(load_default=None, validate=validate.Range(min=1))
+    discount = fields.Decimal(load_default=None)
+
+
+class CartDiscountSchema(Schema):
+    discount = fields.Decimal(required=True, validate=validate.Range(min=0))
+
+
+class CartLineSchema(Schema):
+    id = fields.Integer()
+    product_id = fields.Integer()
+    product_name = fields.Function(lambda it: it.product.name if it.product else None)
+    qty = fields.Integer()
+    unit_price_net = fields.Decimal(as_string=True)
+    discount = fields.Decimal(as_string=True)
+    line_total = fields.Decimal(as_string=True)
+
+
+class CartSchema(Schema):
+    id = fields.Integer()
+    status = fields.String()
+    customer_id = fields.Integer(allow_none=True)
+    subtotal_net = fields.Decimal(as_string=True)
+    discount = fields.Decimal(as_string=True)
+    vat = fields.Decimal(as_string=True)
+    total = fields.Decimal(as_string=True)
+    items = fields.Method("get_items")
+
+    def get_items(self, sale):
+        items = db.session.execute(
+            db.select(SaleItem)
+            .filter_by(sale_id=sale.id)
+            .options(db.joinedload(SaleItem.product))
+            .order_by(SaleItem.id)
+        ).scalars()
+        return CartLineSchema(many=True).dump(items)
+
+
+def _open_cart(sid: int) -> Sale:
+    sale = db.session.get(Sale, sid, with_for_update=True)
+    if not sale:
+        abort(404, message="Venta no encontrada")
+    return sale
+
+
+def _commit_or_abort(fn, *args, **kwargs) -> None:
+    try:
+        fn(*args, **kwargs)
+    except cart.CartError as e:
+        db.session.rollback()
+        abort(409 if isinstance(e, cart.CartClosed) else 422, message=str(e))
+    db.session.commit()
+
+
+@sm_pos.route("/carts", methods=["POST"])
+@idempotent
+@sm_pos.arguments(CartCreateSchema)
+@sm_pos.response(201, CartSchema)
+@login_required
+def create_cart(args):
+    sale = Sale(user_id=current_user.id, payment_method=args["payment_method"], customer_id=args["customer_id"])
+    db.session.add(sale)
+    db.session.flush()
+    if args["lines"]:
+        _commit_or_abort(cart.add_lines, sale, args["lines"])
+    else:
+        db.session.commit()
+    return sale
+
+
+@sm_pos.route("/carts/<int:sid>")
+@sm_pos.response(200, CartSchema)
+@login_required
+def get_cart(sid: int):
+    sale = db.session.get(Sale, sid)
+    if not sale:
+        abort(404, message="Venta no encontrada")
+    return sale
+
+
+@sm_pos.route("/carts/<int:sid>/lines", methods=["POST"])
+@idempotent
+@sm_pos.arguments(CartLinesInSchema)
+@sm_pos.response(200, CartSchema)
+@login_required
+def add_cart_lines(args, sid: int):
+    sale = _open_cart(sid)
+    _commit_or_abort(cart.add_lines, sale, args["lines"])
+    return sale
+
+
+@sm_pos.route("/carts/<int:sid>/lines/<int:item_id>", methods=["PATCH"])
+@sm_pos.arguments(CartLineUpdateSchema)
+@sm_pos.response(200, CartSchema)
+@login_required
+def update_cart_line(args, sid: int, item_id: int):
+    sale = _open_cart(sid)
+    item = db.session.get(SaleItem, item_id)
+    if not item or item.sale_id != sale.id:
+        abort(404, message="Línea no encontrada")
+    _commit_or_abort(cart.update_line, sale, item, qty=args["qty"], discount=args["discount"])
+    return sale
+
+
+@sm_pos.route("/carts/<int:sid>/lines/<int:item_id>", methods=["DELETE"])
+@sm_pos.response(200, CartSchema)
+@login_required
+def remove_cart_line(sid: int, item_id: int):
+    sale = _open_cart(sid)
+    item = db.session.get(SaleItem, item_id)
+    if not item or item.sale_id != sale.id:
+        abort(404, message="Línea no encontrada")
+    _commit_or_abort(cart.remove_line, sale, item)
+    return sale
+
+
+@sm_pos.route("/carts/<int:sid>/discount", methods=["PUT"])
+@sm_pos.arguments(CartDiscountSchema)
+@sm_pos.response(200, CartSchema)
+@login_required
+def set_cart_discount(args, sid: int):
+    sale = _open_cart(sid)
+    _commit_or_abort(cart.set_discount, sale, args["discount"])
+    return sale
+
+
+def init_api(app: Flask) -> Api:
+    """Un `Api` por app, con los blueprints smorest bajo /api (para no chocar con las vistas HTML)."""
+    api = Api(app)
+    api.register_blueprint(sm_products, url_prefix="/api/products")
+    api.register_blueprint(sm_reports, url_prefix="/api/reports")
+    api.register_blueprint(sm_pos, url_prefix="/api/pos")
+    api.register_blueprint(sm_inventory, url_prefix="/api/inventory")
+    api.register_blueprint(sm_customers, url_prefix="/api/customers")
+    api.register_blueprint(sm_jobs, url_prefix="/api/jobs")
+    return api
@@ -5,11 +5,14 @@ from flask_login import login_required
 
 from ...extensions import db
 from ...models import Customer
+from ...pagination import paginate
+from ...querybudget import query_budget
 
 bp = Blueprint("customers", __name__, url_prefix="/customers", template_folder="../../templates")
 
 
 @bp.route("")
+@query_budget(2)
 @login_required
 def list_customers():
     q = request.args.get("q", "")
@@ -17,8 +20,8 @@ def list_customers():
     if q:
         like = f"%{q}%"
         query = query.filter(Customer.name.ilike(like))
-    rows = db.session.execute(query.order_by(Customer.created_at.desc())).scalars().all()
-    return render_template("customers/list.html", rows=rows, q=q)
+    page = paginate(query, Customer, request.args.get("cursor"))
+    return render_template("customers/list.html", rows=page.items, page=page, q=q)
 
 
 @bp.route("/create", methods=["GET", "POST"])
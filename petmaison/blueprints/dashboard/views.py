@@ -4,39 +4,41 @@ from datetime import datetime, timedelta
 
 from flask import Blueprint, render_template
 
+from ... import respcache
 from ...extensions import db
-from ...models import Product, Sale, SaleItem
+from ...models import Product, SalesDailyRollup, SalesDailyTotal
+from ...querybudget import query_budget
 
 bp = Blueprint("dashboard", __name__, url_prefix="/", template_folder="../../templates")
 
 
 @bp.route("")
+@query_budget(4)
+@respcache.cached("sales", "products", vary_user=True)
 def index():
     today = datetime.utcnow().date()
     start_month = today.replace(day=1)
 
     sales_today = db.session.execute(
-        db.select(db.func.coalesce(db.func.sum(Sale.total), 0)).filter(
-            db.func.date(Sale.date) == today, Sale.status == "CONFIRMED"
-        )
+        db.select(SalesDailyTotal.total).filter(SalesDailyTotal.day == today)
     ).scalar() or 0
 
-    sales_month = db.session.execute(
-        db.select(db.func.coalesce(db.func.sum(Sale.total), 0)).filter(
-            Sale.date >= start_month, Sale.status == "CONFIRMED"
-        )
-    ).scalar() or 0
-
-    sales_count = db.session.execute(
-        db.select(db.func.count(Sale.id)).filter(Sale.date >= start_month, Sale.status == "CONFIRMED")
-    ).scalar() or 1
+    sales_month, sales_count = db.session.execute(
+        db.select(
+            db.func.coalesce(db.func.sum(SalesDailyTotal.total), 0),
+            db.func.coalesce(db.func.sum(SalesDailyTotal.tickets), 0),
+        ).filter(SalesDailyTotal.day >= start_month)
+    ).one()
 
-    ticket_prom = (sales_month or 0) / max(sales_count, 1)
+    ticket_prom = (sales_month or 0) / max(sales_count or 1, 1)
 
     top_units = db.session.execute(
-        db.select(Product.name, db.func.sum(SaleItem.qty).label("u")).join(SaleItem.product).join(SaleItem.sale).filter(
-            Sale.status == "CONFIRMED", Sale.date >= start_month
-        ).group_by(Product.id).order_by(db.text("u desc")).limit(5)
+        db.select(Product.name, db.func.sum(SalesDailyRollup.units).label("u"))
+        .join(SalesDailyRollup.product)
+        .filter(SalesDailyRollup.day >= start_month)
+        .group_by(Product.id, Product.name)
+        .order_by(db.text("u desc"))
+        .limit(5)
     ).all()
 
     return render_template(
@@ -1,24 +1,31 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from flask import Blueprint, render_template, request
+from flask import Blueprint, abort, render_template, request
 
+from ... import kardex as ledger
 from ...extensions import db
-from ...models import Product, StockMovement
+from ...models import Product
+from ...querybudget import query_budget
 
 bp = Blueprint("inventory", __name__, url_prefix="/inventory", template_folder="../../templates")
 
 
+def _parse_day(value: str | None) -> datetime | None:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
 @bp.route("/kardex/<int:product_id>")
+@query_budget(5)
 def kardex(product_id: int):
-    fro = request.args.get("from")
-    to = request.args.get("to")
-    q = db.select(StockMovement).filter(StockMovement.product_id == product_id)
-    if fro:
-        q = q.filter(StockMovement.created_at >= fro)
-    if to:
-        q = q.filter(StockMovement.created_at <= to)
-    rows = db.session.execute(q.order_by(StockMovement.created_at.asc())).scalars().all()
     product = db.session.get(Product, product_id)
-    return render_template("inventory/kardex.html", rows=rows, product=product)
+    if not product:
+        abort(404)
+    fro = _parse_day(request.args.get("from"))
+    to = _parse_day(request.args.get("to"))
+    page = ledger.page(product, fro, to + timedelta(days=1) if to else None, request.args.get("cursor"))
+    return render_template("inventory/kardex.html", page=page, product=product)
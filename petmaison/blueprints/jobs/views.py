@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, send_file, url_for
+from flask_login import current_user, login_required
+
+from ... import jobs
+from ...csvreports import REPORTS
+from ...extensions import db
+from ...models import Job
+from ...querybudget import query_budget
+
+bp = Blueprint("jobs", __name__, url_prefix="/jobs", template_folder="../../templates")
+
+
+def _job_or_404(jid: int) -> Job:
+    job = jobs.get_for_user(jid, current_user)
+    if job is None:
+        abort(404)
+    return job
+
+
+@bp.route("")
+@query_budget(2)
+@login_required
+def list_jobs():
+    q = db.select(Job).order_by(Job.id.desc()).limit(50)
+    if getattr(current_user, "role", "") != "admin":
+        q = q.filter(Job.user_id == current_user.id)
+    return render_template("jobs/list.html", rows=db.session.execute(q).scalars().all())
+
+
+@bp.route("/<int:jid>")
+@query_budget(2)
+@login_required
+def detail(jid: int):
+    return render_template("jobs/detail.html", job=_job_or_404(jid))
+
+
+def _attachment(name: str) -> str:
+    """`Content-Disposition` con el nombre entre comillas (y `filename*` si no es ASCII), como `send_file`."""
+    simple = name.encode("ascii", "ignore").decode().replace("\\", "").replace('"', "")
+    value = f'attachment; filename="{simple}"'
+    if simple != name:
+        value += f"; filename*=UTF-8''{quote(name)}"
+    return value
+
+
+@bp.route("/<int:jid>/download")
+@login_required
+def download(jid: int):
+    job = _job_or_404(jid)
+    path = jobs.result_file(job)
+    if path is None:
+        abort(404)
+    accel = current_app.config.get("MEDIA_ACCEL_REDIRECT")
+    name = os.path.basename(path)
+    if accel:
+        # nginx conserva el Content-Type de esta respuesta, no el del archivo
+        response = current_app.response_class(mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = accel.rstrip("/") + "/" + job.result_path
+        response.headers["Content-Disposition"] = _attachment(name)
+    else:
+        response = send_file(path, as_attachment=True, download_name=name, max_age=0)
+    response.cache_control.private = True
+    return response
+
+
+@bp.route("/reports/<name>", methods=["POST"])
+@login_required
+def enqueue_report(name: str):
+    if name not in REPORTS:
+        abort(404)
+    args = {k: request.form[k] for k in ("from", "to") if request.form.get(k)}
+    job = jobs.enqueue("report_csv", {"report": name, "args": args}, user_id=current_user.id)
+    flash("Reporte en preparación", "info")
+    return redirect(url_for("jobs.detail", jid=job.id))
+
+
+@bp.route("/products-export", methods=["POST"])
+@login_required
+def enqueue_products_export():
+    job = jobs.enqueue("products_export", user_id=current_user.id)
+    flash("Exportación en preparación", "info")
+    return redirect(url_for("jobs.detail", jid=job.id))
@@ -5,15 +5,19 @@ from flask_login import login_required
 
 from ...extensions import db
 from ...models import Order, Sale
+from ...pagination import paginate
+from ...querybudget import query_budget
 
 bp = Blueprint("orders", __name__, url_prefix="/orders", template_folder="../../templates")
 
 
 @bp.route("")
+@query_budget(2)
 @login_required
 def list_orders():
-    rows = db.session.execute(db.select(Order).order_by(Order.created_at.desc()).limit(200)).scalars().all()
-    return render_template("orders/list.html", rows=rows)
+    query = db.select(Order).options(db.joinedload(Order.customer))
+    page = paginate(query, Order, request.args.get("cursor"))
+    return render_template("orders/list.html", rows=page.items, page=page)
 
 
 @bp.route("/<int:oid>/status", methods=["POST"])
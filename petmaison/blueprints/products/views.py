@@ -1,27 +1,42 @@
 from __future__ import annotations
 
 from decimal import Decimal
-from uuid import uuid4
+from tempfile import SpooledTemporaryFile
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for, current_app
-from flask_login import login_required
+import os
 
+from flask import Blueprint, current_app, flash, redirect, render_template, request, send_file, url_for
+from flask_login import current_user, login_required
+
+from ... import catalog, images, jobs, productcache, respcache
 from ...extensions import db
 from ...models import Product
+from ...pagination import PER_PAGE, Page, paginate
+from ...querybudget import query_budget
+from ...search import search_products
 
 bp = Blueprint("products", __name__, url_prefix="/products", template_folder="../../templates")
 
 
 @bp.route("")
+@query_budget(2)
 @login_required
 def list_products():
     q = request.args.get("q", "")
     query = db.select(Product)
     if q:
-        like = f"%{q}%"
-        query = query.filter(db.or_(Product.name.ilike(like), Product.sku.ilike(like)))
-    rows = db.session.execute(query.order_by(Product.created_at.desc())).scalars().all()
-    return render_template("products/list.html", rows=rows, q=q)
+        # Con búsqueda manda la relevancia: primera página de resultados, sin cursores.
+        page = Page(items=list(db.session.execute(search_products(query, q).limit(PER_PAGE)).scalars()))
+    else:
+        page = paginate(query, Product, request.args.get("cursor"))
+    return render_template("products/list.html", rows=page.items, page=page, q=q)
+
+
+def _upload_image() -> str | None:
+    f = request.files.get("image")
+    if not f or not f.filename:
+        return None
+    return images.store(f.read())
 
 
 @bp.route("/create", methods=["GET", "POST"])
@@ -29,13 +44,11 @@ def list_products():
 def create_product():
     if request.method == "POST":
         form = request.form
-        image_path = None
-        if "image" in request.files and request.files["image"].filename:
-            f = request.files["image"]
-            filename = f"{uuid4().hex}_{f.filename}"
-            dest = current_app.config["MEDIA_ROOT"]
-            f.save(f"{dest}/{filename}")
-            image_path = f"/media/{filename}"
+        try:
+            image_path = _upload_image()
+        except images.InvalidImage as e:
+            flash(str(e), "danger")
+            return render_template("products/form.html", item=None)
         p = Product(
             sku=form.get("sku", "").strip(),
             name=form.get("name", "").strip(),
@@ -52,6 +65,8 @@ def create_product():
         )
         db.session.add(p)
         db.session.commit()
+        respcache.invalidate("products")
+        productcache.expire()
         flash("Producto creado", "success")
         return redirect(url_for("products.list_products"))
     return render_template("products/form.html", item=None)
@@ -77,7 +92,15 @@ def edit_product(pid: int):
         p.stock = int(form.get("stock", p.stock) or 0)
         p.min_stock = int(form.get("min_stock", p.min_stock) or 0)
         p.active = bool(form.get("active", p.active))
+        try:
+            p.image_path = _upload_image() or p.image_path
+        except images.InvalidImage as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return render_template("products/form.html", item=p)
         db.session.commit()
+        respcache.invalidate("products")
+        productcache.expire()
         flash("Producto actualizado", "success")
         return redirect(url_for("products.list_products"))
     return render_template("products/form.html", item=p)
@@ -90,5 +113,62 @@ def delete_product(pid: int):
     if p:
         db.session.delete(p)
         db.session.commit()
+        respcache.invalidate("products")
+        productcache.expire()
         flash("Producto eliminado", "success")
     return redirect(url_for("products.list_products"))
+
+
+def _enqueue_import(f):
+    # Archivos grandes: se guardan y los procesa el worker.
+    path = f"{jobs.RESULTS_DIR}/uploads/{os.urandom(8).hex()}{os.path.splitext(f.filename)[1].lower()}"
+    target = os.path.join(current_app.config["MEDIA_ROOT"], path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    f.stream.seek(0)
+    f.save(target)
+    job = jobs.enqueue("products_import", {"path": path, "filename": f.filename}, user_id=current_user.id)
+    flash("Archivo recibido: la importación sigue en segundo plano", "info")
+    return redirect(url_for("jobs.detail", jid=job.id))
+
+
+@bp.route("/import", methods=["GET", "POST"])
+@login_required
+def import_products():
+    result = None
+    if request.method == "POST":
+        f = request.files.get("file")
+        if not f or not f.filename:
+            flash("Seleccione un archivo CSV o XLSX", "warning")
+            return redirect(url_for("products.import_products"))
+        f.stream.seek(0, os.SEEK_END)
+        if f.stream.tell() > current_app.config["IMPORT_INLINE_MAX_BYTES"]:
+            return _enqueue_import(f)
+        f.stream.seek(0)
+        try:
+            result = catalog.import_products(f.stream, f.filename)
+        except catalog.CatalogError as e:
+            flash(str(e), "danger")
+            return redirect(url_for("products.import_products"))
+        respcache.invalidate("products")
+        productcache.expire()
+        flash(
+            f"{result.upserted} productos importados, {result.error_count} filas con error "
+            f"({result.rows_per_sec:.0f} filas/s)",
+            "success" if not result.error_count else "warning",
+        )
+    return render_template("products/import.html", result=result)
+
+
+@bp.route("/export.xlsx")
+@login_required
+def export_products():
+    # Hasta 8 MB en memoria; catálogos más grandes se vuelcan a disco.
+    buf = SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    catalog.export_products(buf)
+    buf.seek(0)
+    return send_file(
+        buf,
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name="productos.xlsx",
+    )
@@ -4,17 +4,22 @@ from decimal import Decimal
 from flask import Blueprint, flash, redirect, render_template, request, url_for
 from flask_login import login_required
 
+from ... import respcache, stock
 from ...extensions import db
-from ...models import Product, Purchase, PurchaseItem, StockMovement
+from ...models import Purchase, PurchaseItem
+from ...pagination import paginate
+from ...querybudget import query_budget
 
 bp = Blueprint("purchases", __name__, url_prefix="/purchases", template_folder="../../templates")
 
 
 @bp.route("")
+@query_budget(2)
 @login_required
 def list_purchases():
-    rows = db.session.execute(db.select(Purchase).order_by(Purchase.created_at.desc()).limit(100)).scalars().all()
-    return render_template("purchases/list.html", rows=rows)
+    query = db.select(Purchase).options(db.joinedload(Purchase.supplier))
+    page = paginate(query, Purchase, request.args.get("cursor"))
+    return render_template("purchases/list.html", rows=page.items, page=page)
 
 
 @bp.route("/create", methods=["GET", "POST"])
@@ -31,6 +36,7 @@ def create_purchase():
 
 
 @bp.route("/<int:pid>", methods=["GET", "POST"])
+@query_budget(3)
 @login_required
 def edit_purchase(pid: int):
     p = db.session.get(Purchase, pid)
@@ -68,14 +74,16 @@ def edit_purchase(pid: int):
         flash("Item agregado", "success")
         return redirect(url_for("purchases.edit_purchase", pid=p.id))
 
-    items = db.session.execute(db.select(PurchaseItem).filter_by(purchase_id=p.id)).scalars().all()
+    items = db.session.execute(
+        db.select(PurchaseItem).filter_by(purchase_id=p.id).options(db.joinedload(PurchaseItem.product))
+    ).scalars().all()
     return render_template("purchases/edit.html", purchase=p, items=items)
 
 
 @bp.route("/<int:pid>/confirm", methods=["POST"])
 @login_required
 def confirm_purchase(pid: int):
-    p = db.session.get(Purchase, pid)
+    p = db.session.get(Purchase, pid, with_for_update=True)
     if not p:
         flash("No encontrada", "warning")
         return redirect(url_for("purchases.list_purchases"))
@@ -85,21 +93,8 @@ def confirm_purchase(pid: int):
 
     # Confirm with transaction
     p.status = "CONFIRMED"
-    items = db.session.execute(db.select(PurchaseItem).filter_by(purchase_id=p.id)).scalars().all()
-    for it in items:
-        prod = db.session.get(Product, it.product_id)
-        if prod:
-            prod.stock += it.qty
-            db.session.add(
-                StockMovement(
-                    product_id=prod.id,
-                    type="IN",
-                    ref_type="PURCHASE",
-                    ref_id=p.id,
-                    qty=it.qty,
-                    unit_cost_net=it.unit_cost_net,
-                )
-            )
+    stock.purchase_in(p)
     db.session.commit()
+    respcache.invalidate("purchases", "products")
     flash("Compra confirmada y stock actualizado", "success")
     return redirect(url_for("purchases.edit_purchase", pid=p.id))
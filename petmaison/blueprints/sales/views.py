@@ -1,65 +1,87 @@
 from __future__ import annotations
 
-from decimal import Decimal
 from io import BytesIO
 
-from flask import Blueprint, Response, flash, redirect, render_template, request, url_for
+from flask import Blueprint, Response, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
+from ... import cart, customers, jobs, productcache, respcache, rollups, stock
+from ...idempotency import idempotent
 from ...extensions import db
-from ...models import Product, Sale, SaleItem, StockMovement
+from ...models import Product, Sale, SaleItem
+from ...pagination import paginate
+from ...querybudget import query_budget
 
 bp = Blueprint("sales", __name__, url_prefix="/sales", template_folder="../../templates")
 
 
 @bp.route("")
+@query_budget(2)
 @login_required
 def list_sales():
-    rows = db.session.execute(db.select(Sale).order_by(Sale.created_at.desc()).limit(100)).scalars().all()
-    return render_template("sales/list.html", rows=rows)
+    query = db.select(Sale).options(db.joinedload(Sale.customer), db.joinedload(Sale.user))
+    page = paginate(query, Sale, request.args.get("cursor"))
+    return render_template("sales/list.html", rows=page.items, page=page)
+
+
+def _product_id(ref: str) -> int:
+    """Lo tipeado en la caja: SKU (o código de barras) si existe en el catálogo, si no el id."""
+    ref = ref.strip()
+    if not ref:
+        return 0
+    snapshot = productcache.get_snapshot()
+    product = snapshot.by_sku(ref) if snapshot is not None else None
+    if product is not None:
+        return product.id
+    # SKU recién creado (aún no está en la foto) o foto apagada
+    product_id = db.session.execute(db.select(Product.id).filter(Product.sku == ref)).scalar()
+    if product_id is None and ref.isdigit():
+        return int(ref)
+    return product_id or 0
+
+
+@bp.route("/pos/lookup")
+@query_budget(3)
+@login_required
+def pos_lookup():
+    """Sugerencias por prefijo de SKU para el campo de producto de la caja (desde la foto del catálogo)."""
+    q = request.args.get("q", "").strip()
+    snapshot = productcache.get_snapshot()
+    if not q or snapshot is None:
+        return jsonify([])
+    return jsonify(
+        [
+            {"id": p.id, "sku": p.sku, "name": p.name, "price_gross": str(p.price_gross), "stock": p.stock}
+            for p in snapshot.sku_prefix(q, limit=10)
+        ]
+    )
 
 
 @bp.route("/pos", methods=["GET", "POST"])
+@query_budget(3)
+@idempotent
 @login_required
 def pos():
     if request.method == "POST":
         sale_id = request.form.get("sale_id")
         if sale_id:
-            sale = db.session.get(Sale, int(sale_id))
+            sale = db.session.get(Sale, int(sale_id), with_for_update=True)
         else:
             sale = Sale(user_id=current_user.id, payment_method="EFECTIVO")
             db.session.add(sale)
             db.session.flush()
-        product_id = int(request.form.get("product_id", "0") or 0)
-        qty = int(request.form.get("qty", "1") or 1)
-        unit_price_net = Decimal(request.form.get("unit_price_net", "0") or 0)
-        discount = Decimal(request.form.get("discount", "0") or 0)
-        vat_rate = Decimal("0.19")
-        line_total = (unit_price_net * qty - discount) * (1 + vat_rate)
-        db.session.add(
-            SaleItem(
-                sale_id=sale.id,
-                product_id=product_id,
-                qty=qty,
-                unit_price_net=unit_price_net,
-                discount=discount,
-                vat_rate=vat_rate,
-                line_total=line_total,
-            )
-        )
-        # recompute totals
-        totals = db.session.execute(
-            db.select(
-                db.func.coalesce(db.func.sum(SaleItem.qty * SaleItem.unit_price_net - SaleItem.discount), 0),
-                db.func.coalesce(
-                    db.func.sum((SaleItem.qty * SaleItem.unit_price_net - SaleItem.discount) * SaleItem.vat_rate),
-                    0,
-                ),
-            ).filter(SaleItem.sale_id == sale.id)
-        ).first()
-        sale.subtotal_net = totals[0]
-        sale.vat = totals[1]
-        sale.total = sale.subtotal_net + sale.vat
+        line = {
+            "product_id": _product_id(request.form.get("product_id", "")),
+            "qty": int(request.form.get("qty", "1") or 1),
+            "unit_price_net": request.form.get("unit_price_net") or None,
+            "discount": request.form.get("discount") or 0,
+        }
+        try:
+            cart.add_lines(sale, [line])
+        except cart.CartError as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return redirect(url_for("sales.pos", sale_id=sale_id or None))
         db.session.commit()
         flash("Ítem agregado", "success")
         return redirect(url_for("sales.pos", sale_id=sale.id))
@@ -67,15 +89,20 @@ def pos():
     sale_id = request.args.get("sale_id")
     sale = db.session.get(Sale, int(sale_id)) if sale_id else None
     items = (
-        db.session.execute(db.select(SaleItem).filter_by(sale_id=sale.id)).scalars().all() if sale else []
+        db.session.execute(
+            db.select(SaleItem).filter_by(sale_id=sale.id).options(db.joinedload(SaleItem.product))
+        ).scalars().all()
+        if sale
+        else []
     )
     return render_template("sales/pos.html", sale=sale, items=items)
 
 
 @bp.route("/<int:sid>/confirm", methods=["POST"])
+@idempotent
 @login_required
 def confirm_sale(sid: int):
-    sale = db.session.get(Sale, sid)
+    sale = db.session.get(Sale, sid, with_for_update=True)
     if not sale:
         flash("No encontrada", "warning")
         return redirect(url_for("sales.list_sales"))
@@ -83,33 +110,39 @@ def confirm_sale(sid: int):
         flash("Ya confirmada", "info")
         return redirect(url_for("sales.pos", sale_id=sale.id))
 
+    try:
+        stock.sale_out(sale)
+    except stock.InsufficientStock as e:
+        db.session.rollback()
+        flash(f"Stock insuficiente para {e.product_name}", "danger")
+        return redirect(url_for("sales.pos", sale_id=sid))
     sale.status = "CONFIRMED"
-    items = db.session.execute(db.select(SaleItem).filter_by(sale_id=sale.id)).scalars().all()
-    for it in items:
-        prod = db.session.get(Product, it.product_id)
-        if prod:
-            if prod.stock < it.qty:
-                flash(f"Stock insuficiente para {prod.name}", "danger")
-                return redirect(url_for("sales.pos", sale_id=sale.id))
-            prod.stock -= it.qty
-            db.session.add(
-                StockMovement(
-                    product_id=prod.id,
-                    type="OUT",
-                    ref_type="SALE",
-                    ref_id=sale.id,
-                    qty=it.qty,
-                    unit_cost_net=prod.cost_net,
-                )
-            )
+    rollups.apply_sale(sale)
+    customers.record_sale(sale)
     db.session.commit()
+    respcache.invalidate("sales", "products")
     flash("Venta confirmada y stock actualizado", "success")
     return redirect(url_for("sales.pos", sale_id=sale.id))
 
 
 @bp.route("/<int:sid>/ticket")
+@query_budget(3)
 @login_required
 def ticket(sid: int):
-    # Placeholder simple HTML -> PDF podría integrarse con xhtml2pdf/WeasyPrint
-    sale = db.session.get(Sale, sid)
+    sale = db.session.get(
+        Sale,
+        sid,
+        options=[db.joinedload(Sale.customer), db.selectinload(Sale.items).joinedload(SaleItem.product)],
+    )
+    if not sale:
+        flash("No encontrada", "warning")
+        return redirect(url_for("sales.list_sales"))
     return render_template("sales/ticket.html", sale=sale)
+
+
+@bp.route("/<int:sid>/ticket.pdf", methods=["POST"])
+@login_required
+def ticket_pdf(sid: int):
+    # El PDF lo genera el worker: xhtml2pdf tarda y no debe ocupar un thread de caja.
+    job = jobs.enqueue("sale_ticket_pdf", {"sale_id": sid}, user_id=current_user.id)
+    return redirect(url_for("jobs.detail", jid=job.id))
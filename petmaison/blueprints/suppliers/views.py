@@ -5,15 +5,18 @@ from flask_login import login_required
 
 from ...extensions import db
 from ...models import Supplier
+from ...pagination import paginate
+from ...querybudget import query_budget
 
 bp = Blueprint("suppliers", __name__, url_prefix="/suppliers", template_folder="../../templates")
 
 
 @bp.route("")
+@query_budget(2)
 @login_required
 def list_suppliers():
-    rows = db.session.execute(db.select(Supplier).order_by(Supplier.created_at.desc())).scalars().all()
-    return render_template("suppliers/list.html", rows=rows)
+    page = paginate(db.select(Supplier), Supplier, request.args.get("cursor"))
+    return render_template("suppliers/list.html", rows=page.items, page=page)
 
 
 @bp.route("/create", methods=["GET", "POST"])
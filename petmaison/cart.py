@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Iterable
+
+from . import productcache
+from .extensions import db
+from .models import Product, Sale, SaleItem
+
+VAT_RATE = Decimal("0.19")
+CENT = Decimal("0.01")
+
+
+class CartError(ValueError):
+    pass
+
+
+class CartClosed(CartError):
+    pass
+
+
+def line_amounts(qty: int, unit_price_net: Decimal, discount: Decimal, vat_rate: Decimal) -> tuple[Decimal, Decimal]:
+    """(neto, IVA) de una línea."""
+    net = unit_price_net * qty - discount
+    return net, net * vat_rate
+
+
+def net_price(product: Product | Any) -> Decimal:
+    if product.vat_included:
+        return (Decimal(product.price_gross) / (1 + VAT_RATE)).quantize(CENT, ROUND_HALF_UP)
+    return Decimal(product.price_gross)
+
+
+def _bump(sale: Sale, net: Decimal, vat: Decimal) -> None:
+    # Totales incrementales: nunca se re-agregan todas las líneas.
+    sale.subtotal_net = Decimal(sale.subtotal_net or 0) + net
+    sale.vat = Decimal(sale.vat or 0) + vat
+    sale.total = sale.subtotal_net - Decimal(sale.discount or 0) + sale.vat
+
+
+def _check_open(sale: Sale) -> None:
+    if sale.status != "DRAFT":
+        raise CartClosed("La venta ya no está abierta")
+
+
+def add_lines(sale: Sale, lines: Iterable[dict[str, Any]]) -> list[SaleItem]:
+    """Agrega un lote de líneas con a lo más una lectura de productos.
+
+    Cada línea: `product_id`, `qty` y opcionalmente `unit_price_net` (por
+    defecto el precio de lista neto) y `discount`. Los precios salen de la
+    foto del catálogo del worker; solo los que no están ahí (productos
+    recién creados) se leen de la base.
+    """
+    _check_open(sale)
+    lines = list(lines)
+    ids = {int(line["product_id"]) for line in lines}
+    snapshot = productcache.get_snapshot()
+    products: dict[int, Any] = {}
+    if snapshot is not None:
+        products = {pid: p for pid in ids if (p := snapshot.get(pid)) is not None}
+    if ids - products.keys():
+        products.update(
+            (p.id, p)
+            for p in db.session.execute(
+                db.select(Product.id, Product.price_gross, Product.vat_included).filter(
+                    Product.id.in_(ids - products.keys())
+                )
+            )
+        )
+    missing = ids - products.keys()
+    if missing:
+        raise CartError(f"Productos inexistentes: {', '.join(map(str, sorted(missing)))}")
+
+    items = []
+    net_sum = vat_sum = Decimal("0")
+    for line in lines:
+        qty = int(line.get("qty") or 1)
+        if qty <= 0:
+            raise CartError("La cantidad debe ser positiva")
+        price = line.get("unit_price_net")
+        price = Decimal(price) if price not in (None, "") else net_price(products[int(line["product_id"])])
+        discount = Decimal(line.get("discount") or 0)
+        net, vat = line_amounts(qty, price, discount, VAT_RATE)
+        items.append(
+            SaleItem(
+                sale_id=sale.id,
+                product_id=int(line["product_id"]),
+                qty=qty,
+                unit_price_net=price,
+                discount=discount,
+                vat_rate=VAT_RATE,
+                line_total=net + vat,
+            )
+        )
+        net_sum += net
+        vat_sum += vat
+    db.session.add_all(items)
+    _bump(sale, net_sum, vat_sum)
+    return items
+
+
+def update_line(sale: Sale, item: SaleItem, qty: int | None = None, discount: Decimal | None = None) -> None:
+    _check_open(sale)
+    old_net, old_vat = line_amounts(item.qty, item.unit_price_net, item.discount, item.vat_rate)
+    if qty is not None:
+        if qty <= 0:
+            raise CartError("La cantidad debe ser positiva")
+        item.qty = qty
+    if discount is not None:
+        item.discount = discount
+    net, vat = line_amounts(item.qty, item.unit_price_net, item.discount, item.vat_rate)
+    item.line_total = net + vat
+    _bump(sale, net - old_net, vat - old_vat)
+
+
+def remove_line(sale: Sale, item: SaleItem) -> None:
+    _check_open(sale)
+    net, vat = line_amounts(item.qty, item.unit_price_net, item.discount, item.vat_rate)
+    db.session.delete(item)
+    _bump(sale, -net, -vat)
+
+
+def set_discount(sale: Sale, discount: Decimal) -> None:
+    """Descuento neto a nivel de venta; el IVA se ajusta sobre el neto descontado."""
+    _check_open(sale)
+    if discount < 0:
+        raise CartError("El descuento no puede ser negativo")
+    if discount > Decimal(sale.subtotal_net or 0):
+        raise CartError("El descuento no puede superar el subtotal")
+    delta = discount - Decimal(sale.discount or 0)
+    sale.discount = discount
+    _bump(sale, Decimal("0"), -delta * VAT_RATE)
@@ -0,0 +1,239 @@
+"""Importación / exportación masiva del catálogo de productos (CSV y XLSX)."""
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any, Callable, Iterator
+
+from .dbutils import upsert
+from .extensions import db
+from .models import Product
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 500
+
+REQUIRED = ("sku", "name", "cost_net", "price_gross")
+OPTIONAL = ("brand", "category", "description", "vat_included", "min_stock", "active")
+# El stock se exporta como referencia pero no se importa: solo cambia por movimientos.
+EXPORT_COLUMNS = REQUIRED + OPTIONAL + ("stock",)
+
+_TRUE = {"1", "true", "si", "sí", "s", "x", "yes", "y", "verdadero"}
+_FALSE = {"0", "false", "no", "n", "", "falso"}
+# Miles con punto, como se escriben los precios en pesos: 12.990, 1.234.567
+_THOUSANDS = re.compile(r"\d{1,3}(\.\d{3})+")
+
+
+class CatalogError(ValueError):
+    """El archivo no se puede importar (formato o encabezados)."""
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    upserted: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    error_count: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _text(value: Any, limit: int, column: str) -> str | None:
+    if isinstance(value, float) and value.is_integer():  # SKU numérico leído desde Excel
+        value = int(value)
+    text = str(value).strip() if value is not None else ""
+    if len(text) > limit:
+        raise ValueError(f"{column}: máximo {limit} caracteres")
+    return text or None
+
+
+def _decimal(value: Any, column: str) -> Decimal:
+    text = str(value if value is not None else "").strip().replace("$", "").replace(" ", "")
+    if isinstance(value, (int, float, Decimal)):  # celda numérica de Excel: el punto es decimal
+        pass
+    elif "," in text and "." in text:  # 1.234,50
+        text = text.replace(".", "").replace(",", ".")
+    elif "," in text:
+        text = text.replace(",", ".")
+    elif _THOUSANDS.fullmatch(text):  # 12.990 son doce mil novecientos noventa, no 12,99
+        text = text.replace(".", "")
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"{column}: número inválido '{value}'") from None
+    if number < 0:
+        raise ValueError(f"{column}: no puede ser negativo")
+    return number.quantize(Decimal("0.01"))
+
+
+def _bool(value: Any, column: str) -> bool:
+    text = str(value if value is not None else "").strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"{column}: valor booleano inválido '{value}'")
+
+
+def _int(value: Any, column: str) -> int:
+    text = str(value if value is not None else "").strip() or "0"
+    try:
+        number = int(float(text))
+    except ValueError:
+        raise ValueError(f"{column}: entero inválido '{value}'") from None
+    if number < 0:
+        raise ValueError(f"{column}: no puede ser negativo")
+    return number
+
+
+def parse_row(raw: dict[str, Any], columns: tuple[str, ...]) -> dict[str, Any]:
+    """Valida una fila y la convierte a valores de `Product`; `ValueError` con el motivo."""
+    sku = _text(raw.get("sku"), 64, "sku")
+    name = _text(raw.get("name"), 255, "name")
+    if not sku:
+        raise ValueError("sku: requerido")
+    if not name:
+        raise ValueError("name: requerido")
+    row: dict[str, Any] = {
+        "sku": sku,
+        "name": name,
+        "cost_net": _decimal(raw.get("cost_net"), "cost_net"),
+        "price_gross": _decimal(raw.get("price_gross"), "price_gross"),
+    }
+    for col in columns:
+        if col in ("brand", "category"):
+            row[col] = _text(raw.get(col), 255, col)
+        elif col == "description":
+            row[col] = _text(raw.get(col), 1024, col)
+        elif col in ("vat_included", "active"):
+            row[col] = _bool(raw.get(col), col)
+        elif col == "min_stock":
+            row[col] = _int(raw.get(col), col)
+    return row
+
+
+def _columns(header: list[Any]) -> tuple[str, ...]:
+    names = [str(h or "").strip().lower() for h in header]
+    missing = [c for c in REQUIRED if c not in names]
+    if missing:
+        raise CatalogError(f"Faltan columnas requeridas: {', '.join(missing)}")
+    return tuple(c for c in OPTIONAL if c in names)
+
+
+def _read_csv(stream: IO, chunksize: int) -> Iterator[list[dict[str, Any]]]:
+    import pandas as pd
+
+    # Excel en español exporta CSV con ';': se detecta en el encabezado.
+    first = stream.readline()
+    stream.seek(0)
+    if isinstance(first, bytes):
+        first = first.decode("utf-8", "replace")
+    sep = ";" if first.count(";") > first.count(",") else ","
+    reader = pd.read_csv(stream, chunksize=chunksize, dtype=str, keep_default_na=False, sep=sep, encoding="utf-8-sig")
+    for chunk in reader:
+        chunk.columns = [str(c).strip().lower() for c in chunk.columns]
+        yield chunk.to_dict("records")
+
+
+def _read_xlsx(stream: IO, chunksize: int) -> Iterator[list[dict[str, Any]]]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h or "").strip().lower() for h in next(rows, [])]
+        chunk: list[dict[str, Any]] = []
+        for values in rows:
+            chunk.append(dict(zip(header, values)))
+            if len(chunk) >= chunksize:
+                yield chunk
+                chunk = []
+        yield chunk
+    finally:
+        wb.close()
+
+
+def read_chunks(stream: IO, filename: str, chunksize: int = BATCH_SIZE) -> Iterator[list[dict[str, Any]]]:
+    """Filas del archivo como dicts, de a `chunksize`; el primer lote puede venir vacío."""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return _read_xlsx(stream, chunksize)
+    if filename.lower().endswith((".csv", ".txt")):
+        return _read_csv(stream, chunksize)
+    raise CatalogError("Formato no soportado: use .csv o .xlsx")
+
+
+def import_products(
+    stream: IO,
+    filename: str,
+    batch_size: int = BATCH_SIZE,
+    progress: Callable[[ImportResult], None] | None = None,
+) -> ImportResult:
+    """Upsert por `sku` en lotes de `batch_size`, un commit por lote.
+
+    Las filas inválidas se saltan y se informan con su número de fila en el
+    archivo (la fila 1 es el encabezado). Columnas opcionales ausentes no se
+    tocan en productos existentes; el stock nunca se modifica.
+    """
+    result = ImportResult()
+    t0 = time.perf_counter()
+    columns: tuple[str, ...] | None = None
+    line = 1
+    for chunk in read_chunks(stream, filename, batch_size):
+        if columns is None and chunk:
+            columns = _columns(list(chunk[0].keys()))
+        batch: dict[str, dict[str, Any]] = {}
+        for raw in chunk:
+            line += 1
+            if not any(v not in (None, "") for v in raw.values()):
+                continue
+            result.rows += 1
+            try:
+                row = parse_row(raw, columns or ())
+            except ValueError as e:
+                result.error_count += 1
+                if len(result.errors) < MAX_ERRORS:
+                    result.errors.append((line, str(e)))
+                continue
+            # Un mismo SKU repetido en el lote: gana la última fila.
+            batch[row["sku"]] = row
+        if batch:
+            now = datetime.utcnow()
+            rows = [dict(r, created_at=now, updated_at=now) for r in batch.values()]
+            overwrite = [c for c in rows[0] if c not in ("sku", "created_at")]
+            db.session.execute(upsert(Product, None, keys=["sku"], overwrite=overwrite), rows)
+            db.session.commit()
+            result.upserted += len(rows)
+        if progress:
+            progress(result)
+    if columns is None:
+        raise CatalogError("Archivo sin filas")
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def export_products(target: IO, chunk_size: int = BATCH_SIZE, progress: Callable[[int], None] | None = None) -> int:
+    """Escribe el catálogo como XLSX en `target` sin cargar todos los productos.
+
+    openpyxl en modo `write_only` vuelca filas a disco a medida que llegan;
+    la consulta usa `yield_per`. Devuelve la cantidad de filas exportadas.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("productos")
+    ws.append(list(EXPORT_COLUMNS))
+    q = db.select(*[getattr(Product, c) for c in EXPORT_COLUMNS]).order_by(Product.id)
+    n = 0
+    for chunk in db.session.execute(q.execution_options(yield_per=chunk_size)).partitions():
+        for r in chunk:
+            ws.append([float(v) if isinstance(v, Decimal) else v for v in r])
+            n += 1
+        if progress:
+            progress(n)
+    wb.save(target)
+    return n
@@ -0,0 +1,116 @@
+"""Comandos `flask ...` del proyecto (registrados en `create_app`)."""
+from __future__ import annotations
+
+import click
+from flask import Flask
+
+
+def register_cli(app: Flask) -> None:
+    @app.cli.command("seed")
+    @click.option("--scale", type=int, default=None, help="Ventas a generar (carga masiva, base vacía)")
+    @click.option("--days", type=int, default=730, show_default=True, help="Días de historia con --scale")
+    @click.option("--seed", "rng_seed", type=int, default=42, show_default=True, help="Semilla con --scale")
+    def seed(scale, days, rng_seed):
+        """Crea datos de ejemplo (borra la base), o con --scale un volumen realista sin borrar nada"""
+        if scale is None:
+            from .seed import run_seed
+
+            run_seed()
+            return
+        from .synth import SynthError, run
+
+        try:
+            run(scale, days, rng_seed, echo=click.echo)
+        except SynthError as e:
+            raise click.ClickException(str(e))
+
+    @app.cli.command("rebuild-rollups")
+    @click.option("--from", "fro", type=click.DateTime(formats=["%Y-%m-%d"]), default=None)
+    @click.option("--to", type=click.DateTime(formats=["%Y-%m-%d"]), default=None)
+    def rebuild_rollups(fro, to):
+        """Recalcula el rollup diario de ventas y las estadísticas por cliente"""
+        from .customers import rebuild_stats
+        from .respcache import invalidate
+        from .rollups import rebuild
+
+        n = rebuild(fro.date() if fro else None, to.date() if to else None)
+        invalidate("sales")
+        click.echo(f"Rollup reconstruido: {n} filas.")
+        click.echo(f"Estadísticas de {rebuild_stats()} clientes recalculadas.")
+
+    @app.cli.command("import-products")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", default=1000, show_default=True)
+    def import_products(path, batch_size):
+        """Importa/actualiza productos desde CSV o XLSX (upsert por SKU)"""
+        from .catalog import import_products
+        from .respcache import invalidate
+
+        with open(path, "rb") as f:
+            result = import_products(f, path, batch_size)
+        invalidate("products")
+        for line, error in result.errors:
+            click.echo(f"Fila {line}: {error}", err=True)
+        click.echo(
+            f"{result.upserted} productos en {result.seconds:.1f}s ({result.rows_per_sec:.0f} filas/s), "
+            f"{result.error_count} filas con error."
+        )
+
+    @app.cli.command("export-products")
+    @click.argument("path", type=click.Path(dir_okay=False, writable=True))
+    def export_products(path):
+        """Exporta el catálogo a XLSX"""
+        import time
+
+        from .catalog import export_products
+
+        t0 = time.perf_counter()
+        with open(path, "wb") as f:
+            n = export_products(f)
+        elapsed = time.perf_counter() - t0
+        click.echo(f"{n} productos exportados en {elapsed:.1f}s ({n / max(elapsed, 1e-9):.0f} filas/s).")
+
+    @app.cli.command("images-backfill")
+    def images_backfill():
+        """Genera miniaturas y nombres con hash para imágenes subidas antes del pipeline"""
+        from .images import backfill
+
+        done, missing = backfill()
+        for path in missing:
+            click.echo(f"No encontrada o inválida: {path}", err=True)
+        click.echo(f"Imágenes procesadas: {done}.")
+
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys():
+        """Borra claves de idempotencia vencidas (IDEMPOTENCY_TTL_HOURS)"""
+        from .idempotency import purge
+
+        click.echo(f"Claves vencidas borradas: {purge()}.")
+
+    @app.cli.command("worker")
+    @click.option("--burst", is_flag=True, help="Termina cuando la cola queda vacía")
+    @click.option("--poll", type=float, default=1.0, show_default=True, help="Segundos entre consultas con la cola vacía")
+    def worker(burst, poll):
+        """Ejecuta trabajos en segundo plano (reportes, importaciones, PDFs)"""
+        from .jobs import work
+
+        n = work(burst=burst, poll=poll)
+        click.echo(f"Trabajos ejecutados: {n}.")
+
+    @app.cli.command("snapshot-stock")
+    def snapshot_stock():
+        """Cierra los meses completos pendientes del kardex"""
+        from .kardex import close_months
+
+        n = close_months()
+        click.echo(f"Snapshots de stock generados: {n}.")
+
+    @app.cli.command("recompute-costs")
+    def recompute_costs():
+        """Recalcula el costo promedio ponderado y el costo de las ventas desde los movimientos"""
+        from .costing import recompute
+        from .respcache import invalidate
+
+        n = recompute()
+        invalidate("sales")
+        click.echo(f"Costo promedio recalculado: {n} salidas corregidas.")
@@ -1,5 +1,40 @@
 import os
 from datetime import timedelta
+from typing import Any
+
+from sqlalchemy.pool import NullPool
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def engine_options() -> dict[str, Any]:
+    """Opciones del engine para producción, derivadas de la config de gunicorn.
+
+    Cada worker es un proceso con su propio pool y `GUNICORN_THREADS` threads;
+    un thread usa a lo más una conexión, así que el pool base es del tamaño
+    de los threads. Conexiones máximas a Postgres:
+    `WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW)`.
+    """
+    from .dbpool import TimedQueuePool
+
+    timeout_ms = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+    if os.getenv("DB_PGBOUNCER") == "1":
+        # PgBouncer ya hace de pool; sin prepared statements (modo transacción).
+        return {"poolclass": NullPool, "connect_args": {"prepare_threshold": None}}
+    threads = _env_int("GUNICORN_THREADS", 2)
+    options: dict[str, Any] = {
+        "poolclass": TimedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", threads),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", max(threads // 2, 1)),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
+    if timeout_ms:
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
 
 
 class BaseConfig:
@@ -10,7 +45,43 @@ class BaseConfig:
     TIME_ZONE = os.getenv("TIME_ZONE", "America/Santiago")
     MEDIA_ROOT = os.getenv("MEDIA_ROOT", os.path.abspath(os.path.join(os.getcwd(), "media")))
     STATIC_ROOT = os.getenv("STATIC_ROOT", os.path.abspath(os.path.join(os.getcwd(), "static")))
+    # Media: archivos con hash en el nombre van con caché inmutable de un año
+    MEDIA_MAX_AGE = _env_int("MEDIA_MAX_AGE", 3600)
+    MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT")  # nginx: prefijo de la location internal
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE") == "1"  # Apache mod_xsendfile
     WTF_CSRF_TIME_LIMIT = None
+    # Caché de respuestas: "memory" (LRU por worker), "none" o URL redis://
+    RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory")
+    RESPONSE_CACHE_TTL = _env_int("RESPONSE_CACHE_TTL", 60)
+    RESPONSE_CACHE_MAXSIZE = _env_int("RESPONSE_CACHE_MAXSIZE", 512)
+    RESPONSE_CACHE_MAX_BYTES = _env_int("RESPONSE_CACHE_MAX_BYTES", 4 * 1024 * 1024)
+    # Claves de idempotencia de POS / confirmación (ver petmaison/idempotency.py)
+    IDEMPOTENCY_TTL_HOURS = _env_int("IDEMPOTENCY_TTL_HOURS", 24)
+    IDEMPOTENCY_PURGE_EVERY = _env_int("IDEMPOTENCY_PURGE_EVERY", 200)  # purga ~1 de cada N claves nuevas
+    # Trabajos en segundo plano (`flask worker`, ver petmaison/jobs.py)
+    JOB_HEARTBEAT_SECONDS = _env_int("JOB_HEARTBEAT_SECONDS", 5)
+    JOB_STALE_SECONDS = _env_int("JOB_STALE_SECONDS", 120)
+    JOB_MAX_ATTEMPTS = _env_int("JOB_MAX_ATTEMPTS", 3)
+    JOB_RESULT_TTL_HOURS = _env_int("JOB_RESULT_TTL_HOURS", 72)
+    JOB_MAINTENANCE_SECONDS = _env_int("JOB_MAINTENANCE_SECONDS", 60)
+    # Importaciones de catálogo más grandes que esto van al worker
+    IMPORT_INLINE_MAX_BYTES = _env_int("IMPORT_INLINE_MAX_BYTES", 512 * 1024)
+    # Foto del catálogo en memoria por worker (ver petmaison/productcache.py)
+    PRODUCT_CACHE = os.getenv("PRODUCT_CACHE", "1") == "1"
+    PRODUCT_CACHE_REFRESH_SECONDS = _env_int("PRODUCT_CACHE_REFRESH_SECONDS", 5)
+    # Réplicas de lectura (ver petmaison/replicas.py): URLs separadas por coma
+    DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    REPLICA_BLUEPRINTS = ("dashboard", "reports", "api_products", "api_reports", "api_inventory")
+    REPLICA_CHECK_SECONDS = _env_int("REPLICA_CHECK_SECONDS", 5)
+    REPLICA_MAX_LAG_SECONDS = _env_int("REPLICA_MAX_LAG_SECONDS", 10)
+    REPLICA_STICKY_SECONDS = _env_int("REPLICA_STICKY_SECONDS", 15)  # lecturas al primario tras escribir
+    # /internal/pool y /metrics: admins, `Authorization: Bearer INTERNAL_TOKEN` o
+    # IPs de INTERNAL_ALLOWLIST. Detrás de un proxy la IP solo vale con PROXY_FIX_X_FOR.
+    INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN")
+    INTERNAL_ALLOWLIST = [ip.strip() for ip in os.getenv("INTERNAL_ALLOWLIST", "").split(",") if ip.strip()]
+    PROXY_FIX_X_FOR = _env_int("PROXY_FIX_X_FOR", 0)  # proxies delante que agregan X-Forwarded-For
+    # Requests sobre este umbral se loguean con su SQL (0 desactiva)
+    SLOW_REQUEST_MS = _env_int("SLOW_REQUEST_MS", 500)
     # API Docs (Flask-Smorest)
     API_TITLE = "PetMaison API"
     API_VERSION = "v1"
@@ -31,6 +102,9 @@ class DevelopmentConfig(BaseConfig):
 class ProductionConfig(BaseConfig):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options()
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER") == "1"
+    DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
 
 
 def get_config() -> type[BaseConfig]:
@@ -0,0 +1,173 @@
+"""Costo promedio ponderado y margen por producto, categoría y período.
+
+`stock.purchase_in` y `stock.sale_out` mantienen `products.avg_cost` al día
+movimiento a movimiento (con `products.stock` como cantidad corrida) y cada
+salida por venta guarda en `unit_cost_net` el promedio vigente al vender.
+El margen sale entonces de una sola pasada agregada sobre las líneas de venta
+y su movimiento, sin reconstruir costos.
+
+`recompute` reproduce todos los movimientos para corregir datos anteriores a
+este motor (salidas costeadas al costo de lista): `flask recompute-costs`.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from .dbutils import as_date, date_trunc
+from .extensions import db
+from .kardex import SIGNED_QTY
+from .models import Product, Sale, SaleItem, StockMovement
+from .reporting import label
+from .stock import weighted_average
+
+CENT = Decimal("0.01")
+CHUNK = 1000
+GROUPS = ("product", "category")
+
+
+@dataclass
+class MarginRow:
+    period: str | None
+    product_id: int | None
+    sku: str | None
+    name: str | None
+    category: str | None
+    qty: int
+    revenue: Decimal
+    cost: Decimal
+
+    @property
+    def margin(self) -> Decimal:
+        return self.revenue - self.cost
+
+    @property
+    def margin_pct(self) -> Decimal | None:
+        return (self.margin * 100 / self.revenue).quantize(CENT) if self.revenue else None
+
+
+def margins(fro: date, to: date, by: str = "category", unit: str | None = None) -> list[MarginRow]:
+    """Ventas netas, costo y margen de las ventas confirmadas entre `fro` y `to` (inclusive).
+
+    Agrupa por `product` o `category` y, si se da `unit`, además por período.
+    El ingreso es el neto de cada línea menos su parte del descuento de la
+    venta; el costo, la cantidad por el costo de la salida de stock de esa
+    venta (el promedio del producto si la venta no tiene movimiento).
+
+    Las ventas confirmadas antes de `stock.sale_out` tienen una salida por
+    línea, no por producto: las salidas se agregan por (venta, producto)
+    antes de unirlas a las líneas, para no multiplicar filas.
+    """
+    if by not in GROUPS:
+        raise ValueError(f"Agrupación inválida: {by}")
+    in_range = db.and_(
+        Sale.status == "CONFIRMED",
+        Sale.date >= datetime.combine(fro, time()),
+        Sale.date < datetime.combine(to + timedelta(days=1), time()),
+    )
+    outs = (
+        db.select(
+            StockMovement.ref_id.label("sale_id"),
+            StockMovement.product_id,
+            (
+                db.func.sum(StockMovement.qty * StockMovement.unit_cost_net)
+                / db.func.nullif(db.func.sum(StockMovement.qty), 0)
+            ).label("unit_cost"),
+        )
+        .filter(
+            StockMovement.ref_type == "SALE",
+            StockMovement.type == "OUT",
+            StockMovement.unit_cost_net.is_not(None),
+            StockMovement.ref_id.in_(db.select(Sale.id).filter(in_range)),
+        )
+        .group_by(StockMovement.ref_id, StockMovement.product_id)
+        .subquery()
+    )
+    share = db.case((Sale.subtotal_net > 0, (Sale.subtotal_net - Sale.discount) / Sale.subtotal_net), else_=1)
+    revenue = db.func.sum((SaleItem.qty * SaleItem.unit_price_net - SaleItem.discount) * share)
+    cost = db.func.sum(SaleItem.qty * db.func.coalesce(outs.c.unit_cost, Product.avg_cost))
+    keys = [Product.id, Product.sku, Product.name, Product.category] if by == "product" else [Product.category]
+    period = date_trunc(unit, Sale.date) if unit else db.null()
+    rows = db.session.execute(
+        db.select(period, *keys, db.func.sum(SaleItem.qty), revenue, cost)
+        .select_from(SaleItem)
+        .join(Sale, Sale.id == SaleItem.sale_id)
+        .join(Product, Product.id == SaleItem.product_id)
+        .outerjoin(outs, db.and_(outs.c.sale_id == SaleItem.sale_id, outs.c.product_id == SaleItem.product_id))
+        .filter(in_range)
+        .group_by(*([period] if unit else []), *keys)
+    ).all()
+    result = []
+    for p, *key, qty, rev, cst in rows:
+        product = dict(zip(("product_id", "sku", "name"), key[:-1]))
+        result.append(
+            MarginRow(
+                period=label(unit, as_date(p)) if unit else None,
+                product_id=product.get("product_id"),
+                sku=product.get("sku"),
+                name=product.get("name"),
+                category=key[-1],
+                qty=int(qty or 0),
+                revenue=Decimal(rev or 0).quantize(CENT),
+                cost=Decimal(cst or 0).quantize(CENT),
+            )
+        )
+    result.sort(key=lambda r: (r.period or "", -r.revenue))
+    return result
+
+
+def recompute() -> int:
+    """Recalcula `avg_cost` de cada producto y el costo de sus salidas reproduciendo los movimientos.
+
+    El stock inicial (cargado sin movimiento) entra al costo de lista, como en
+    el kardex. De a `CHUNK` productos, así la memoria no depende del historial.
+    Devuelve los movimientos cuyo costo cambió.
+    """
+    ids = list(db.session.execute(db.select(Product.id).order_by(Product.id)).scalars())
+    changed = 0
+    for i in range(0, len(ids), CHUNK):
+        changed += _recompute_chunk(ids[i : i + CHUNK])
+    db.session.commit()
+    return changed
+
+
+def _recompute_chunk(ids: list[int]) -> int:
+    current, opening = {}, {}
+    for pid, stock, cost, avg, total in db.session.execute(
+        db.select(Product.id, Product.stock, Product.cost_net, Product.avg_cost, db.func.sum(SIGNED_QTY))
+        .outerjoin(StockMovement, StockMovement.product_id == Product.id)
+        .filter(Product.id.in_(ids))
+        .group_by(Product.id, Product.stock, Product.cost_net, Product.avg_cost)
+    ):
+        current[pid] = avg
+        opening[pid] = (stock - (total or 0), Decimal(cost))
+    movements = db.session.execute(
+        db.select(
+            StockMovement.id, StockMovement.product_id, StockMovement.type, StockMovement.qty, StockMovement.unit_cost_net
+        )
+        .filter(StockMovement.product_id.in_(ids))
+        .order_by(StockMovement.product_id, StockMovement.created_at, StockMovement.id)
+    )
+    costs = {pid: avg for pid, (_, avg) in opening.items()}
+    outs = []
+    for pid, group in groupby(movements, key=lambda m: m.product_id):
+        qty, avg = opening[pid]
+        for m in group:
+            if m.type == "OUT":
+                if m.unit_cost_net != avg:
+                    outs.append({"id": m.id, "unit_cost_net": avg})
+                qty -= m.qty
+                continue
+            if m.type == "IN" and m.unit_cost_net is not None:
+                # Redondeado en cada paso, igual que lo guarda `purchase_in`.
+                avg = weighted_average(qty, avg, m.qty, m.unit_cost_net).quantize(CENT)
+            qty += m.qty
+        costs[pid] = avg
+    if outs:
+        db.session.execute(db.update(StockMovement), outs)
+    products = [{"id": pid, "avg_cost": avg} for pid, avg in costs.items() if avg != current[pid]]
+    if products:
+        db.session.execute(db.update(Product), products)
+    return len(outs)
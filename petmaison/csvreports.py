@@ -0,0 +1,94 @@
+"""Definición de los reportes CSV, compartida por `/reports/*.csv` y el worker."""
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass
+from io import StringIO
+from typing import Any, Callable, Iterator, Mapping, Sequence
+
+from .extensions import db
+from .models import Product, Purchase, Sale
+
+
+@dataclass(frozen=True)
+class CsvReport:
+    filename: str
+    header: Sequence[str]
+    query: Callable[[Mapping[str, str]], Any]
+    row: Callable[[Any], Sequence[Any]]
+
+
+def _sales(args: Mapping[str, str]):
+    q = db.select(Sale.id, Sale.date, Sale.customer_id, Sale.total).filter(Sale.status == "CONFIRMED")
+    if args.get("from"):
+        q = q.filter(Sale.date >= args["from"])
+    if args.get("to"):
+        q = q.filter(Sale.date <= args["to"])
+    return q.order_by(Sale.date.asc())
+
+
+def _purchases(args: Mapping[str, str]):
+    q = db.select(Purchase.id, Purchase.date, Purchase.supplier_id, Purchase.total).filter(
+        Purchase.status == "CONFIRMED"
+    )
+    if args.get("from"):
+        q = q.filter(Purchase.date >= args["from"])
+    if args.get("to"):
+        q = q.filter(Purchase.date <= args["to"])
+    return q.order_by(Purchase.date.asc())
+
+
+def _inventory(args: Mapping[str, str]):
+    return db.select(Product.sku, Product.name, Product.stock, Product.min_stock, Product.price_gross).order_by(
+        Product.id
+    )
+
+
+REPORTS: dict[str, CsvReport] = {
+    "sales": CsvReport(
+        "ventas.csv",
+        ["id", "fecha", "cliente_id", "total"],
+        _sales,
+        lambda r: [r.id, r.date.date().isoformat(), r.customer_id or "", str(r.total)],
+    ),
+    "purchases": CsvReport(
+        "compras.csv",
+        ["id", "fecha", "proveedor_id", "total"],
+        _purchases,
+        lambda r: [r.id, r.date.date().isoformat(), r.supplier_id, str(r.total)],
+    ),
+    "inventory": CsvReport(
+        "inventario.csv",
+        ["sku", "nombre", "stock", "min_stock", "precio_bruto"],
+        _inventory,
+        lambda r: [r.sku, r.name, r.stock, r.min_stock, str(r.price_gross)],
+    ),
+}
+
+
+def count(report: CsvReport, args: Mapping[str, str]) -> int:
+    return db.session.execute(db.select(db.func.count()).select_from(report.query(args).subquery())).scalar()
+
+
+def iter_csv(
+    report: CsvReport,
+    args: Mapping[str, str],
+    chunk_size: int,
+    progress: Callable[[int], None] | None = None,
+) -> Iterator[str]:
+    """Texto CSV por lotes de `chunk_size` filas (cursor `yield_per`): memoria constante."""
+    buf = StringIO()
+    cw = csv.writer(buf)
+    cw.writerow(report.header)
+    rows = 0
+    result = db.session.execute(report.query(args).execution_options(yield_per=chunk_size))
+    for chunk in result.partitions():
+        cw.writerows(report.row(r) for r in chunk)
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
@@ -0,0 +1,87 @@
+"""Clientes: búsqueda rápida para la caja y estadísticas de venta por cliente.
+
+`customer_stats` se suma en la misma transacción que confirma la venta
+(`record_sale`), así el valor histórico, la cantidad de tickets y la última
+compra de un cliente se leen sin recorrer `sales`. `rebuild_stats` la
+recalcula desde cero (`flask rebuild-rollups`, carga de datos).
+"""
+from __future__ import annotations
+
+import re
+
+from .dbutils import upsert
+from .extensions import db
+from .models import Customer, CustomerStats, Sale, email_key, phone_key, rut_key
+
+
+def record_sale(sale: Sale) -> None:
+    """Suma una venta recién confirmada a las estadísticas de su cliente."""
+    if sale.customer_id is None:
+        return
+    db.session.execute(
+        upsert(
+            CustomerStats,
+            [
+                {
+                    "customer_id": sale.customer_id,
+                    "tickets": 1,
+                    "total": sale.total,
+                    "first_sale_at": sale.date,
+                    "last_sale_at": sale.date,
+                }
+            ],
+            keys=["customer_id"],
+            accumulate=["tickets", "total"],
+            maximum=["last_sale_at"],
+            minimum=["first_sale_at"],
+        )
+    )
+
+
+def rebuild_stats() -> int:
+    """Recalcula `customer_stats` desde las ventas confirmadas. Devuelve los clientes con ventas."""
+    db.session.execute(db.delete(CustomerStats))
+    result = db.session.execute(
+        db.insert(CustomerStats).from_select(
+            ["customer_id", "tickets", "total", "first_sale_at", "last_sale_at"],
+            db.select(
+                Sale.customer_id,
+                db.func.count(Sale.id),
+                db.func.sum(Sale.total),
+                db.func.min(Sale.date),
+                db.func.max(Sale.date),
+            )
+            .filter(Sale.status == "CONFIRMED", Sale.customer_id.is_not(None))
+            .group_by(Sale.customer_id),
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def search(term: str, limit: int = 10) -> list[Customer]:
+    """Clientes cuyo RUT, teléfono o email empieza con `term` (normalizado como al guardar).
+
+    Cada prefijo usa su índice; los clientes que más recientemente compraron van primero.
+    """
+    term = term.strip()
+    conditions = []
+    if re.search(r"\d", term):
+        if key := rut_key(term):
+            conditions.append(Customer.rut_key.startswith(key, autoescape=True))
+        if key := phone_key(term):
+            conditions.append(Customer.phone_key.startswith(key, autoescape=True))
+    if re.search(r"[^\d\s.+()-]", term) and (key := email_key(term)):
+        conditions.append(Customer.email_key.startswith(key, autoescape=True))
+    if not conditions:
+        return []
+    return list(
+        db.session.execute(
+            db.select(Customer)
+            .outerjoin(Customer.stats)
+            .options(db.contains_eager(Customer.stats))
+            .filter(db.or_(*conditions))
+            .order_by(CustomerStats.last_sale_at.desc().nulls_last(), Customer.id)
+            .limit(limit)
+        ).scalars()
+    )
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from .extensions import db
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto esperan los threads por una conexión."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._wait_lock:
+                self.waits += 1
+                self.wait_total += elapsed
+                self.wait_max = max(self.wait_max, elapsed)
+
+
+def pool_stats() -> dict[str, Any]:
+    pool = db.engine.pool
+    stats: dict[str, Any] = {"class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+    if isinstance(pool, TimedQueuePool):
+        stats.update(
+            checkouts=pool.waits,
+            wait_avg_ms=round(pool.wait_total / pool.waits * 1000, 3) if pool.waits else 0.0,
+            wait_max_ms=round(pool.wait_max * 1000, 3),
+        )
+    return stats
+
+
+def init_app(app: Flask) -> None:
+    timeout_ms = app.config.get("DB_STATEMENT_TIMEOUT_MS") or 0
+    if not (timeout_ms and app.config.get("DB_PGBOUNCER")):
+        return
+    # Con PgBouncer en modo transacción no sirven las opciones de arranque
+    # (`-c statement_timeout`), así que se fija por transacción.
+
+    @event.listens_for(Session, "after_begin")
+    def _statement_timeout(session, transaction, connection) -> None:
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Iterable, Sequence
+
+from .extensions import db
+
+
+def dialect_name() -> str:
+    return db.session.get_bind().dialect.name
+
+
+def date_trunc(unit: str, column: Any):
+    """Inicio del período (`day`/`week`/`month`/`year`) que contiene `column`, como fecha.
+
+    Semanas ISO (lunes). En SQLite el resultado es texto `YYYY-MM-DD`; usar
+    `as_date` para normalizar.
+    """
+    if dialect_name() == "postgresql":
+        return db.cast(db.func.date_trunc(unit, column), db.Date)
+    if unit == "day":
+        return db.func.date(column)
+    if unit == "week":
+        return db.func.date(column, "weekday 0", "-6 days")
+    if unit == "month":
+        return db.func.strftime("%Y-%m-01", column)
+    if unit == "year":
+        return db.func.strftime("%Y-01-01", column)
+    raise ValueError(f"Unidad inválida: {unit}")
+
+
+def as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def insert(model: Any):
+    """`INSERT` del dialecto activo (soporta `on_conflict_*` en PostgreSQL y SQLite)."""
+    name = dialect_name()
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:  # pragma: no cover - solo usamos PostgreSQL y SQLite
+        raise NotImplementedError(f"Dialecto no soportado: {name}")
+    return dialect_insert(model)
+
+
+def upsert(
+    model: Any,
+    rows: Sequence[dict[str, Any]] | None,
+    keys: Iterable[str],
+    accumulate: Iterable[str] = (),
+    overwrite: Iterable[str] = (),
+    maximum: Iterable[str] = (),
+    minimum: Iterable[str] = (),
+):
+    """`INSERT ... ON CONFLICT (keys) DO UPDATE` multi-fila.
+
+    Las columnas de `accumulate` se suman al valor existente, las de
+    `overwrite` se reemplazan por el valor nuevo y las de `maximum` /
+    `minimum` se quedan con el mayor / menor de los dos. Con `rows=None` devuelve la
+    sentencia sin valores, para ejecutarla con una lista de filas
+    (executemany): en lotes grandes evita compilar un `VALUES` gigante.
+    """
+    stmt = insert(model)
+    if rows is not None:
+        stmt = stmt.values(list(rows))
+    set_: dict[str, Any] = {c: getattr(model, c) + stmt.excluded[c] for c in accumulate}
+    set_.update({c: stmt.excluded[c] for c in overwrite})
+    for c in maximum:
+        set_[c] = db.case((stmt.excluded[c] > getattr(model, c), stmt.excluded[c]), else_=getattr(model, c))
+    for c in minimum:
+        set_[c] = db.case((stmt.excluded[c] < getattr(model, c), stmt.excluded[c]), else_=getattr(model, c))
+    if not set_:
+        return stmt.on_conflict_do_nothing(index_elements=list(keys))
+    return stmt.on_conflict_do_update(index_elements=list(keys), set_=set_)
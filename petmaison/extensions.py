@@ -1,14 +1,12 @@
 from __future__ import annotations
 
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+# Solo lo que necesitan los modelos: Flask-Migrate, CSRF, flask-smorest y
+# Flask-Admin se cargan recién en `create_app` (importar `petmaison.models`
+# desde Alembic o un script no debe arrastrarlos).
 from flask_login import LoginManager
-from flask_wtf.csrf import CSRFProtect
-from flask_smorest import Api
+from flask_sqlalchemy import SQLAlchemy
 
+from .replicas import RoutingSession
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
-csrf = CSRFProtect()
-api = Api()
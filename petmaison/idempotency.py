@@ -0,0 +1,135 @@
+"""Claves de idempotencia para POSTs que el navegador o la caja reintentan.
+
+El cliente envía `Idempotency-Key` (encabezado) o un campo oculto
+`idempotency_key` (plantillas: `{{ idempotency_key() }}`, uno nuevo por
+render). La primera vez la clave se inserta en la misma transacción que el
+trabajo de la vista, así que queda registrada solo si la vista hace commit;
+después se guarda la respuesta (status + Location, o el cuerpo JSON). Un
+reintento con la misma clave se resuelve con una lectura por clave primaria
+y devuelve esa respuesta sin volver a ejecutar la vista.
+
+Las claves vencen a las `IDEMPOTENCY_TTL_HOURS`; se purgan de a poco al
+registrar claves nuevas y con `flask purge-idempotency-keys`.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Callable
+
+from flask import Flask, Response, current_app, flash, jsonify, request
+from flask_login import current_user
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+FIELD = "idempotency_key"
+MAX_BODY = 16 * 1024
+
+
+def _fingerprint() -> str:
+    # Misma clave con otro payload es un error del cliente, no un reintento.
+    h = hashlib.sha256(f"{request.endpoint}|{sorted((request.view_args or {}).items())}".encode())
+    if request.form:
+        h.update(repr(sorted((k, v) for k, v in request.form.items(multi=True) if k != FIELD)).encode())
+    else:
+        h.update(request.get_data())
+    return h.hexdigest()[:16]
+
+
+def _wants_json() -> bool:
+    return request.is_json or request.path.startswith("/api/")
+
+
+def _reject(message: str, status: int) -> Response:
+    if _wants_json():
+        response = jsonify({"message": message})
+        response.status_code = status
+        return response
+    flash(message, "warning")
+    return Response(status=303, headers={"Location": request.referrer or "/"})
+
+
+def _replay(row: IdempotencyKey) -> Response:
+    response = Response(row.body, status=row.status_code, mimetype=row.mimetype)
+    if row.location:
+        response.headers["Location"] = row.location
+        if not _wants_json():
+            flash("Solicitud ya procesada", "info")
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _remember(row: IdempotencyKey, response: Response) -> None:
+    row.status_code = response.status_code
+    row.location = response.headers.get("Location")
+    if response.is_json and not response.is_streamed:
+        data = response.get_data()
+        if len(data) <= MAX_BODY:
+            row.body, row.mimetype = data, response.mimetype
+
+
+def purge(now: datetime | None = None) -> int:
+    """Borra claves vencidas (usa el índice por `created_at`)."""
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=current_app.config["IDEMPOTENCY_TTL_HOURS"])
+    n = db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff)).rowcount
+    db.session.commit()
+    return n
+
+
+def idempotent(f: Callable) -> Callable:
+    """Hace repetible un POST con clave de idempotencia; sin clave no cambia nada.
+
+    La vista debe hacer su propio commit (o rollback si falla): la clave sigue
+    esa transacción. Va justo debajo de `@bp.route`.
+    """
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        key = (request.headers.get(HEADER) or request.form.get(FIELD) or "").strip()[:64]
+        if request.method != "POST" or not key or not current_user.is_authenticated:
+            return f(*args, **kwargs)
+
+        fingerprint = _fingerprint()
+        row = db.session.get(IdempotencyKey, (current_user.id, key))
+        if row is None:
+            row = IdempotencyKey(user_id=current_user.id, key=key, fingerprint=fingerprint)
+            db.session.add(row)
+            try:
+                db.session.flush()
+            except IntegrityError:
+                # Otro request con la misma clave terminó mientras tanto.
+                db.session.rollback()
+                row = db.session.get(IdempotencyKey, (current_user.id, key))
+            else:
+                try:
+                    response = current_app.make_response(f(*args, **kwargs))
+                except Exception:
+                    db.session.rollback()
+                    raise
+                if inspect(row).persistent:  # la vista no hizo rollback
+                    _remember(row, response)
+                    db.session.commit()
+                    if random.random() < 1 / current_app.config["IDEMPOTENCY_PURGE_EVERY"]:
+                        purge()
+                return response
+
+        if row is None:
+            return f(*args, **kwargs)
+        if row.fingerprint != fingerprint:
+            return _reject("La clave de idempotencia ya se usó con otros datos", 422)
+        if not row.status_code:
+            return _reject("La solicitud anterior aún se está procesando", 409)
+        return _replay(row)
+
+    return wrapper
+
+
+def init_app(app: Flask) -> None:
+    app.jinja_env.globals["idempotency_key"] = lambda: uuid.uuid4().hex
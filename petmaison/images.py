@@ -0,0 +1,130 @@
+"""Imágenes de producto: nombres por hash de contenido y miniaturas WebP/JPEG.
+
+`store` guarda el original como `products/<hash>.<ext>` y sus variantes
+`products/<hash>-<tamaño>.{webp,jpg}` bajo `MEDIA_ROOT`. Como el nombre
+depende del contenido, `/media` puede servirlos con caché inmutable.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from io import BytesIO
+
+from flask import current_app
+
+SIZES = {"thumb": 160, "medium": 640}
+FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+ALLOWED = {"jpeg": "jpg", "png": "png", "webp": "webp", "gif": "gif"}
+HASHED = re.compile(r"^products/(?P<digest>[0-9a-f]{16})(-(?P<size>\w+))?\.(?P<ext>\w+)$")
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _write(path: str, data: bytes) -> None:
+    if os.path.exists(path):
+        return  # mismo hash, mismo contenido
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _encode(img, fmt: str) -> bytes:
+    from PIL import Image
+
+    pil_format, options = FORMATS[fmt]
+    if pil_format == "JPEG" and img.mode != "RGB":
+        # JPEG no tiene alfa: fondo blanco en vez de negro.
+        rgba = img.convert("RGBA")
+        bg = Image.new("RGB", rgba.size, (255, 255, 255))
+        bg.paste(rgba, mask=rgba.getchannel("A"))
+        img = bg
+    buf = BytesIO()
+    img.save(buf, pil_format, **options)
+    return buf.getvalue()
+
+
+def store(data: bytes) -> str:
+    """Guarda la imagen y sus miniaturas; devuelve el `image_path` (`/media/products/...`)."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        img = Image.open(BytesIO(data))
+        img.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise InvalidImage("El archivo no es una imagen válida") from e
+    except Image.DecompressionBombError as e:
+        raise InvalidImage("La imagen es demasiado grande") from e
+    ext = ALLOWED.get((img.format or "").lower())
+    if not ext:
+        raise InvalidImage(f"Formato de imagen no soportado: {img.format}")
+
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    folder = os.path.join(current_app.config["MEDIA_ROOT"], "products")
+    os.makedirs(folder, exist_ok=True)
+    _write(os.path.join(folder, f"{digest}.{ext}"), data)
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "P") else "RGB")
+    for size, px in SIZES.items():
+        variant = img.copy()
+        variant.thumbnail((px, px), Image.Resampling.LANCZOS)
+        for fmt in FORMATS:
+            _write(os.path.join(folder, f"{digest}-{size}.{fmt}"), _encode(variant, fmt))
+    return f"/media/products/{digest}.{ext}"
+
+
+def variant_url(image_path: str | None, size: str = "thumb", fmt: str = "webp") -> str | None:
+    """URL de la miniatura; imágenes antiguas sin procesar devuelven el original."""
+    if not image_path:
+        return None
+    m = HASHED.match(image_path.removeprefix("/media/"))
+    if not m or m.group("size"):
+        return image_path
+    return f"/media/products/{m.group('digest')}-{size}.{fmt}"
+
+
+def is_immutable(filename: str) -> bool:
+    return HASHED.match(filename) is not None
+
+
+def backfill(batch_size: int = 100) -> tuple[int, list[str]]:
+    """Reprocesa productos con imágenes subidas antes del pipeline. Devuelve (procesadas, faltantes)."""
+    from .extensions import db
+    from .models import Product
+
+    done, missing = 0, []
+    media = current_app.config["MEDIA_ROOT"]
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Product.id, Product.image_path)
+            .filter(Product.id > last_id, Product.image_path.is_not(None))
+            .order_by(Product.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for pid, path in rows:
+            name = path.removeprefix("/media/")
+            if is_immutable(name):
+                continue
+            source = os.path.join(media, name)
+            if not os.path.isfile(source):
+                missing.append(path)
+                continue
+            with open(source, "rb") as f:
+                try:
+                    new_path = store(f.read())
+                except InvalidImage:
+                    missing.append(path)
+                    continue
+            db.session.execute(db.update(Product).where(Product.id == pid).values(image_path=new_path))
+            done += 1
+        db.session.commit()
+    return done, missing
@@ -0,0 +1,170 @@
+"""Tiempos y SQL por request: `Server-Timing`, log de requests lentos y `/metrics`.
+
+Las métricas viven en memoria de cada worker de gunicorn (con `pid` como
+etiqueta): Prometheus debe raspar cada worker o sumar por `pid`.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any
+
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import dbpool
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+MAX_LOGGED_STATEMENTS = 50
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_seconds: float = 0.0
+    slowest: tuple[float, str] = (0.0, "")
+    statements: list[tuple[float, str]] = field(default_factory=list)
+
+    def add(self, seconds: float, statement: str) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest[0]:
+            self.slowest = (seconds, statement)
+        if len(self.statements) < MAX_LOGGED_STATEMENTS:
+            self.statements.append((seconds, statement))
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...], labels: tuple[str, ...]) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        # Por serie: conteo por bucket (no acumulado), +Inf, suma, total.
+        with self._lock:
+            s = self._series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0, 0])
+            s[bisect_left(self.buckets, value)] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self, extra: str) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for values, s in sorted(series.items()):
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, values)) + extra
+            acc = 0
+            for le, n in zip([*map(_num, self.buckets), "+Inf"], s[:-2]):
+                acc += n
+                lines.append(f'{self.name}_bucket{{{base},le="{le}"}} {int(acc)}')
+            lines.append(f"{self.name}_sum{{{base}}} {s[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {int(s[-1])}")
+        return lines
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+LABELS = ("endpoint", "method")
+REQUEST_SECONDS = Histogram(
+    "petmaison_request_duration_seconds", "Duración total del request (incluye streaming)", SECONDS_BUCKETS, LABELS
+)
+DB_SECONDS = Histogram("petmaison_request_db_seconds", "Tiempo en SQL por request", SECONDS_BUCKETS, LABELS)
+DB_QUERIES = Histogram("petmaison_request_queries", "Sentencias SQL por request", QUERY_BUCKETS, LABELS)
+_status_lock = threading.Lock()
+_status_counts: dict[tuple[str, str, str], int] = {}
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["instrument_t0"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.pop("instrument_t0", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context():
+        stats = g.get("request_stats")
+        if stats is not None:
+            stats.add(elapsed, statement)
+
+
+def _finish(app: Flask, stats: RequestStats, labels: tuple[str, str], status: int, path: str) -> None:
+    total = time.perf_counter() - stats.started
+    REQUEST_SECONDS.observe(labels, total)
+    DB_SECONDS.observe(labels, stats.db_seconds)
+    DB_QUERIES.observe(labels, stats.queries)
+    key = (*labels, str(status))
+    with _status_lock:
+        _status_counts[key] = _status_counts.get(key, 0) + 1
+
+    threshold = app.config.get("SLOW_REQUEST_MS", 500)
+    if threshold and total * 1000 >= threshold:
+        sql = "\n".join(f"  [{s * 1000:.1f} ms] {text}" for s, text in stats.statements)
+        app.logger.warning(
+            "Request lento %s %s (%s): %.1f ms, SQL %.1f ms en %d consultas; más lenta %.1f ms\n%s",
+            labels[1],
+            path,
+            labels[0],
+            total * 1000,
+            stats.db_seconds * 1000,
+            stats.queries,
+            stats.slowest[0] * 1000,
+            sql,
+        )
+
+
+def init_app(app: Flask) -> None:
+    @app.before_request
+    def _start() -> None:
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def _timing(response: Response) -> Response:
+        stats: RequestStats | None = g.get("request_stats")
+        if stats is None:
+            return response
+        elapsed = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_seconds * 1000
+        response.headers["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{stats.queries} consultas", '
+            f"app;dur={max(elapsed - db_ms, 0):.1f}, total;dur={elapsed:.1f}"
+        )
+        # Las respuestas en streaming siguen consultando (y sumando a `stats`)
+        # hasta cerrarse: métricas y log de lentos se registran ahí.
+        labels = (request.endpoint or "sin_ruta", request.method)
+        status, path = response.status_code, request.path
+        response.call_on_close(lambda: _finish(app, stats, labels, status, path))
+        return response
+
+
+def render_metrics() -> str:
+    extra = f',pid="{os.getpid()}"'
+    lines: list[str] = []
+    for hist in (REQUEST_SECONDS, DB_SECONDS, DB_QUERIES):
+        lines += hist.render(extra)
+    lines += ["# HELP petmaison_requests_total Requests por endpoint y status", "# TYPE petmaison_requests_total counter"]
+    with _status_lock:
+        counts = dict(_status_counts)
+    for (endpoint, method, status), n in sorted(counts.items()):
+        lines.append(f'petmaison_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"{extra}}} {n}')
+    pool: dict[str, Any] = dbpool.pool_stats()
+    for key, kind in (("checked_out", "gauge"), ("overflow", "gauge"), ("checkouts", "counter"), ("wait_max_ms", "gauge")):
+        if key in pool:
+            name = f"petmaison_db_pool_{key}"
+            lines += [f"# TYPE {name} {kind}", f"{name}{{{extra[1:]}}} {pool[key]}"]
+    return "\n".join(lines) + "\n"
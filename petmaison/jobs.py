@@ -0,0 +1,266 @@
+"""Cola de trabajos en segundo plano sobre la tabla `jobs`, sin broker externo.
+
+La web encola con `enqueue()` y responde de inmediato; `flask worker` toma
+los trabajos de a uno (`FOR UPDATE SKIP LOCKED` en PostgreSQL más un UPDATE
+condicional, así dos workers nunca toman el mismo), ejecuta la tarea
+registrada con `@task` y deja el resultado en `MEDIA_ROOT/jobs/<token>/`.
+Esos archivos no se sirven por `/media` (son privados): se descargan por
+`/jobs/<id>/download`.
+
+Un thread del worker escribe latido y progreso cada `JOB_HEARTBEAT_SECONDS`
+por una conexión aparte, sin tocar la transacción ni los cursores
+`yield_per` de la tarea. En SQLite eso bloquearía la base: ahí el progreso
+se ve recién al terminar. Un RUNNING sin latido por `JOB_STALE_SECONDS`
+(worker muerto) se reencola hasta `JOB_MAX_ATTEMPTS` intentos.
+"""
+from __future__ import annotations
+
+import inspect
+import os
+import shutil
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from flask import Flask, current_app
+
+from .extensions import db
+from .models import Job
+
+TASKS: dict[str, Callable[..., None]] = {}
+RESULTS_DIR = "jobs"
+
+
+class UnknownJob(ValueError):
+    pass
+
+
+def task(kind: str) -> Callable:
+    """Registra `f(ctx, **params)` como tarea `kind`; los params deben ser JSON."""
+
+    def decorator(f):
+        TASKS[kind] = f
+        return f
+
+    return decorator
+
+
+def _load_tasks() -> None:
+    from . import tasks  # noqa: F401  (registra las tareas)
+
+
+class JobContext:
+    """Lo que ve una tarea: cómo informar progreso y dónde dejar el resultado."""
+
+    def __init__(self, job: Job) -> None:
+        self.job_id = job.id
+        self.done = 0
+        self.total: int | None = None
+        self.message: str | None = None
+        self.result_path: str | None = None
+
+    def progress(self, done: int, total: int | None = None, message: str | None = None) -> None:
+        # Solo memoria: el latido lo escribe en la base.
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message[:255]
+
+    def output(self, filename: str) -> str:
+        """Ruta absoluta donde escribir el archivo resultado (uno por trabajo)."""
+        self.result_path = f"{RESULTS_DIR}/{os.urandom(8).hex()}/{filename}"
+        path = os.path.join(current_app.config["MEDIA_ROOT"], self.result_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def values(self) -> dict[str, Any]:
+        return {"done": self.done, "total": self.total, "message": self.message}
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, app: Flask, ctx: JobContext) -> None:
+        super().__init__(name=f"job-{ctx.job_id}-heartbeat", daemon=True)
+        self.app = app
+        self.ctx = ctx
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        interval = self.app.config["JOB_HEARTBEAT_SECONDS"]
+        with self.app.app_context():
+            while not self.stopped.wait(interval):
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(
+                            db.update(Job)
+                            .where(Job.id == self.ctx.job_id)
+                            .values(heartbeat_at=datetime.utcnow(), **self.ctx.values())
+                        )
+                except Exception:  # un latido perdido no debe matar la tarea
+                    self.app.logger.exception("Latido del trabajo %s", self.ctx.job_id)
+
+
+def enqueue(kind: str, params: dict[str, Any] | None = None, user_id: int | None = None) -> Job:
+    _load_tasks()
+    fn = TASKS.get(kind)
+    if fn is None:
+        raise UnknownJob(f"Tipo de trabajo desconocido: {kind}")
+    params = params or {}
+    try:
+        inspect.signature(fn).bind(None, **params)
+    except TypeError as e:
+        raise UnknownJob(f"Parámetros inválidos para {kind}: {e}") from None
+    job = Job(kind=kind, params=params, user_id=user_id)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def get_for_user(job_id: int, user: Any) -> Job | None:
+    """El trabajo si es del usuario (los admin ven todos)."""
+    job = db.session.get(Job, job_id)
+    if job is None or (job.user_id != user.id and getattr(user, "role", "") != "admin"):
+        return None
+    return job
+
+
+def result_file(job: Job) -> str | None:
+    if job.status != "DONE" or not job.result_path:
+        return None
+    path = os.path.join(current_app.config["MEDIA_ROOT"], job.result_path)
+    return path if os.path.isfile(path) else None
+
+
+def claim(worker: str) -> Job | None:
+    """Marca RUNNING el trabajo QUEUED más antiguo y lo devuelve."""
+    job_id = db.session.execute(
+        db.select(Job.id)
+        .filter(Job.status == "QUEUED")
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+    if job_id is None:
+        db.session.rollback()
+        return None
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        db.update(Job)
+        .where(Job.id == job_id, Job.status == "QUEUED")
+        .values(status="RUNNING", worker=worker, started_at=now, heartbeat_at=now, attempts=Job.attempts + 1)
+    ).rowcount
+    db.session.commit()
+    return db.session.get(Job, job_id) if claimed else None
+
+
+def run(job: Job) -> None:
+    """Ejecuta un trabajo ya tomado y registra el resultado; nunca levanta."""
+    app = current_app._get_current_object()
+    ctx, kind = JobContext(job), job.kind
+    beat = _Heartbeat(app, ctx) if db.engine.dialect.name != "sqlite" else None
+    if beat:
+        beat.start()
+    status, error = "DONE", None
+    try:
+        TASKS[kind](ctx, **job.params)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        status, error = "FAILED", f"{type(e).__name__}: {e}"
+        app.logger.error("Trabajo %s (%s) falló\n%s", ctx.job_id, kind, traceback.format_exc())
+        _remove(ctx.result_path)
+        ctx.result_path = None
+    finally:
+        if beat:
+            beat.stopped.set()
+            beat.join()
+    now = datetime.utcnow()
+    db.session.execute(
+        db.update(Job)
+        .where(Job.id == ctx.job_id)
+        .values(
+            status=status,
+            error=error,
+            result_path=ctx.result_path,
+            finished_at=now,
+            heartbeat_at=now,
+            **ctx.values(),
+        )
+    )
+    db.session.commit()
+
+
+def requeue_stale(now: datetime | None = None) -> int:
+    """Reencola (o da por fallidos) los RUNNING cuyo worker dejó de latir."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config["JOB_STALE_SECONDS"])
+    stale = db.and_(Job.status == "RUNNING", Job.heartbeat_at < cutoff)
+    max_attempts = current_app.config["JOB_MAX_ATTEMPTS"]
+    failed = db.session.execute(
+        db.update(Job)
+        .where(stale, Job.attempts >= max_attempts)
+        .values(status="FAILED", error="El worker se detuvo durante el trabajo", finished_at=now)
+    ).rowcount
+    requeued = db.session.execute(db.update(Job).where(stale).values(status="QUEUED", worker=None)).rowcount
+    db.session.commit()
+    return failed + requeued
+
+
+def _remove(result_path: str | None) -> None:
+    if result_path:
+        folder = os.path.dirname(os.path.join(current_app.config["MEDIA_ROOT"], result_path))
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def purge(now: datetime | None = None) -> int:
+    """Borra trabajos terminados hace más de `JOB_RESULT_TTL_HOURS` y sus archivos."""
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=current_app.config["JOB_RESULT_TTL_HOURS"])
+    old = db.session.execute(
+        db.select(Job.id, Job.result_path).filter(Job.status.in_(("DONE", "FAILED")), Job.finished_at < cutoff)
+    ).all()
+    for _, path in old:
+        _remove(path)
+    if old:
+        db.session.execute(db.delete(Job).where(Job.id.in_([job_id for job_id, _ in old])))
+    db.session.commit()
+    return len(old)
+
+
+def work(burst: bool = False, poll: float = 1.0, worker: str | None = None) -> int:
+    """Bucle del worker. Con `burst` termina al vaciar la cola. Devuelve los trabajos ejecutados.
+
+    SIGTERM / SIGINT dejan terminar el trabajo en curso y salen.
+    """
+    _load_tasks()
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    stopping = threading.Event()
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous[sig] = signal.signal(sig, lambda *_: stopping.set())
+    processed, next_maintenance = 0, 0.0
+    try:
+        while not stopping.is_set():
+            if time.monotonic() >= next_maintenance:
+                requeue_stale()
+                purge()
+                next_maintenance = time.monotonic() + current_app.config["JOB_MAINTENANCE_SECONDS"]
+            job = claim(worker)
+            if job is None:
+                db.session.remove()
+                if burst:
+                    break
+                stopping.wait(poll)
+                continue
+            current_app.logger.info("Trabajo %s (%s) tomado por %s", job.id, job.kind, worker)
+            run(job)
+            processed += 1
+            db.session.remove()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    return processed
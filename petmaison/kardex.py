@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import groupby
+from typing import Any
+
+from .dbutils import upsert
+from .extensions import db
+from .models import Product, StockMovement, StockSnapshot
+from .stock import weighted_average
+
+PER_PAGE = 100
+SNAPSHOT_CHUNK = 1000
+
+SIGNED_QTY = db.case((StockMovement.type == "OUT", -StockMovement.qty), else_=StockMovement.qty)
+
+
+@dataclass
+class KardexPage:
+    opening: int
+    rows: list[tuple[Any, int]] = field(default_factory=list)  # (movimiento, saldo)
+    next_cursor: str | None = None
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def opening_balance(product: Product, fro: datetime | None) -> int:
+    """Stock al inicio de `fro`: snapshot mensual más cercano + movimientos desde su cierre."""
+    signed = db.func.coalesce(db.func.sum(SIGNED_QTY), 0)
+    if fro is None:
+        # Stock inicial (cargado al crear el producto, sin movimiento asociado).
+        total = db.session.execute(
+            db.select(signed).filter(StockMovement.product_id == product.id)
+        ).scalar()
+        return product.stock - total
+    snap = db.session.execute(
+        db.select(StockSnapshot)
+        .filter(StockSnapshot.product_id == product.id, StockSnapshot.period < month_start(fro))
+        .order_by(StockSnapshot.period.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if snap is None:
+        after = db.session.execute(
+            db.select(signed).filter(StockMovement.product_id == product.id, StockMovement.created_at >= fro)
+        ).scalar()
+        return product.stock - after
+    gap = db.session.execute(
+        db.select(signed).filter(
+            StockMovement.product_id == product.id,
+            StockMovement.created_at >= next_month(snap.period),
+            StockMovement.created_at < fro,
+        )
+    ).scalar()
+    return snap.qty + gap
+
+
+def page(
+    product: Product,
+    fro: datetime | None,
+    to: datetime | None,
+    cursor: str | None = None,
+    per_page: int = PER_PAGE,
+) -> KardexPage:
+    """Movimientos del rango con saldo corrido, de a `per_page`.
+
+    El cursor lleva el último movimiento y su saldo, así que las páginas
+    siguientes no vuelven a calcular el saldo inicial.
+    """
+    q = db.select(StockMovement).filter(StockMovement.product_id == product.id)
+    if fro:
+        q = q.filter(StockMovement.created_at >= fro)
+    if to:
+        q = q.filter(StockMovement.created_at < to)
+    after = _decode(cursor)
+    if after:
+        created_at, last_id, balance = after
+        q = q.filter(db.tuple_(StockMovement.created_at, StockMovement.id) > db.tuple_(created_at, last_id))
+        opening = balance
+    else:
+        opening = opening_balance(product, fro)
+    movements = list(
+        db.session.execute(
+            q.order_by(StockMovement.created_at.asc(), StockMovement.id.asc()).limit(per_page + 1)
+        ).scalars()
+    )
+    result = KardexPage(opening=opening)
+    balance = opening
+    for m in movements[:per_page]:
+        balance += -m.qty if m.type == "OUT" else m.qty
+        result.rows.append((m, balance))
+    if len(movements) > per_page:
+        last = movements[per_page - 1]
+        result.next_cursor = _encode(last.created_at, last.id, balance)
+    return result
+
+
+def close_months(until: date | None = None) -> int:
+    """Genera snapshots para cada mes completo aún sin cerrar, hasta `until` (exclusive).
+
+    Solo escribe filas para productos con movimientos en el mes: si no hubo
+    movimientos, el snapshot anterior sigue vigente. Devuelve filas escritas.
+    """
+    until = month_start(until or datetime.utcnow())
+    last = db.session.execute(db.select(db.func.max(StockSnapshot.period))).scalar()
+    if last:
+        period = next_month(last)
+    else:
+        first = db.session.execute(db.select(db.func.min(StockMovement.created_at))).scalar()
+        if first is None:
+            return 0
+        period = month_start(first)
+    written = 0
+    while period < until:
+        written += _close_month(period)
+        period = next_month(period)
+    db.session.commit()
+    return written
+
+
+def _close_month(period: date) -> int:
+    window = db.and_(StockMovement.created_at >= period, StockMovement.created_at < next_month(period))
+    month_ids = db.select(StockMovement.product_id).filter(window).distinct()
+    state = _previous_state(month_ids, period)
+    if not state:
+        return 0
+    movements = db.session.execute(
+        db.select(
+            StockMovement.product_id, StockMovement.type, StockMovement.qty, StockMovement.unit_cost_net
+        )
+        .filter(window)
+        .order_by(StockMovement.product_id, StockMovement.created_at, StockMovement.id)
+        .execution_options(yield_per=SNAPSHOT_CHUNK)
+    )
+    rows = []
+    for pid, group in groupby(movements, key=lambda m: m.product_id):
+        qty, avg = state[pid]
+        for m in group:
+            if m.type == "OUT":
+                qty -= m.qty
+                continue
+            if m.type == "IN" and m.unit_cost_net is not None:
+                avg = weighted_average(qty, avg, m.qty, m.unit_cost_net)
+            qty += m.qty
+        rows.append({"product_id": pid, "period": period, "qty": qty, "avg_cost": avg.quantize(Decimal("0.01"))})
+    for i in range(0, len(rows), SNAPSHOT_CHUNK):
+        db.session.execute(
+            upsert(
+                StockSnapshot,
+                rows[i : i + SNAPSHOT_CHUNK],
+                keys=["product_id", "period"],
+                overwrite=["qty", "avg_cost"],
+            )
+        )
+    return len(rows)
+
+
+def _previous_state(ids, period: date) -> dict[int, tuple[int, Decimal]]:
+    """(stock, costo promedio) al inicio de `period` de los productos del subquery `ids`."""
+    latest = (
+        db.select(StockSnapshot.product_id, db.func.max(StockSnapshot.period).label("period"))
+        .filter(StockSnapshot.product_id.in_(ids), StockSnapshot.period < period)
+        .group_by(StockSnapshot.product_id)
+        .subquery()
+    )
+    state = {
+        pid: (qty, avg)
+        for pid, qty, avg in db.session.execute(
+            db.select(StockSnapshot.product_id, StockSnapshot.qty, StockSnapshot.avg_cost).join(
+                latest,
+                db.and_(StockSnapshot.product_id == latest.c.product_id, StockSnapshot.period == latest.c.period),
+            )
+        )
+    }
+    # Primer cierre del producto: stock inicial = stock actual - todos sus movimientos
+    # (el stock cargado al crear el producto no tiene movimiento asociado).
+    before = db.func.sum(db.case((StockMovement.created_at < period, SIGNED_QTY), else_=0))
+    first_close = db.session.execute(
+        db.select(Product.id, Product.stock, Product.cost_net, db.func.sum(SIGNED_QTY), before)
+        .join(StockMovement, StockMovement.product_id == Product.id)
+        .filter(Product.id.in_(ids), Product.id.not_in(db.select(latest.c.product_id)))
+        .group_by(Product.id, Product.stock, Product.cost_net)
+    )
+    for pid, stock, cost, total, prior in first_close:
+        state[pid] = (stock - (total or 0) + (prior or 0), cost)
+    return state
+
+
+def _encode(created_at: datetime, movement_id: int, balance: int) -> str:
+    raw = json.dumps([created_at.isoformat(), movement_id, balance]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str | None) -> tuple[datetime, int, int] | None:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, movement_id, balance = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(movement_id), int(balance)
+    except (ValueError, TypeError):
+        return None
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from datetime import datetime
+import re
+from datetime import date, datetime
 from decimal import Decimal
 
 from flask_login import UserMixin
-from sqlalchemy import CheckConstraint, Enum, ForeignKey, Index, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import DDL, CheckConstraint, Enum, ForeignKey, Index, String, event
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from .extensions import db
 
@@ -17,6 +18,7 @@ ORDER_STATUS = ("NEW", "PREPARATION", "OUT_FOR_DELIVERY", "DELIVERED", "CANCELLE
 PAYMENT_METHOD = ("EFECTIVO", "TRANSFERENCIA", "TARJETA")
 STOCK_TYPE = ("IN", "OUT", "ADJUSTMENT")
 STOCK_REF = ("PURCHASE", "SALE", "ORDER", "ADJUSTMENT")
+JOB_STATUS = ("QUEUED", "RUNNING", "DONE", "FAILED")
 
 
 class TimestampMixin:
@@ -40,8 +42,36 @@ class User(db.Model, UserMixin, TimestampMixin):
         return f"<User {self.id} {self.email} {self.role}>"
 
 
+def rut_key(rut: str | None) -> str | None:
+    """RUT sin puntos ni guion, DV en mayúscula: `12.345.678-k` → `12345678K`."""
+    return re.sub(r"[^0-9K]", "", (rut or "").upper()) or None
+
+
+def phone_key(phone: str | None) -> str | None:
+    """Solo dígitos y sin el 56 de Chile: `+56 9 1234 5678` → `912345678`."""
+    digits = re.sub(r"\D", "", phone or "")
+    if digits.startswith("56") and (len(digits) == 11 or (phone or "").lstrip().startswith("+")):
+        digits = digits[2:]
+    return digits or None
+
+
+def email_key(email: str | None) -> str | None:
+    return (email or "").strip().lower() or None
+
+
+def _prefix_index(name: str, column: str) -> Index:
+    # `LIKE 'abc%'` usa el índice en PostgreSQL solo con text_pattern_ops.
+    return Index(name, column, postgresql_ops={column: "text_pattern_ops"})
+
+
 class Customer(db.Model, TimestampMixin):
     __tablename__ = "customers"
+    __table_args__ = (
+        # Búsqueda por prefijo en la caja (ver customers.search)
+        _prefix_index("ix_customers_rut_key", "rut_key"),
+        _prefix_index("ix_customers_phone_key", "phone_key"),
+        _prefix_index("ix_customers_email_key", "email_key"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
@@ -51,11 +81,45 @@ class Customer(db.Model, TimestampMixin):
     address: Mapped[str | None] = mapped_column(String(255))
     comuna: Mapped[str | None] = mapped_column(String(100))
     balance: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    # Formas normalizadas de rut / phone / email, mantenidas por `_keys`
+    rut_key: Mapped[str | None] = mapped_column(String(20))
+    phone_key: Mapped[str | None] = mapped_column(String(50))
+    email_key: Mapped[str | None] = mapped_column(String(255))
+    stats = relationship("CustomerStats", uselist=False, cascade="all, delete-orphan")
+
+    @validates("rut", "phone", "email")
+    def _keys(self, field: str, value: str | None) -> str | None:
+        normalize = {"rut": rut_key, "phone": phone_key, "email": email_key}[field]
+        setattr(self, f"{field}_key", normalize(value))
+        return value
 
     def __repr__(self) -> str:
         return f"<Customer {self.id} {self.name}>"
 
 
+class CustomerStats(db.Model):
+    """Totales de venta por cliente; se suman al confirmar (customers.record_sale)."""
+
+    __tablename__ = "customer_stats"
+
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    tickets: Mapped[int] = mapped_column(default=0, nullable=False)
+    total: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    first_sale_at: Mapped[datetime] = mapped_column(nullable=False)
+    last_sale_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    @property
+    def avg_ticket(self) -> Decimal:
+        return (self.total / self.tickets).quantize(Decimal("1")) if self.tickets else Decimal("0")
+
+    @property
+    def days_between_tickets(self) -> float | None:
+        """Frecuencia de compra: días promedio entre la primera y la última venta."""
+        if self.tickets < 2:
+            return None
+        return round((self.last_sale_at - self.first_sale_at).total_seconds() / 86400 / (self.tickets - 1), 1)
+
+
 class Supplier(db.Model, TimestampMixin):
     __tablename__ = "suppliers"
 
@@ -84,6 +148,10 @@ class Product(db.Model, TimestampMixin):
     category: Mapped[str | None] = mapped_column(String(255))
     description: Mapped[str | None] = mapped_column(String(1024))
     cost_net: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), nullable=False)
+    # Costo promedio ponderado del stock (lo mantiene `stock`); al crear, el costo de lista.
+    avg_cost: Mapped[Decimal] = mapped_column(
+        db.Numeric(18, 2), default=lambda ctx: ctx.get_current_parameters()["cost_net"], nullable=False
+    )
     price_gross: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), nullable=False)
     vat_included: Mapped[bool] = mapped_column(default=True, nullable=False)
     stock: Mapped[int] = mapped_column(default=0, nullable=False)
@@ -125,7 +193,13 @@ class PurchaseItem(db.Model):
 
 class Sale(db.Model, TimestampMixin):
     __tablename__ = "sales"
-    __table_args__ = (Index("ix_sales_date", "date"),)
+    __table_args__ = (
+        Index("ix_sales_date", "date"),
+        # Reportes por período: filtra status + rango de fechas y suma total sin tocar la tabla
+        Index("ix_sales_status_date", "status", "date", postgresql_include=["total"]),
+        # Historial de un cliente, más reciente primero
+        Index("ix_sales_customer_id_date", "customer_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     customer_id: Mapped[int | None] = mapped_column(ForeignKey("customers.id"))
@@ -183,5 +257,150 @@ class StockMovement(db.Model):
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False, index=True)
 
 
+class StockSnapshot(db.Model):
+    """Cierre mensual por producto: stock y costo promedio ponderado al fin del mes."""
+
+    __tablename__ = "stock_snapshots"
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    period: Mapped[date] = mapped_column(primary_key=True)  # primer día del mes cerrado
+    qty: Mapped[int] = mapped_column(nullable=False)
+    avg_cost: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+
+
+class SalesDailyRollup(db.Model):
+    """Ventas confirmadas agregadas por día y producto (mantenida en `confirm_sale`)."""
+
+    __tablename__ = "sales_daily_rollup"
+
+    day: Mapped[date] = mapped_column(primary_key=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    product = relationship("Product")
+    units: Mapped[int] = mapped_column(default=0, nullable=False)
+    net: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    vat: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    total: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    tickets: Mapped[int] = mapped_column(default=0, nullable=False)
+
+
+class SalesPeriodTotal(db.Model):
+    """Totales de `/api/reports/sales` por período: los llena `rollups.rebuild` y los suma `rollups.apply_sale`."""
+
+    __tablename__ = "sales_period_totals"
+
+    unit: Mapped[str] = mapped_column(String(8), primary_key=True)
+    period: Mapped[date] = mapped_column(primary_key=True)
+    total: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+
+
+class SalesDailyTotal(db.Model):
+    """Totales por día; los tickets no se pueden sumar desde el rollup por producto."""
+
+    __tablename__ = "sales_daily_totals"
+
+    day: Mapped[date] = mapped_column(primary_key=True)
+    net: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    vat: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    total: Mapped[Decimal] = mapped_column(db.Numeric(18, 2), default=Decimal("0"), nullable=False)
+    tickets: Mapped[int] = mapped_column(default=0, nullable=False)
+
+
+class IdempotencyKey(db.Model):
+    """Resultado de un POST ya procesado (ver `petmaison/idempotency.py`)."""
+
+    __tablename__ = "idempotency_keys"
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(16), nullable=False)
+    status_code: Mapped[int] = mapped_column(default=0, nullable=False)  # 0 = en curso
+    location: Mapped[str | None] = mapped_column(String(255))
+    body: Mapped[bytes | None] = mapped_column(db.LargeBinary)
+    mimetype: Mapped[str | None] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False, index=True)
+
+
+class Job(db.Model):
+    """Trabajo en segundo plano (ver `petmaison/jobs.py`)."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # El worker toma el QUEUED más antiguo; la UI lista los del usuario.
+        Index("ix_jobs_status_id", "status", "id"),
+        Index("ix_jobs_user_id_id", "user_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    params: Mapped[dict] = mapped_column(db.JSON, default=dict, nullable=False)
+    status: Mapped[str] = mapped_column(db.Enum(*JOB_STATUS, name="job_status"), default="QUEUED", nullable=False)
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"))
+    done: Mapped[int] = mapped_column(default=0, nullable=False)
+    total: Mapped[int | None]
+    message: Mapped[str | None] = mapped_column(String(255))
+    result_path: Mapped[str | None] = mapped_column(String(255))  # relativo a MEDIA_ROOT
+    error: Mapped[str | None] = mapped_column(db.Text)
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    worker: Mapped[str | None] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    started_at: Mapped[datetime | None]
+    heartbeat_at: Mapped[datetime | None]
+    finished_at: Mapped[datetime | None]
+
+    @property
+    def percent(self) -> int | None:
+        if self.status == "DONE":
+            return 100
+        if not self.total:
+            return None
+        return min(100, int(self.done * 100 / self.total))
+
+
 Index("ix_products_created_at", Product.created_at)
 Index("ix_products_updated_at", Product.updated_at)
+# Alertas de reposición (petmaison/reorder.py): índice parcial con solo los
+# productos bajo mínimo; la base lo mantiene con cada cambio de stock.
+LOW_STOCK = db.and_(Product.active.is_(True), Product.stock <= Product.min_stock)
+Index("ix_products_low_stock", Product.id, postgresql_where=LOW_STOCK, sqlite_where=LOW_STOCK)
+# Paginación keyset (petmaison/pagination.py) sobre (created_at, id)
+Index("ix_customers_created_at_id", Customer.created_at, Customer.id)
+Index("ix_suppliers_created_at_id", Supplier.created_at, Supplier.id)
+Index("ix_purchases_created_at_id", Purchase.created_at, Purchase.id)
+Index("ix_sales_created_at_id", Sale.created_at, Sale.id)
+Index("ix_orders_created_at_id", Order.created_at, Order.id)
+# Kardex: movimientos de un producto en un rango de fechas, en orden
+Index("ix_stock_movements_product_id_created_at", StockMovement.product_id, StockMovement.created_at, StockMovement.id)
+# Salida de una venta para un producto (margen por línea de venta)
+Index("ix_stock_movements_ref", StockMovement.ref_type, StockMovement.ref_id, StockMovement.product_id)
+
+
+# Índices de búsqueda de productos (ver petmaison/search.py). En PostgreSQL,
+# GIN trigram sobre nombre y SKU; en SQLite (dev) una tabla FTS5 de contenido
+# externo sincronizada por triggers. Se crean junto con `products` en
+# `create_all` y vía la migración correspondiente en bases existentes.
+PRODUCT_SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_sku_trgm ON products USING gin (sku gin_trgm_ops)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "name, sku, content='products', content_rowid='id', "
+        "tokenize=\"unicode61 remove_diacritics 2 tokenchars '-_.'\")",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+        "INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, sku ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku); "
+        "INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku); END",
+    ],
+}
+
+for _dialect, _statements in PRODUCT_SEARCH_DDL.items():
+    for _stmt in _statements:
+        event.listen(Product.__table__, "after_create", DDL(_stmt).execute_if(dialect=_dialect))
+event.listen(Product.__table__, "before_drop", DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from .extensions import db
+
+PER_PAGE = 50
+
+
+@dataclass
+class Page:
+    items: list[Any] = field(default_factory=list)
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+def paginate(query, model: Any, cursor: str | None = None, per_page: int = PER_PAGE) -> Page:
+    """Paginación keyset sobre `(created_at, id)`, más recientes primero.
+
+    Cada página cuesta un `ORDER BY ... LIMIT per_page + 1` sobre el índice,
+    sin importar cuántas filas haya antes. Un cursor inválido o vencido
+    simplemente vuelve a la primera página.
+    """
+    key = db.tuple_(model.created_at, model.id)
+    direction, after = decode_cursor(cursor)
+    if after is not None:
+        query = query.filter(key < db.tuple_(*after) if direction == "next" else key > db.tuple_(*after))
+    if direction == "next":
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+    rows = list(db.session.execute(query.limit(per_page + 1)).scalars())
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == "prev":
+        rows.reverse()
+    has_next = more if direction == "next" else after is not None
+    has_prev = after is not None if direction == "next" else more
+    return Page(
+        items=rows,
+        next_cursor=encode_cursor("next", rows[-1]) if rows and has_next else None,
+        prev_cursor=encode_cursor("prev", rows[0]) if rows and has_prev else None,
+    )
+
+
+def encode_cursor(direction: str, row: Any) -> str:
+    raw = json.dumps([direction, row.created_at.isoformat(), row.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple[str, tuple[datetime, int] | None]:
+    if not cursor:
+        return "next", None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, created_at, row_id = json.loads(raw)
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return direction, (datetime.fromisoformat(created_at), int(row_id))
+    except (ValueError, TypeError):
+        return "next", None
@@ -0,0 +1,274 @@
+"""Foto del catálogo en memoria de cada worker, para la caja y `/api/products`.
+
+Precio, stock y SKU de todos los productos en arreglos compactos (`array` y
+listas paralelas, ordenados por id): buscar por id, SKU o prefijo de SKU
+(lo que tipea el lector de códigos) es un `bisect`, sin ir a la base.
+
+Se carga en el primer uso y se refresca a lo más cada
+`PRODUCT_CACHE_REFRESH_SECONDS` con una consulta sobre `ix_products_updated_at`:
+si el conteo y el `max(updated_at)` no cambiaron no hace nada más; si no,
+trae las filas cambiadas desde la última vez (con `OVERLAP` de margen para
+transacciones que confirmaron tarde) y las actualiza en su lugar. Altas
+de productos rearman la foto en memoria; bajas (el conteo no cuadra), la
+recargan entera. Entre refrescos un precio puede tener hasta ese atraso.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterable, Iterator
+
+from flask import current_app
+
+from .extensions import db
+from .models import Product
+from .pagination import Page, decode_cursor, encode_cursor
+
+OVERLAP = timedelta(seconds=10)
+EPOCH = datetime(1970, 1, 1)
+ACTIVE, VAT_INCLUDED = 1, 2
+COLUMNS = (
+    Product.id,
+    Product.sku,
+    Product.name,
+    Product.brand,
+    Product.category,
+    Product.price_gross,
+    Product.vat_included,
+    Product.stock,
+    Product.active,
+    Product.created_at,
+    Product.updated_at,
+)
+
+
+class ProductRow:
+    """Vista de un producto de la foto (se arma al consultar)."""
+
+    __slots__ = (
+        "id",
+        "sku",
+        "name",
+        "brand",
+        "category",
+        "price_gross",
+        "vat_included",
+        "stock",
+        "active",
+        "created_at",
+    )
+
+    def __init__(self, *values: Any) -> None:
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+def _micros(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+class CatalogSnapshot:
+    __slots__ = (
+        "ids",
+        "skus",
+        "names",
+        "brands",
+        "categories",
+        "cents",
+        "stock",
+        "flags",
+        "created",
+        "watermark",
+        "_by_sku",
+        "_by_created",
+    )
+
+    def __init__(self, rows: Iterable[Any], watermark: datetime | None) -> None:
+        rows = sorted(rows, key=lambda r: r.id)
+        labels: dict[str | None, str | None] = {}  # marcas y categorías se repiten: una copia de cada una
+        self.ids = array("q", (r.id for r in rows))
+        self.skus = [r.sku for r in rows]
+        self.names = [r.name for r in rows]
+        self.brands = [labels.setdefault(r.brand, r.brand) for r in rows]
+        self.categories = [labels.setdefault(r.category, r.category) for r in rows]
+        self.cents = array("q", (int(r.price_gross * 100) for r in rows))
+        self.stock = array("q", (r.stock for r in rows))
+        self.flags = bytearray((ACTIVE if r.active else 0) | (VAT_INCLUDED if r.vat_included else 0) for r in rows)
+        self.created = array("q", (_micros(r.created_at) for r in rows))
+        self.watermark = watermark
+        self._by_sku = array("l", sorted(range(len(rows)), key=self.skus.__getitem__))
+        self._by_created = array("l", sorted(range(len(rows)), key=self._created_key))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _created_key(self, i: int) -> tuple[int, int]:
+        return self.created[i], self.ids[i]
+
+    def _row(self, i: int) -> ProductRow:
+        flags = self.flags[i]
+        return ProductRow(
+            self.ids[i],
+            self.skus[i],
+            self.names[i],
+            self.brands[i],
+            self.categories[i],
+            Decimal(self.cents[i]).scaleb(-2),
+            bool(flags & VAT_INCLUDED),
+            self.stock[i],
+            bool(flags & ACTIVE),
+            EPOCH + timedelta(microseconds=self.created[i]),
+        )
+
+    def rows(self) -> Iterator[ProductRow]:
+        return (self._row(i) for i in range(len(self)))
+
+    def position(self, product_id: int) -> int | None:
+        i = bisect_left(self.ids, product_id)
+        return i if i < len(self.ids) and self.ids[i] == product_id else None
+
+    def get(self, product_id: int) -> ProductRow | None:
+        i = self.position(product_id)
+        return None if i is None else self._row(i)
+
+    def by_sku(self, sku: str) -> ProductRow | None:
+        j = bisect_left(self._by_sku, sku, key=self.skus.__getitem__)
+        if j < len(self._by_sku) and self.skus[self._by_sku[j]] == sku:
+            return self._row(self._by_sku[j])
+        return None
+
+    def sku_prefix(self, prefix: str, limit: int = 10) -> list[ProductRow]:
+        """Productos activos cuyo SKU empieza con `prefix`, en orden de SKU."""
+        start = bisect_left(self._by_sku, prefix, key=self.skus.__getitem__)
+        end = bisect_right(self._by_sku, prefix + "\U0010ffff", lo=start, key=self.skus.__getitem__)
+        found = []
+        for j in range(start, end):
+            i = self._by_sku[j]
+            if self.flags[i] & ACTIVE:
+                found.append(self._row(i))
+                if len(found) == limit:
+                    break
+        return found
+
+    def page(
+        self,
+        cursor: str | None,
+        per_page: int,
+        category: str | None = None,
+        brand: str | None = None,
+        active: bool | None = None,
+    ) -> Page:
+        """Misma página (y cursores) que `pagination.paginate` sobre `Product` con esos filtros."""
+
+        def matches(i: int) -> bool:
+            return (
+                (category is None or self.categories[i] == category)
+                and (brand is None or self.brands[i] == brand)
+                and (active is None or bool(self.flags[i] & ACTIVE) == active)
+            )
+
+        direction, after = decode_cursor(cursor)
+        order = self._by_created
+        key = None if after is None else (_micros(after[0]), after[1])
+        if direction == "next":
+            start = len(order) if key is None else bisect_left(order, key, key=self._created_key)
+            candidates = (order[k] for k in range(start - 1, -1, -1))
+        else:
+            start = bisect_right(order, key, key=self._created_key)
+            candidates = (order[k] for k in range(start, len(order)))
+        rows = []
+        for i in candidates:
+            if matches(i):
+                rows.append(self._row(i))
+                if len(rows) > per_page:
+                    break
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == "prev":
+            rows.reverse()
+        has_next = more if direction == "next" else after is not None
+        has_prev = after is not None if direction == "next" else more
+        return Page(
+            items=rows,
+            next_cursor=encode_cursor("next", rows[-1]) if rows and has_next else None,
+            prev_cursor=encode_cursor("prev", rows[0]) if rows and has_prev else None,
+        )
+
+    def apply(self, changed: list[Any]) -> bool:
+        """Aplica filas cambiadas en su lugar. False si cambia la forma (altas o SKU nuevos)."""
+        positions = [self.position(r.id) for r in changed]
+        if any(i is None or self.skus[i] != r.sku for i, r in zip(positions, changed)):
+            return False
+        for i, r in zip(positions, changed):
+            self.names[i] = r.name
+            self.brands[i] = r.brand
+            self.categories[i] = r.category
+            self.cents[i] = int(r.price_gross * 100)
+            self.stock[i] = r.stock
+            self.flags[i] = (ACTIVE if r.active else 0) | (VAT_INCLUDED if r.vat_included else 0)
+        self.watermark = max(self.watermark, max(r.updated_at for r in changed))
+        return True
+
+
+def load() -> CatalogSnapshot:
+    rows = db.session.execute(db.select(*COLUMNS).execution_options(yield_per=5000)).all()
+    return CatalogSnapshot(rows, max((r.updated_at for r in rows), default=None))
+
+
+def refresh(snapshot: CatalogSnapshot) -> CatalogSnapshot:
+    """La misma foto actualizada, o una nueva si hubo altas o bajas."""
+    count, latest = db.session.execute(db.select(db.func.count(Product.id), db.func.max(Product.updated_at))).one()
+    if snapshot.watermark is None:
+        return load() if count else snapshot
+    # Una transacción que confirma tarde trae un updated_at menor que el último
+    # visto: se sigue mirando hacia atrás hasta que pase el margen.
+    if count == len(snapshot) and latest == snapshot.watermark and datetime.utcnow() - latest > OVERLAP:
+        return snapshot
+    changed = db.session.execute(db.select(*COLUMNS).filter(Product.updated_at >= snapshot.watermark - OVERLAP)).all()
+    added = sum(1 for r in changed if snapshot.position(r.id) is None)
+    if count != len(snapshot) + added:
+        return load()
+    if changed and not snapshot.apply(changed):
+        merged = {r.id: r for r in snapshot.rows()}
+        merged.update((r.id, r) for r in changed)
+        return CatalogSnapshot(merged.values(), max(snapshot.watermark, max(r.updated_at for r in changed)))
+    return snapshot
+
+
+class _State:
+    __slots__ = ("snapshot", "checked_at", "lock")
+
+    def __init__(self) -> None:
+        self.snapshot: CatalogSnapshot | None = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+def get_snapshot() -> CatalogSnapshot | None:
+    """La foto de este worker, refrescada si corresponde; None si `PRODUCT_CACHE` está apagado."""
+    if not current_app.config["PRODUCT_CACHE"]:
+        return None
+    state: _State = current_app.extensions.setdefault("product_cache", _State())
+    if state.snapshot is None:
+        with state.lock:
+            if state.snapshot is None:
+                state.snapshot, state.checked_at = load(), time.monotonic()
+    elif time.monotonic() - state.checked_at >= current_app.config["PRODUCT_CACHE_REFRESH_SECONDS"]:
+        # Un solo thread refresca; los demás siguen con la foto actual.
+        if state.lock.acquire(blocking=False):
+            try:
+                state.snapshot, state.checked_at = refresh(state.snapshot), time.monotonic()
+            finally:
+                state.lock.release()
+    return state.snapshot
+
+
+def expire() -> None:
+    """Refresca en el próximo uso (tras editar productos en este worker)."""
+    state: _State | None = current_app.extensions.get("product_cache")
+    if state:
+        state.checked_at = 0.0
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(n: int) -> Callable:
+    """Declara cuántas consultas SQL puede emitir una vista en GET.
+
+    Solo se verifica con `QUERY_BUDGET_ENFORCE` activo (tests): una vista que
+    se pasa, típicamente por un N+1 en la plantilla, falla el request.
+    Debe ir justo debajo de `@bp.route`.
+    """
+
+    def decorator(f):
+        f.query_budget = n
+        return f
+
+    return decorator
+
+
+def init_app(app: Flask) -> None:
+    @app.before_request
+    def _reset() -> None:
+        g.query_count = 0
+
+    @app.after_request
+    def _check(response):
+        if not app.config.get("QUERY_BUDGET_ENFORCE") or request.method not in ("GET", "HEAD"):
+            return response
+        view = app.view_functions.get(request.endpoint or "")
+        budget = getattr(view, "query_budget", None)
+        used = g.get("query_count", 0)
+        if budget is not None and used > budget:
+            raise QueryBudgetExceeded(f"{request.endpoint}: {used} consultas, presupuesto {budget}")
+        return response
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany) -> None:
+    if has_request_context() and current_app.config.get("QUERY_BUDGET_ENFORCE"):
+        g.query_count = g.get("query_count", 0) + 1
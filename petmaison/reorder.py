@@ -0,0 +1,118 @@
+"""Alertas de reposición: productos bajo mínimo agrupados por proveedor.
+
+`LOW_STOCK` es el mismo predicado del índice parcial `ix_products_low_stock`
+(ver models.py): la base lo mantiene al cambiar `stock` / `min_stock` por
+cualquier vía (ventas, compras, importación), y el listado lee solo las
+filas del índice en vez de recorrer el catálogo.
+
+Proveedor = el de la última compra confirmada del producto. Cantidad
+sugerida = lo que falta para cubrir `min_stock` más `cover_days` de venta
+al ritmo de los últimos `velocity_days` (desde el rollup diario).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .extensions import db
+from .models import LOW_STOCK, Product, Purchase, PurchaseItem, SalesDailyRollup, Supplier
+
+
+@dataclass
+class ReorderItem:
+    product_id: int
+    sku: str
+    name: str
+    stock: int
+    min_stock: int
+    daily_velocity: float
+    suggested_qty: int
+    last_cost_net: Decimal | None
+
+
+@dataclass
+class SupplierGroup:
+    supplier_id: int | None
+    supplier_name: str
+    items: list[ReorderItem] = field(default_factory=list)
+
+    @property
+    def estimated_cost_net(self) -> Decimal:
+        return sum((it.last_cost_net or Decimal("0")) * it.suggested_qty for it in self.items)
+
+
+def suggested_qty(stock: int, min_stock: int, daily_velocity: float, cover_days: int) -> int:
+    target = min_stock + math.ceil(daily_velocity * cover_days)
+    return max(target - stock, 0)
+
+
+def _last_suppliers(ids: list[int]) -> dict[int, tuple[int, Decimal]]:
+    ranked = (
+        db.select(
+            PurchaseItem.product_id,
+            Purchase.supplier_id,
+            PurchaseItem.unit_cost_net,
+            db.func.row_number()
+            .over(partition_by=PurchaseItem.product_id, order_by=(Purchase.date.desc(), PurchaseItem.id.desc()))
+            .label("rn"),
+        )
+        .join(Purchase, Purchase.id == PurchaseItem.purchase_id)
+        .filter(PurchaseItem.product_id.in_(ids), Purchase.status == "CONFIRMED")
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(ranked.c.product_id, ranked.c.supplier_id, ranked.c.unit_cost_net).filter(ranked.c.rn == 1)
+    ).all()
+    return {pid: (sid, cost) for pid, sid, cost in rows}
+
+
+def _velocities(ids: list[int], since: date) -> dict[int, int]:
+    rows = db.session.execute(
+        db.select(SalesDailyRollup.product_id, db.func.sum(SalesDailyRollup.units))
+        .filter(SalesDailyRollup.day >= since, SalesDailyRollup.product_id.in_(ids))
+        .group_by(SalesDailyRollup.product_id)
+    ).all()
+    return {pid: int(units or 0) for pid, units in rows}
+
+
+def low_stock(velocity_days: int = 28, cover_days: int = 21, today: date | None = None) -> list[SupplierGroup]:
+    """Productos activos con `stock <= min_stock`, por proveedor; 4 consultas en total."""
+    products = db.session.execute(
+        db.select(Product.id, Product.sku, Product.name, Product.stock, Product.min_stock)
+        .filter(LOW_STOCK)
+        .order_by(Product.id)
+    ).all()
+    if not products:
+        return []
+    ids = [p.id for p in products]
+    suppliers = _last_suppliers(ids)
+    sold = _velocities(ids, (today or date.today()) - timedelta(days=velocity_days))
+    names = dict(
+        db.session.execute(
+            db.select(Supplier.id, Supplier.name).filter(Supplier.id.in_({s for s, _ in suppliers.values()}))
+        ).all()
+    )
+
+    groups: dict[int | None, SupplierGroup] = {}
+    for p in products:
+        supplier_id, cost = suppliers.get(p.id, (None, None))
+        group = groups.get(supplier_id)
+        if group is None:
+            group = groups[supplier_id] = SupplierGroup(supplier_id, names.get(supplier_id, "Sin proveedor"))
+        velocity = sold.get(p.id, 0) / velocity_days
+        group.items.append(
+            ReorderItem(
+                product_id=p.id,
+                sku=p.sku,
+                name=p.name,
+                stock=p.stock,
+                min_stock=p.min_stock,
+                daily_velocity=round(velocity, 3),
+                suggested_qty=suggested_qty(p.stock, p.min_stock, velocity, cover_days),
+                last_cost_net=cost,
+            )
+        )
+    # Proveedores conocidos por nombre; "Sin proveedor" al final.
+    return sorted(groups.values(), key=lambda g: (g.supplier_id is None, g.supplier_name))
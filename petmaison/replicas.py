@@ -0,0 +1,180 @@
+"""Réplicas de lectura (`DATABASE_REPLICA_URLS`) para reportes, dashboard y API de consulta.
+
+Los GET de los blueprints en `REPLICA_BLUEPRINTS` leen de una réplica
+(round-robin entre las sanas); todo lo demás va al primario: escrituras,
+flush, `FOR UPDATE` y cualquier request que no sea de esos blueprints.
+Tras un POST/PUT/PATCH/DELETE exitoso la sesión del usuario queda
+`REPLICA_STICKY_SECONDS` leyendo del primario, así ve lo que acaba de
+escribir aunque la réplica vaya atrasada.
+
+Cada réplica se revisa al elegirla, a lo más cada `REPLICA_CHECK_SECONDS`
+(atraso de replay en Postgres; en SQLite basta con que conecte). Una réplica
+caída o con más de `REPLICA_MAX_LAG_SECONDS` de atraso se salta, y sin
+réplicas usables se lee del primario. Sin `DATABASE_REPLICA_URLS` nada cambia.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+import sqlalchemy as sa
+from flask import Flask, current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+STICKY_KEY = "db_primary_until"
+# 0 si la réplica ya aplicó todo lo recibido (o no es réplica: p.ej. un segundo
+# Postgres local para pruebas); si no, segundos desde la última transacción aplicada.
+LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: Engine
+    ok: bool = False
+    lag: float | None = None
+    error: str | None = None
+    checked_at: float = float("-inf")
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class ReplicaSet:
+    def __init__(self, engines: dict[str, Engine], check_seconds: float, max_lag: float) -> None:
+        self.replicas = [Replica(name, engine) for name, engine in engines.items()]
+        self.check_seconds = check_seconds
+        self.max_lag = max_lag
+        self._next = itertools.count()
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+
+    def _on_error(self, replica: Replica):
+        def handle_error(ctx) -> None:
+            if ctx.is_disconnect:
+                # Se salta hasta la próxima revisión.
+                replica.ok, replica.error, replica.checked_at = False, str(ctx.original_exception), time.monotonic()
+
+        return handle_error
+
+    def _check(self, replica: Replica) -> None:
+        try:
+            with replica.engine.connect() as conn:
+                lag = conn.exec_driver_sql(LAG_SQL).scalar() if conn.dialect.name == "postgresql" else 0
+            replica.lag, replica.error = float(lag or 0), None
+            replica.ok = replica.lag <= self.max_lag
+        except Exception as e:
+            replica.ok, replica.lag, replica.error = False, None, f"{type(e).__name__}: {e}"
+            logger.warning("Réplica %s no disponible: %s", replica.name, replica.error)
+        replica.checked_at = time.monotonic()
+
+    def pick(self) -> Engine | None:
+        """La siguiente réplica sana (round-robin), o None para leer del primario."""
+        n = len(self.replicas)
+        start = next(self._next)
+        for i in range(n):
+            replica = self.replicas[(start + i) % n]
+            # Un solo thread revisa; los demás usan el último resultado.
+            if time.monotonic() - replica.checked_at >= self.check_seconds and replica.lock.acquire(blocking=False):
+                try:
+                    self._check(replica)
+                finally:
+                    replica.lock.release()
+            if replica.ok:
+                return replica.engine
+        return None
+
+    def status(self) -> list[dict[str, Any]]:
+        return [
+            {"name": r.name, "ok": r.ok, "lag_seconds": r.lag, "error": r.error, "pool": r.engine.pool.status()}
+            for r in self.replicas
+        ]
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=False)
+
+
+def _replica_bind() -> Engine | None:
+    # g.db_replica: None/False = primario; True = elegir réplica; Engine = ya elegida.
+    route = g.get("db_replica")
+    if route is True:
+        replicas: ReplicaSet | None = current_app.extensions.get("replicas")
+        route = g.db_replica = (replicas.pick() if replicas else None) or False
+    return route or None
+
+
+class RoutingSession(Session):
+    """Sesión de Flask-SQLAlchemy que manda los SELECT a la réplica elegida para el request."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and clause is not None
+            and not getattr(clause, "is_dml", False)
+            and getattr(clause, "_for_update_arg", None) is None
+            and not self._flushing
+            and has_app_context()
+        ):
+            engine = _replica_bind()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def reading() -> Iterator[None]:
+    """Lecturas del bloque desde una réplica (p.ej. un reporte en el worker)."""
+    previous = g.get("db_replica")
+    g.db_replica = previous or True
+    try:
+        yield
+    finally:
+        g.db_replica = previous
+
+
+def status() -> list[dict[str, Any]]:
+    replicas: ReplicaSet | None = current_app.extensions.get("replicas")
+    return replicas.status() if replicas else []
+
+
+def dispose(app: Flask) -> None:
+    replicas: ReplicaSet | None = app.extensions.get("replicas")
+    if replicas:
+        replicas.dispose()
+
+
+def init_app(app: Flask) -> None:
+    urls = app.config.get("DATABASE_REPLICA_URLS") or []
+    if urls:
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+        engines = {f"replica{i}": sa.create_engine(url, **options) for i, url in enumerate(urls, 1)}
+        app.extensions["replicas"] = ReplicaSet(
+            engines, app.config["REPLICA_CHECK_SECONDS"], app.config["REPLICA_MAX_LAG_SECONDS"]
+        )
+
+    @app.before_request
+    def _route_reads() -> None:
+        g.db_replica = (
+            "replicas" in app.extensions
+            and request.method in SAFE_METHODS
+            and request.blueprint in app.config["REPLICA_BLUEPRINTS"]
+            and session.get(STICKY_KEY, 0) < time.time()
+        )
+
+    @app.after_request
+    def _read_your_writes(response):
+        if "replicas" in app.extensions and request.method not in SAFE_METHODS and response.status_code < 400:
+            session[STICKY_KEY] = int(time.time()) + app.config["REPLICA_STICKY_SECONDS"]
+        return response
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+
+from flask import Response, current_app, make_response, request, session
+from flask_login import current_user
+
+# Encabezados que no se guardan con la respuesta (propios de cada request).
+_SKIP_HEADERS = {"content-length", "set-cookie", "etag"}
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    status: int
+    headers: list[tuple[str, str]]
+    etag: str
+
+
+class MemoryCache:
+    """LRU con TTL en memoria del worker (default).
+
+    Cada worker tiene su propia copia: una invalidación solo limpia el worker
+    que la emite, los demás expiran por TTL. Para consistencia entre workers
+    usar `RESPONSE_CACHE=redis://...`.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: int = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+        self._gens: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: CachedResponse, ttl: int | None = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def generations(self, tags: Iterable[str]) -> list[int]:
+        return [self._gens.get(t, 0) for t in tags]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for t in tags:
+                self._gens[t] = self._gens.get(t, 0) + 1
+
+
+class RedisCache:
+    """Backend compartido entre workers (Redis o compatible: Valkey, KeyDB)."""
+
+    prefix = "respcache:"
+
+    def __init__(self, url: str, ttl: int = 60) -> None:
+        import redis  # dependencia opcional
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> CachedResponse | None:
+        raw = self.client.get(self.prefix + key)
+        return CachedResponse(*pickle.loads(raw)) if raw is not None else None
+
+    def set(self, key: str, value: CachedResponse, ttl: int | None = None) -> None:
+        self.client.setex(self.prefix + key, ttl or self.ttl, pickle.dumps(tuple(value)))
+
+    def generations(self, tags: Iterable[str]) -> list[int]:
+        return [int(v or 0) for v in self.client.mget([f"{self.prefix}gen:{t}" for t in tags])]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        pipe = self.client.pipeline()
+        for t in tags:
+            pipe.incr(f"{self.prefix}gen:{t}")
+        pipe.execute()
+
+
+def get_cache():
+    """Backend según `RESPONSE_CACHE` (`memory`, `none` o URL `redis://`); se crea al primer uso."""
+    ext = current_app.extensions
+    if "respcache" not in ext:
+        spec = current_app.config.get("RESPONSE_CACHE", "memory")
+        ttl = current_app.config.get("RESPONSE_CACHE_TTL", 60)
+        if spec == "none":
+            ext["respcache"] = None
+        elif spec == "memory":
+            ext["respcache"] = MemoryCache(current_app.config.get("RESPONSE_CACHE_MAXSIZE", 512), ttl)
+        else:
+            ext["respcache"] = RedisCache(spec, ttl)
+    return ext["respcache"]
+
+
+def invalidate(*tags: str) -> None:
+    """Invalida todas las respuestas etiquetadas con `tags`.
+
+    No borra claves: sube la generación de cada tag, que forma parte de la
+    clave; las entradas viejas quedan inalcanzables y salen por LRU/TTL.
+    """
+    cache = get_cache()
+    if cache is not None:
+        cache.bump(tags)
+
+
+def _key(cache, tags: tuple[str, ...], vary_user: bool) -> str:
+    args = sorted(request.args.items(multi=True))
+    parts = [
+        request.endpoint or "",
+        repr(sorted((request.view_args or {}).items())),
+        repr(args),
+        repr(cache.generations(tags)),
+        (current_user.get_id() or "") if vary_user else "",
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def _entry(resp: Response, body: bytes) -> CachedResponse:
+    headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in _SKIP_HEADERS]
+    return CachedResponse(body, resp.status_code, headers, hashlib.sha1(body).hexdigest())
+
+
+def _is_html(headers: list[tuple[str, str]]) -> bool:
+    return any(k.lower() == "content-type" and v.startswith("text/html") for k, v in headers)
+
+
+def _replay(entry: CachedResponse) -> Response:
+    resp = Response(entry.body, status=entry.status, headers=entry.headers)
+    resp.set_etag(entry.etag)
+    return resp.make_conditional(request)
+
+
+def _tee(chunks: Iterator[bytes], limit: int, store: Callable[[bytes], None]) -> Iterator[bytes]:
+    buf: list[bytes] | None = []
+    size = 0
+    for chunk in chunks:
+        if buf is not None:
+            size += len(chunk)
+            if size <= limit:
+                buf.append(chunk)
+            else:
+                buf = None
+        yield chunk
+    if buf is not None:
+        store(b"".join(buf))
+
+
+def cached(*tags: str, vary_user: bool = False, ttl: int | None = None):
+    """Cachea respuestas GET 200 por endpoint + args normalizados, con ETag/304.
+
+    En vistas con `login_required` va debajo, para no servir caché a
+    anónimos; en vistas públicas la entrada es compartida (salvo
+    `vary_user`). `tags` indica qué datos usa la vista; `invalidate(tag)`
+    descarta sus entradas. Las respuestas en streaming se guardan al
+    terminar de enviarse, si no superan `RESPONSE_CACHE_MAX_BYTES`.
+
+    Con mensajes flash pendientes las páginas HTML no se sirven ni se
+    guardan en caché: el layout los muestra (y consume) una sola vez.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args: Any, **kwargs: Any):
+            cache = get_cache()
+            if cache is None or request.method != "GET":
+                return f(*args, **kwargs)
+            flashes = bool(session.get("_flashes"))
+            key = _key(cache, tags, vary_user)
+            hit = cache.get(key)
+            if hit is not None and not (flashes and _is_html(hit.headers)):
+                return _replay(hit)
+
+            resp = make_response(f(*args, **kwargs))
+            if resp.status_code != 200 or (resp.mimetype == "text/html" and (flashes or session.get("_flashes"))):
+                return resp
+            if resp.is_streamed:
+                limit = current_app.config.get("RESPONSE_CACHE_MAX_BYTES", 4 * 1024 * 1024)
+                resp.response = _tee(resp.iter_encoded(), limit, lambda body: cache.set(key, _entry(resp, body), ttl))
+                return resp
+            entry = _entry(resp, resp.get_data())
+            cache.set(key, entry, ttl)
+            resp.set_etag(entry.etag)
+            return resp.make_conditional(request)
+
+        return wrapper
+
+    return decorator
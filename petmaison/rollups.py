@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from .dbutils import date_trunc, upsert
+from .extensions import db
+from .models import Sale, SaleItem, SalesDailyRollup, SalesDailyTotal, SalesPeriodTotal
+from .reporting import UNITS, bucket_next, bucket_start
+
+_LINE_NET = SaleItem.qty * SaleItem.unit_price_net - SaleItem.discount
+_LINE_VAT = _LINE_NET * SaleItem.vat_rate
+
+
+def apply_sale(sale: Sale) -> None:
+    """Suma una venta recién confirmada al rollup diario (misma transacción)."""
+    day = sale.date.date()
+    lines = db.session.execute(
+        db.select(
+            SaleItem.product_id,
+            db.func.sum(SaleItem.qty),
+            db.func.sum(_LINE_NET),
+            db.func.sum(_LINE_VAT),
+        )
+        .filter(SaleItem.sale_id == sale.id)
+        .group_by(SaleItem.product_id)
+    ).all()
+    if lines:
+        db.session.execute(
+            upsert(
+                SalesDailyRollup,
+                [
+                    {
+                        "day": day,
+                        "product_id": pid,
+                        "units": units,
+                        "net": net,
+                        "vat": vat,
+                        "total": net + vat,
+                        "tickets": 1,
+                    }
+                    for pid, units, net, vat in lines
+                ],
+                keys=["day", "product_id"],
+                accumulate=["units", "net", "vat", "total", "tickets"],
+            )
+        )
+    db.session.execute(
+        upsert(
+            SalesDailyTotal,
+            [
+                {
+                    "day": day,
+                    "net": sale.subtotal_net - sale.discount,
+                    "vat": sale.vat,
+                    "total": sale.total,
+                    "tickets": 1,
+                }
+            ],
+            keys=["day"],
+            accumulate=["net", "vat", "total", "tickets"],
+        )
+    )
+    # Solo períodos ya calculados por `rebuild`: uno sin fila se lee de `sales`.
+    db.session.execute(
+        db.update(SalesPeriodTotal)
+        .where(
+            db.or_(
+                *[
+                    db.and_(SalesPeriodTotal.unit == unit, SalesPeriodTotal.period == bucket_start(unit, day))
+                    for unit in UNITS
+                ]
+            )
+        )
+        .values(total=SalesPeriodTotal.total + sale.total)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild(fro: date | None = None, to: date | None = None) -> int:
+    """Recalcula el rollup y los totales por período desde `sales`/`sale_items` para el rango dado (inclusive).
+
+    Devuelve la cantidad de filas por producto generadas.
+    """
+    day = db.func.date(Sale.date)
+    rollup_del = db.delete(SalesDailyRollup)
+    totals_del = db.delete(SalesDailyTotal)
+    sale_filter = [Sale.status == "CONFIRMED"]
+    if fro:
+        rollup_del = rollup_del.filter(SalesDailyRollup.day >= fro)
+        totals_del = totals_del.filter(SalesDailyTotal.day >= fro)
+        sale_filter.append(Sale.date >= fro)
+    if to:
+        rollup_del = rollup_del.filter(SalesDailyRollup.day <= to)
+        totals_del = totals_del.filter(SalesDailyTotal.day <= to)
+        sale_filter.append(Sale.date < to + timedelta(days=1))
+    db.session.execute(rollup_del)
+    db.session.execute(totals_del)
+
+    net = db.func.sum(_LINE_NET)
+    vat = db.func.sum(_LINE_VAT)
+    result = db.session.execute(
+        db.insert(SalesDailyRollup).from_select(
+            ["day", "product_id", "units", "net", "vat", "total", "tickets"],
+            db.select(
+                day,
+                SaleItem.product_id,
+                db.func.sum(SaleItem.qty),
+                net,
+                vat,
+                net + vat,
+                db.func.count(db.distinct(Sale.id)),
+            )
+            .join(SaleItem.sale)
+            .filter(*sale_filter)
+            .group_by(day, SaleItem.product_id),
+        )
+    )
+    db.session.execute(
+        db.insert(SalesDailyTotal).from_select(
+            ["day", "net", "vat", "total", "tickets"],
+            db.select(
+                day,
+                db.func.sum(Sale.subtotal_net - Sale.discount),
+                db.func.sum(Sale.vat),
+                db.func.sum(Sale.total),
+                db.func.count(Sale.id),
+            )
+            .filter(*sale_filter)
+            .group_by(day),
+        )
+    )
+    _rebuild_periods(fro, to)
+    db.session.commit()
+    return result.rowcount
+
+
+def _rebuild_periods(fro: date | None, to: date | None) -> None:
+    """Recalcula `sales_period_totals` de cada período que toca el rango (completo, no solo el rango)."""
+    for unit in UNITS:
+        period = date_trunc(unit, Sale.date)
+        delete = db.delete(SalesPeriodTotal).filter(SalesPeriodTotal.unit == unit)
+        sale_filter = [Sale.status == "CONFIRMED"]
+        if fro:
+            lo = bucket_start(unit, fro)
+            delete = delete.filter(SalesPeriodTotal.period >= lo)
+            sale_filter.append(Sale.date >= datetime.combine(lo, time()))
+        if to:
+            hi = bucket_next(unit, bucket_start(unit, to))
+            delete = delete.filter(SalesPeriodTotal.period < hi)
+            sale_filter.append(Sale.date < datetime.combine(hi, time()))
+        db.session.execute(delete)
+        db.session.execute(
+            db.insert(SalesPeriodTotal).from_select(
+                ["unit", "period", "total", "created_at"],
+                db.select(db.literal(unit), period, db.func.sum(Sale.total), db.literal(datetime.utcnow()))
+                .filter(*sale_filter)
+                .group_by(period),
+            )
+        )
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import re
+
+from .dbutils import dialect_name
+from .extensions import db
+from .models import Product
+
+products_fts = db.table("products_fts", db.column("rowid"), db.column("name"), db.column("sku"))
+
+_FTS_TOKEN = re.compile(r"[\w\-.]+", re.UNICODE)
+
+
+def search_products(query, term: str | None):
+    """Filtra y ordena por relevancia un `select` sobre `Product`.
+
+    Los SKU que empiezan con el término van primero; luego, por similitud
+    trigram (PostgreSQL) o bm25 (FTS5 en SQLite). Sin término, devuelve la
+    consulta intacta.
+    """
+    term = (term or "").strip()
+    if not term:
+        return query
+    sku_first = db.case((Product.sku.ilike(f"{term}%"), 0), else_=1)
+    name = dialect_name()
+    if name == "postgresql":
+        return query.filter(
+            db.or_(
+                Product.sku.ilike(f"{term}%"),
+                Product.name.ilike(f"%{term}%"),
+                Product.name.op("%")(term),
+            )
+        ).order_by(sku_first, db.func.similarity(Product.name, term).desc(), Product.id)
+    if name == "sqlite":
+        match = _fts_query(term)
+        if match:
+            return (
+                query.join(products_fts, products_fts.c.rowid == Product.id)
+                .filter(db.literal_column("products_fts").op("MATCH")(match))
+                .order_by(sku_first, db.func.bm25(db.literal_column("products_fts")), Product.id)
+            )
+    like = f"%{term}%"
+    return query.filter(db.or_(Product.name.ilike(like), Product.sku.ilike(like))).order_by(sku_first, Product.id)
+
+
+def _fts_query(term: str) -> str:
+    # Cada palabra como prefijo entre comillas: `"cat"* AND "sku-1"*`
+    return " AND ".join(f'"{tok}"*' for tok in _FTS_TOKEN.findall(term))
@@ -8,6 +8,8 @@ from flask import current_app
 from flask.cli import with_appcontext
 from werkzeug.security import generate_password_hash
 
+from . import rollups
+from .customers import rebuild_stats
 from .extensions import db
 from .models import (
     Customer,
@@ -143,4 +145,7 @@ def run_seed() -> None:
         )
     db.session.commit()
 
+    rollups.rebuild()
+    rebuild_stats()
+
     print("Seed completado.")
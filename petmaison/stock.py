@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any
+
+from .extensions import db
+from .models import Product, Purchase, PurchaseItem, Sale, SaleItem, StockMovement
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_name: str) -> None:
+        super().__init__(product_name)
+        self.product_name = product_name
+
+
+def weighted_average(qty: int, avg: Decimal, in_qty: int, in_cost: Decimal) -> Decimal:
+    """Costo promedio tras entrar `in_qty` a `in_cost` sobre `qty` unidades a `avg`.
+
+    Un stock negativo o en cero no aporta costo: el promedio parte de la entrada.
+    """
+    on_hand = max(qty, 0)
+    if on_hand + in_qty <= 0:
+        return avg
+    return (on_hand * avg + in_qty * in_cost) / (on_hand + in_qty)
+
+
+def sale_out(sale: Sale) -> None:
+    """Descuenta stock y registra movimientos OUT de una venta en O(1) sentencias.
+
+    Bloquea los productos en orden de id (`SELECT ... FOR UPDATE`) para que
+    dos cajas confirmando a la vez no se bloqueen mutuamente, y el `UPDATE`
+    condicional `stock >= qty` garantiza que nunca se venda de más. Si falta
+    stock levanta `InsufficientStock`; quien llama debe hacer rollback.
+
+    El costo de cada movimiento es el promedio ponderado vigente del
+    producto (una salida no lo cambia), así el margen queda fijado al vender.
+    """
+    qtys: dict[int, int] = dict(
+        db.session.execute(
+            db.select(SaleItem.product_id, db.func.sum(SaleItem.qty))
+            .filter(SaleItem.sale_id == sale.id)
+            .group_by(SaleItem.product_id)
+        ).all()
+    )
+    if not qtys:
+        return
+    locked = db.session.execute(
+        db.select(Product.id, Product.name, Product.stock, Product.avg_cost)
+        .filter(Product.id.in_(qtys))
+        .order_by(Product.id)
+        .with_for_update()
+    ).all()
+    for r in locked:
+        if r.stock < qtys[r.id]:
+            raise InsufficientStock(r.name)
+
+    ids = [r.id for r in locked]
+    qty = db.case({pid: qtys[pid] for pid in ids}, value=Product.id)
+    updated = db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(ids), Product.stock >= qty)
+        .values(stock=Product.stock - qty)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if updated != len(ids):
+        raise InsufficientStock(", ".join(r.name for r in locked))
+
+    _insert_movements(
+        [
+            {
+                "product_id": r.id,
+                "type": "OUT",
+                "ref_type": "SALE",
+                "ref_id": sale.id,
+                "qty": qtys[r.id],
+                "unit_cost_net": r.avg_cost,
+            }
+            for r in locked
+        ]
+    )
+
+
+def purchase_in(purchase: Purchase) -> None:
+    """Suma el stock de una compra: un `UPDATE` agregado por producto y un insert masivo de movimientos.
+
+    El mismo `UPDATE` recalcula el costo promedio con `weighted_average` en
+    SQL, sobre el stock y promedio bloqueados: O(1) por producto, sin releer
+    movimientos anteriores.
+    """
+    items = db.session.execute(
+        db.select(PurchaseItem.product_id, PurchaseItem.qty, PurchaseItem.unit_cost_net)
+        .filter(PurchaseItem.purchase_id == purchase.id)
+        .order_by(PurchaseItem.id)
+    ).all()
+    if not items:
+        return
+    qtys: dict[int, int] = defaultdict(int)
+    values: dict[int, Decimal] = defaultdict(Decimal)
+    for it in items:
+        qtys[it.product_id] += it.qty
+        values[it.product_id] += it.qty * it.unit_cost_net
+
+    ids = list(
+        db.session.execute(
+            db.select(Product.id).filter(Product.id.in_(qtys)).order_by(Product.id).with_for_update()
+        ).scalars()
+    )
+    qty = db.case({pid: qtys[pid] for pid in ids}, value=Product.id)
+    value = db.case({pid: values[pid] for pid in ids}, value=Product.id)
+    on_hand = db.case((Product.stock > 0, Product.stock), else_=0)
+    # Varias líneas del mismo producto entran juntas: da el mismo promedio que una por una.
+    avg_cost = db.case(
+        (on_hand + qty > 0, (on_hand * Product.avg_cost + value) / (on_hand + qty)), else_=Product.avg_cost
+    )
+    db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(ids))
+        .values(stock=Product.stock + qty, avg_cost=avg_cost)
+        .execution_options(synchronize_session=False)
+    )
+
+    known = set(ids)
+    _insert_movements(
+        [
+            {
+                "product_id": it.product_id,
+                "type": "IN",
+                "ref_type": "PURCHASE",
+                "ref_id": purchase.id,
+                "qty": it.qty,
+                "unit_cost_net": it.unit_cost_net,
+            }
+            for it in items
+            if it.product_id in known
+        ]
+    )
+
+
+def _insert_movements(rows: list[dict[str, Any]]) -> None:
+    # executemany con la sentencia compilada en caché: un único viaje al driver
+    # (pipeline en psycopg) sin recompilar un VALUES distinto por tamaño.
+    if rows:
+        db.session.execute(db.insert(StockMovement), rows)
@@ -0,0 +1,416 @@
+"""Datos sintéticos a escala de producción para pruebas de carga (`flask seed --scale N`).
+
+Determinista para una misma semilla. Simula día a día: reposiciones de
+proveedor antes de abrir y ventas con estacionalidad mensual y semanal, de
+modo que los movimientos de stock cuadran con `Product.stock`. Las filas se
+escriben en lotes con `COPY` (PostgreSQL) o executemany (SQLite), con ids
+asignados acá; la base debe estar vacía.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+from werkzeug.security import generate_password_hash
+
+from . import customers, kardex, rollups
+from .dbutils import dialect_name
+from .extensions import db
+from .models import (
+    Customer,
+    Order,
+    Product,
+    Purchase,
+    PurchaseItem,
+    Sale,
+    SaleItem,
+    StockMovement,
+    Supplier,
+    User,
+    email_key,
+    phone_key,
+    rut_key,
+)
+
+BATCH_SIZE = 20000
+VAT = Decimal("0.19")
+CENT = Decimal("0.01")
+
+# Mascotas en Chile: peak en diciembre, bajón en vacaciones de febrero.
+MONTH_FACTOR = {1: 0.9, 2: 0.75, 3: 0.95, 4: 0.95, 5: 1.0, 6: 0.95, 7: 1.0, 8: 1.0, 9: 1.15, 10: 1.0, 11: 1.1, 12: 1.5}
+WEEKDAY_FACTOR = (0.85, 0.9, 0.9, 0.95, 1.15, 1.35, 0.7)  # lunes..domingo
+PAYMENTS = (("EFECTIVO", 3), ("TARJETA", 5), ("TRANSFERENCIA", 2))
+CATEGORIES = ("Alimento perro", "Alimento gato", "Arena", "Snacks", "Accesorios", "Higiene", "Juguetes", "Farmacia")
+BRANDS = ("Acme", "Pawsome", "NutriPet", "Felinus", "Canis", "MaisonPet", "Vital", "Huella")
+
+TABLES = (User, Customer, Supplier, Product, Purchase, PurchaseItem, Sale, SaleItem, StockMovement, Order)
+
+
+class SynthError(RuntimeError):
+    pass
+
+
+@dataclass
+class Sizes:
+    sales: int
+    products: int
+    customers: int
+    suppliers: int
+    sellers: int
+    orders: int
+
+    @classmethod
+    def for_scale(cls, scale: int) -> "Sizes":
+        return cls(
+            sales=scale,
+            products=min(max(50, scale // 50), 20000),
+            customers=max(20, scale // 25),
+            suppliers=max(5, min(scale // 5000, 200)),
+            sellers=max(2, min(scale // 50000, 30)),
+            orders=max(5, scale // 40),
+        )
+
+
+class _Writer:
+    """Acumula tuplas por tabla y las vuelca en lote respetando el orden de las FKs."""
+
+    def __init__(self, batch_size: int) -> None:
+        self.batch_size = batch_size
+        self.pending = 0
+        self.buffers: dict[Any, tuple[list[str], list[tuple]]] = {}
+        self.counts: dict[str, int] = {}
+        self.copy = dialect_name() == "postgresql"
+
+    def add(self, model: Any, cols: list[str], row: tuple) -> None:
+        self.buffers.setdefault(model, (cols, []))[1].append(row)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for model in TABLES:
+            if model not in self.buffers:
+                continue
+            cols, rows = self.buffers[model]
+            if rows:
+                self._write(model.__table__, cols, rows)
+                self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+                rows.clear()
+        self.pending = 0
+
+    def _write(self, table: Any, cols: list[str], rows: list[tuple]) -> None:
+        if self.copy:
+            raw = db.session.connection().connection.driver_connection
+            with raw.cursor() as cur, cur.copy(f"COPY {table.name} ({', '.join(cols)}) FROM STDIN") as copy:
+                for r in rows:
+                    copy.write_row(r)
+        else:
+            db.session.execute(table.insert(), [dict(zip(cols, r)) for r in rows])
+
+
+def _money(value: float | Decimal) -> Decimal:
+    return Decimal(value).quantize(CENT, ROUND_HALF_UP)
+
+
+def _day_counts(rng: random.Random, start: date, days: int, total: int) -> list[int]:
+    """Reparte `total` ventas entre los días según estacionalidad y una leve tendencia al alza."""
+    weights = []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        trend = 1 + 0.25 * i / max(days - 1, 1)
+        noise = rng.uniform(0.9, 1.1)
+        weights.append(MONTH_FACTOR[d.month] * WEEKDAY_FACTOR[d.weekday()] * trend * noise)
+    scale = total / sum(weights)
+    exact = [w * scale for w in weights]
+    counts = [int(x) for x in exact]
+    # Resto mayor: el total queda exacto sin sesgar días.
+    for i in sorted(range(days), key=lambda i: exact[i] - counts[i], reverse=True)[: total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _ensure_empty() -> None:
+    for model in (Product, Sale, Purchase, Customer, Supplier, StockMovement, Order):
+        if db.session.execute(db.select(model).limit(1)).first() is not None:
+            raise SynthError(f"La tabla {model.__tablename__} no está vacía: --scale solo carga en una base vacía")
+
+
+def _reset_sequences() -> None:
+    if dialect_name() != "postgresql":
+        return
+    for model in TABLES:
+        t = model.__tablename__
+        db.session.execute(
+            db.text(f"SELECT setval(pg_get_serial_sequence('{t}', 'id'), COALESCE((SELECT MAX(id) FROM {t}), 1))")
+        )
+
+
+def generate(scale: int, days: int = 730, seed: int = 42, batch_size: int = BATCH_SIZE) -> dict[str, int]:
+    """Carga ~`scale` ventas confirmadas repartidas en los últimos `days` días. Devuelve filas por tabla."""
+    if scale < 1 or days < 1:
+        raise SynthError("scale y days deben ser positivos")
+    db.create_all()
+    _ensure_empty()
+    rng = random.Random(seed)
+    sizes = Sizes.for_scale(scale)
+    out = _Writer(batch_size)
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days)
+    t0 = datetime.combine(start, datetime.min.time())
+
+    # Usuarios: se reutilizan los existentes (p.ej. el admin) si los hay.
+    user_ids = list(db.session.execute(db.select(User.id)).scalars())
+    if not user_ids:
+        pw = generate_password_hash("PetMaison!2025")
+        cols = ["id", "email", "name", "password_hash", "role", "is_active", "created_at", "updated_at"]
+        out.add(User, cols, (1, "admin@petmaison.cl", "Admin", pw, "admin", True, t0, t0))
+        for i in range(sizes.sellers):
+            out.add(
+                User, cols, (i + 2, f"vendedor{i + 1}@petmaison.cl", f"Vendedor {i + 1}", pw, "vendedor", True, t0, t0)
+            )
+        user_ids = list(range(1, sizes.sellers + 2))
+
+    cols = ["id", "name", "rut", "email", "phone", "comuna", "balance"]
+    cols += ["rut_key", "phone_key", "email_key", "created_at", "updated_at"]
+    for i in range(1, sizes.customers + 1):
+        rut = f"{5_000_000 + i * 7}-{rng.randint(0, 9)}"
+        email = f"cliente{i}@example.cl"
+        phone = f"+569{rng.randint(10_000_000, 99_999_999)}"
+        out.add(
+            Customer,
+            cols,
+            (
+                i,
+                f"Cliente {i}",
+                rut,
+                email,
+                phone,
+                rng.choice(("Santiago", "Providencia", "Ñuñoa", "Maipú", "La Florida", "Las Condes")),
+                Decimal("0"),
+                rut_key(rut),
+                phone_key(phone),
+                email_key(email),
+                t0,
+                t0,
+            ),
+        )
+
+    cols = ["id", "name", "rut", "created_at", "updated_at"]
+    for i in range(1, sizes.suppliers + 1):
+        out.add(Supplier, cols, (i, f"Proveedor {i}", f"{76_000_000 + i}-{i % 10}", t0, t0))
+
+    # Productos con popularidad tipo Zipf; min_stock y nivel de reposición según su venta esperada.
+    n = sizes.products
+    popularity = [1 / (rank + 1) ** 0.9 for rank in range(n)]
+    rng.shuffle(popularity)
+    total_pop = sum(popularity)
+    share = [p / total_pop for p in popularity]
+    lines_per_day = scale * 2.2 / days
+    cost, price, min_stock, order_up_to, supplier = {}, {}, {}, {}, {}
+    cols = [
+        "id",
+        "sku",
+        "name",
+        "brand",
+        "category",
+        "cost_net",
+        "avg_cost",
+        "price_gross",
+        "vat_included",
+        "stock",
+        "min_stock",
+        "active",
+        "created_at",
+        "updated_at",
+    ]
+    for pid in range(1, n + 1):
+        cost[pid] = _money(rng.randint(8, 400) * 100)
+        price[pid] = _money(round(float(cost[pid]) * 1.19 * rng.uniform(1.3, 1.8), -1))
+        rate = share[pid - 1] * lines_per_day * 2
+        min_stock[pid] = math.ceil(rate * 3) + 1
+        order_up_to[pid] = math.ceil(rate * 21) + min_stock[pid] + 5
+        supplier[pid] = (pid - 1) % sizes.suppliers + 1
+        cat = CATEGORIES[pid % len(CATEGORIES)]
+        out.add(
+            Product,
+            cols,
+            (
+                pid,
+                f"SKU{pid:07}",
+                f"{cat} {BRANDS[pid % len(BRANDS)]} {pid}",
+                BRANDS[pid % len(BRANDS)],
+                cat,
+                cost[pid],
+                cost[pid],
+                price[pid],
+                True,
+                0,
+                min_stock[pid],
+                True,
+                t0,
+                t0,
+            ),
+        )
+    out.flush()
+    net_price = {pid: (price[pid] / (1 + VAT)).quantize(CENT, ROUND_HALF_UP) for pid in price}
+
+    stock = {pid: 0 for pid in range(1, n + 1)}
+    ids = {"sale": 0, "sale_item": 0, "purchase": 0, "purchase_item": 0, "movement": 0}
+    sale_cols = [
+        "id",
+        "customer_id",
+        "user_id",
+        "date",
+        "status",
+        "subtotal_net",
+        "discount",
+        "vat",
+        "total",
+        "payment_method",
+        "created_at",
+        "updated_at",
+    ]
+    item_cols = ["id", "sale_id", "product_id", "qty", "unit_price_net", "discount", "vat_rate", "line_total"]
+    purchase_cols = ["id", "supplier_id", "date", "status", "subtotal_net", "vat", "total", "created_at", "updated_at"]
+    pitem_cols = ["id", "purchase_id", "product_id", "qty", "unit_cost_net", "vat_rate", "line_total"]
+    move_cols = ["id", "product_id", "type", "ref_type", "ref_id", "qty", "unit_cost_net", "created_at"]
+    product_ids = list(range(1, n + 1))
+    cum = []
+    acc = 0.0
+    for s in share:
+        acc += s
+        cum.append(acc)
+    payments = [p for p, _ in PAYMENTS]
+    payment_w = [w for _, w in PAYMENTS]
+
+    def restock(when: datetime, pids: list[int]) -> None:
+        by_supplier: dict[int, list[int]] = {}
+        for pid in pids:
+            by_supplier.setdefault(supplier[pid], []).append(pid)
+        for sup, lines in sorted(by_supplier.items()):
+            ids["purchase"] += 1
+            purchase_id = ids["purchase"]
+            qtys = [(pid, order_up_to[pid] - stock[pid]) for pid in lines]
+            # Cabecera antes que las líneas: un flush intermedio no debe romper la FK.
+            subtotal = sum((cost[pid] * qty for pid, qty in qtys), Decimal("0"))
+            vat = _money(subtotal * VAT)
+            out.add(
+                Purchase,
+                purchase_cols,
+                (purchase_id, sup, when, "CONFIRMED", subtotal, vat, subtotal + vat, when, when),
+            )
+            for pid, qty in qtys:
+                stock[pid] += qty
+                ids["purchase_item"] += 1
+                out.add(
+                    PurchaseItem,
+                    pitem_cols,
+                    (ids["purchase_item"], purchase_id, pid, qty, cost[pid], VAT, _money(cost[pid] * qty * (1 + VAT))),
+                )
+                ids["movement"] += 1
+                out.add(
+                    StockMovement,
+                    move_cols,
+                    (ids["movement"], pid, "IN", "PURCHASE", purchase_id, qty, cost[pid], when),
+                )
+
+    restock(t0 + timedelta(hours=8), product_ids)
+    for offset, count in enumerate(_day_counts(rng, start, days, scale)):
+        day = t0 + timedelta(days=offset)
+        low = [pid for pid in product_ids if stock[pid] <= min_stock[pid]]
+        if low:
+            restock(day + timedelta(hours=8), low)
+        for secs in sorted(rng.randrange(10 * 3600) for _ in range(count)):
+            when = day + timedelta(hours=10, seconds=secs)
+            wanted = {
+                pid: rng.choice((1, 1, 1, 2, 2, 3))
+                for pid in rng.choices(product_ids, cum_weights=cum, k=rng.choice((1, 1, 2, 2, 3, 4)))
+            }
+            # Sin stock no se vende: la línea se pierde (como en la caja).
+            lines = [(pid, qty) for pid, qty in wanted.items() if stock[pid] >= qty]
+            if not lines:
+                continue
+            ids["sale"] += 1
+            sale_id = ids["sale"]
+            subtotal = sum((net_price[pid] * qty for pid, qty in lines), Decimal("0"))
+            vat = _money(subtotal * VAT)
+            customer_id = rng.randint(1, sizes.customers) if rng.random() < 0.4 else None
+            out.add(
+                Sale,
+                sale_cols,
+                (
+                    sale_id,
+                    customer_id,
+                    rng.choice(user_ids),
+                    when,
+                    "CONFIRMED",
+                    subtotal,
+                    Decimal("0"),
+                    vat,
+                    subtotal + vat,
+                    rng.choices(payments, payment_w)[0],
+                    when,
+                    when,
+                ),
+            )
+            for pid, qty in lines:
+                stock[pid] -= qty
+                ids["sale_item"] += 1
+                out.add(
+                    SaleItem,
+                    item_cols,
+                    (
+                        ids["sale_item"],
+                        sale_id,
+                        pid,
+                        qty,
+                        net_price[pid],
+                        Decimal("0"),
+                        VAT,
+                        _money(net_price[pid] * qty * (1 + VAT)),
+                    ),
+                )
+                ids["movement"] += 1
+                out.add(StockMovement, move_cols, (ids["movement"], pid, "OUT", "SALE", sale_id, qty, cost[pid], when))
+
+    cols = ["id", "customer_id", "address", "status", "created_at", "updated_at"]
+    statuses = ("NEW", "PREPARATION", "OUT_FOR_DELIVERY", "DELIVERED", "DELIVERED", "DELIVERED", "CANCELLED")
+    for i in range(1, sizes.orders + 1):
+        when = t0 + timedelta(days=rng.randrange(days), hours=rng.randint(9, 19))
+        out.add(
+            Order,
+            cols,
+            (i, rng.randint(1, sizes.customers), f"Calle {rng.randint(1, 9999)}", rng.choice(statuses), when, when),
+        )
+    out.flush()
+
+    # El stock final es exactamente la suma de los movimientos.
+    ordered = sorted(stock)
+    for i in range(0, len(ordered), 1000):
+        chunk = ordered[i : i + 1000]
+        db.session.execute(
+            db.update(Product)
+            .where(Product.id.in_(chunk))
+            .values(stock=db.case({pid: stock[pid] for pid in chunk}, value=Product.id))
+            .execution_options(synchronize_session=False)
+        )
+    _reset_sequences()
+    db.session.commit()
+    rollups.rebuild()
+    customers.rebuild_stats()
+    kardex.close_months()
+    return out.counts
+
+
+def run(scale: int, days: int, seed: int, echo=print) -> None:
+    t = time.perf_counter()
+    counts = generate(scale, days, seed)
+    for table, rows in counts.items():
+        echo(f"{table:>16}: {rows}")
+    echo(f"Datos sintéticos cargados en {time.perf_counter() - t:.1f}s.")
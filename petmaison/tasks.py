@@ -0,0 +1,76 @@
+"""Tareas del worker (`flask worker`): reportes CSV, catálogo y tickets PDF."""
+from __future__ import annotations
+
+import csv
+import os
+from typing import Any
+
+from flask import current_app, render_template
+
+from . import catalog, csvreports, replicas, respcache
+from .extensions import db
+from .jobs import JobContext, task
+from .models import Product, Sale, SaleItem
+
+CHUNK_SIZE = 5000
+
+
+@task("report_csv")
+def report_csv(ctx: JobContext, report: str, args: dict[str, str] | None = None) -> None:
+    if report not in csvreports.REPORTS:
+        raise ValueError(f"Reporte desconocido: {report}")
+    spec, args = csvreports.REPORTS[report], args or {}
+    with replicas.reading():
+        ctx.progress(0, csvreports.count(spec, args))
+        with open(ctx.output(spec.filename), "w", encoding="utf-8", newline="") as f:
+            for text in csvreports.iter_csv(spec, args, CHUNK_SIZE, progress=ctx.progress):
+                f.write(text)
+
+
+@task("products_export")
+def products_export(ctx: JobContext) -> None:
+    ctx.progress(0, db.session.execute(db.select(db.func.count(Product.id))).scalar())
+    with open(ctx.output("productos.xlsx"), "wb") as f:
+        n = catalog.export_products(f, progress=ctx.progress)
+    ctx.progress(n, message=f"{n} productos exportados")
+
+
+@task("products_import")
+def products_import(ctx: JobContext, path: str, filename: str) -> None:
+    """`path` es el archivo subido (relativo a MEDIA_ROOT); se borra al terminar."""
+    source = os.path.join(current_app.config["MEDIA_ROOT"], path)
+
+    def progress(result: catalog.ImportResult) -> None:
+        ctx.progress(result.rows, message=f"{result.upserted} productos importados, {result.error_count} con error")
+
+    try:
+        with open(source, "rb") as f:
+            result = catalog.import_products(f, filename, progress=progress)
+    finally:
+        os.remove(source)
+    respcache.invalidate("products")
+    progress(result)
+    if result.errors:
+        with open(ctx.output("errores.csv"), "w", encoding="utf-8", newline="") as f:
+            cw = csv.writer(f)
+            cw.writerow(["fila", "error"])
+            cw.writerows(result.errors)
+
+
+@task("sale_ticket_pdf")
+def sale_ticket_pdf(ctx: JobContext, sale_id: int) -> None:
+    from xhtml2pdf import pisa
+
+    sale = db.session.get(
+        Sale,
+        sale_id,
+        options=[db.joinedload(Sale.customer), db.selectinload(Sale.items).joinedload(SaleItem.product)],
+    )
+    if sale is None:
+        raise ValueError(f"Venta {sale_id} no encontrada")
+    html = render_template("sales/ticket.html", sale=sale)
+    with open(ctx.output(f"ticket-{sale.id}.pdf"), "wb") as f:
+        status: Any = pisa.CreatePDF(html, dest=f, encoding="utf-8")
+    if status.err:
+        raise RuntimeError(f"xhtml2pdf: {status.err} errores generando el ticket")
+    ctx.progress(1, 1)
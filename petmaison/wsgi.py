@@ -0,0 +1,4 @@
+"""Punto de entrada WSGI: `gunicorn petmaison.wsgi:app`, `FLASK_APP=petmaison.wsgi`."""
+from . import create_app
+
+app = create_app()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+from decimal import Decimal
+
+import pytest
+from flask import g, request_started
+
+os.environ.setdefault("FLASK_ENV", "development")
+os.environ.setdefault("SQLITE_URL", "sqlite://")
+# Sin caché de respuestas salvo en los tests que la activan explícitamente.
+os.environ.setdefault("RESPONSE_CACHE", "none")
+# Ídem la foto del catálogo: cada test recrea la base con los mismos ids.
+os.environ.setdefault("PRODUCT_CACHE", "0")
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from petmaison import create_app  # noqa: E402
+from petmaison.extensions import db  # noqa: E402
+from petmaison.models import Product, User  # noqa: E402
+
+flask_app = create_app()
+
+
+def _forget_login(sender, **extra):
+    # Los requests reutilizan el app context del fixture (y su `g`); sin esto
+    # flask-login recordaría al usuario entre clientes distintos.
+    g.pop("_login_user", None)
+
+
+request_started.connect(_forget_login, flask_app)
+
+
+@pytest.fixture()
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, QUERY_BUDGET_ENFORCE=True)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def user(app):
+    u = User(
+        email="test@petmaison.cl",
+        name="Test",
+        password_hash=generate_password_hash("x"),
+        role="admin",
+    )
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+@pytest.fixture()
+def client(app, user):
+    c = app.test_client()
+    c.post("/login", data={"email": user.email, "password": "x"})
+    return c
+
+
+@pytest.fixture()
+def media(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "MEDIA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def make_product(sku: str, stock: int = 10, **kw) -> Product:
+    p = Product(
+        sku=sku,
+        name=kw.pop("name", f"Producto {sku}"),
+        cost_net=kw.pop("cost_net", Decimal("1000")),
+        price_gross=kw.pop("price_gross", Decimal("1190")),
+        stock=stock,
+        **kw,
+    )
+    db.session.add(p)
+    db.session.commit()
+    return p
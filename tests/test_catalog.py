@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import io
+from decimal import Decimal
+
+from openpyxl import Workbook, load_workbook
+
+from petmaison import catalog
+from petmaison.extensions import db
+from petmaison.models import Product
+
+from .conftest import make_product
+
+
+def test_csv_import_upserts_by_sku_in_batches_and_reports_errors(app):
+    make_product("A1", stock=7, min_stock=2)
+    data = "\n".join(
+        [
+            "SKU;Name;cost_net;price_gross;brand",
+            "A1;Collar rojo;1.000,50;1190;Acme",  # existente: actualiza sin tocar stock ni min_stock
+            "B2;Arena;500;595;",
+            ";Sin sku;1;1;",
+            "C3;Precio malo;abc;1;",
+            "B2;Arena 10kg;600;714;Cat",  # repetido en el lote: gana la última
+            "D4;Pelota;100;119;",
+        ]
+    )
+    result = catalog.import_products(io.BytesIO(data.encode()), "cat.csv", batch_size=2)
+
+    assert result.rows == 6 and result.upserted == 4
+    assert result.errors == [(4, "sku: requerido"), (5, "cost_net: número inválido 'abc'")]
+    rows = {p.sku: p for p in db.session.execute(db.select(Product)).scalars()}
+    assert set(rows) == {"A1", "B2", "D4"}
+    assert (rows["A1"].name, rows["A1"].cost_net, rows["A1"].stock, rows["A1"].min_stock) == (
+        "Collar rojo",
+        Decimal("1000.50"),
+        7,
+        2,
+    )
+    assert (rows["B2"].name, rows["B2"].brand) == ("Arena 10kg", "Cat")
+
+
+def test_decimal_reads_chilean_thousands_separator():
+    assert catalog._decimal("12.990", "price_gross") == Decimal("12990.00")
+    assert catalog._decimal("$1.190", "price_gross") == Decimal("1190.00")
+    assert catalog._decimal("1.234.567", "price_gross") == Decimal("1234567.00")
+    assert catalog._decimal("1.234.567,5", "price_gross") == Decimal("1234567.50")
+    assert catalog._decimal("12.99", "price_gross") == Decimal("12.99")
+    assert catalog._decimal("990,5", "price_gross") == Decimal("990.50")
+    assert catalog._decimal(1.234, "price_gross") == Decimal("1.23")  # número de Excel, no texto
+
+
+def test_xlsx_roundtrip_via_endpoints(app, client):
+    make_product("A1", name="Collar")
+    resp = client.get("/products/export.xlsx")
+    ws = load_workbook(io.BytesIO(resp.data)).active
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0] == catalog.EXPORT_COLUMNS
+    assert rows[1][:4] == ("A1", "Collar", 1000, 1190)
+
+    wb = Workbook()
+    wb.active.append(["sku", "name", "cost_net", "price_gross", "active"])
+    wb.active.append([12345, "Nuevo", 10, 11.9, "no"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    resp = client.post("/products/import", data={"file": (buf, "cat.xlsx")}, content_type="multipart/form-data")
+    assert resp.status_code == 200
+    p = db.session.execute(db.select(Product).filter_by(sku="12345")).scalar_one()
+    assert (p.name, p.price_gross, p.active) == ("Nuevo", Decimal("11.90"), False)
+
+    resp = client.post(
+        "/products/import", data={"file": (io.BytesIO(b"sku,name\nX,Y"), "cat.csv")}, content_type="multipart/form-data"
+    )
+    assert resp.status_code == 302
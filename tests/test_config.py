@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+from sqlalchemy.pool import NullPool
+
+from petmaison import config
+from petmaison.dbpool import TimedQueuePool
+
+
+def test_engine_options_follow_gunicorn_threads(monkeypatch):
+    monkeypatch.setenv("GUNICORN_THREADS", "8")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+    opts = config.engine_options()
+    assert opts["poolclass"] is TimedQueuePool
+    assert (opts["pool_size"], opts["max_overflow"], opts["pool_pre_ping"]) == (8, 4, True)
+    assert opts["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+def test_engine_options_pgbouncer(monkeypatch):
+    monkeypatch.setenv("DB_PGBOUNCER", "1")
+    opts = config.engine_options()
+    assert opts == {"poolclass": NullPool, "connect_args": {"prepare_threshold": None}}
+
+
+def test_pool_endpoint_is_internal(app, client):
+    stats = client.get("/internal/pool").get_json()
+    assert "status" in stats
+    anon = app.test_client()
+    assert anon.get("/internal/pool", environ_base={"REMOTE_ADDR": "10.0.0.5"}).status_code == 403
+
+
+def test_internal_endpoints_need_admin_token_or_allowlist(app, monkeypatch):
+    anon = app.test_client()
+    # Loopback no basta: detrás de un proxy local todo llega desde 127.0.0.1.
+    assert anon.get("/metrics", environ_base={"REMOTE_ADDR": "127.0.0.1"}).status_code == 403
+
+    monkeypatch.setitem(app.config, "INTERNAL_TOKEN", "s3creto")
+    assert anon.get("/metrics", headers={"Authorization": "Bearer otro"}).status_code == 403
+    assert anon.get("/metrics", headers={"Authorization": "Bearer s3creto"}).status_code == 200
+
+    monkeypatch.setitem(app.config, "INTERNAL_ALLOWLIST", ["10.0.0.9"])
+    assert anon.get("/internal/pool", environ_base={"REMOTE_ADDR": "10.0.0.9"}).status_code == 200
+
+
+def test_timed_pool_records_waits():
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+    assert engine.pool.waits == 1 and engine.pool.wait_max >= 0
+
+
+def test_importing_models_does_not_build_the_app():
+    code = (
+        "import sys, petmaison.models; "
+        "print(sorted(m for m in ('petmaison.app', 'flask_admin', 'flask_smorest', 'pandas') if m in sys.modules))"
+    )
+    env = dict(os.environ, FLASK_ENV="development", SQLITE_URL="sqlite://")
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_worker_app_has_no_web_routes():
+    from petmaison import create_app
+
+    app = create_app(web=False)
+    assert "worker" in app.cli.commands
+    assert {r.endpoint for r in app.url_map.iter_rules()} == {"static"}
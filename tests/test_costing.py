@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from petmaison import costing
+from petmaison.extensions import db
+from petmaison.models import Product, Purchase, PurchaseItem, Sale, SaleItem, StockMovement, Supplier
+
+from .conftest import make_product
+
+
+def _purchase(lines):
+    sup = Supplier(name="Prov")
+    db.session.add(sup)
+    db.session.flush()
+    p = Purchase(supplier_id=sup.id)
+    db.session.add(p)
+    db.session.flush()
+    for product, qty, cost in lines:
+        db.session.add(
+            PurchaseItem(purchase_id=p.id, product_id=product.id, qty=qty, unit_cost_net=Decimal(cost), line_total=0)
+        )
+    db.session.commit()
+    return p
+
+
+def _sale(user, lines, discount="0"):
+    s = Sale(user_id=user.id, payment_method="EFECTIVO", discount=Decimal(discount))
+    db.session.add(s)
+    db.session.flush()
+    for product, qty, price in lines:
+        db.session.add(
+            SaleItem(sale_id=s.id, product_id=product.id, qty=qty, unit_price_net=Decimal(price), line_total=0)
+        )
+    s.subtotal_net = sum(Decimal(price) * qty for _, qty, price in lines)
+    db.session.commit()
+    return s
+
+
+def test_purchases_move_the_average_and_sales_record_it(app, client, user):
+    a = make_product("A", stock=2, cost_net=Decimal("1000"), category="Snacks")
+    b = make_product("B", stock=0, cost_net=Decimal("80"), category="Arena")
+    assert a.avg_cost == Decimal("1000")
+
+    client.post(f"/purchases/{_purchase([(a, 1, '400'), (b, 5, '50'), (a, 1, '400')]).id}/confirm")
+    assert db.session.get(Product, a.id).avg_cost == Decimal("700.00")
+    assert db.session.get(Product, b.id).avg_cost == Decimal("50.00")
+
+    client.post(f"/sales/{_sale(user, [(a, 1, '1000'), (b, 2, '100')]).id}/confirm")
+    out = dict(
+        db.session.execute(
+            db.select(StockMovement.product_id, StockMovement.unit_cost_net).filter(StockMovement.type == "OUT")
+        ).all()
+    )
+    assert out == {a.id: Decimal("700.00"), b.id: Decimal("50.00")}
+    # Vender no cambia el promedio; el costo de lista tampoco se toca.
+    assert db.session.get(Product, a.id).avg_cost == Decimal("700.00")
+    assert db.session.get(Product, a.id).cost_net == Decimal("1000")
+
+    today = date.today()
+    rows = {r.category: r for r in costing.margins(today, today)}
+    assert (rows["Snacks"].revenue, rows["Snacks"].cost, rows["Snacks"].margin_pct) == (
+        Decimal("1000.00"),
+        Decimal("700.00"),
+        Decimal("30.00"),
+    )
+    assert (rows["Arena"].qty, rows["Arena"].margin) == (2, Decimal("100.00"))
+
+
+def test_margin_api_prorates_sale_discount_by_product_and_month(app, client, user):
+    a = make_product("A", cost_net=Decimal("500"))
+    b = make_product("B", cost_net=Decimal("100"))
+    client.post(f"/sales/{_sale(user, [(a, 1, '1500'), (b, 5, '100')], discount='200').id}/confirm")
+
+    today = date.today().isoformat()
+    query = {"from": today, "to": today, "by": "product", "groupBy": "month"}
+    resp = client.get("/api/reports/margins", query_string=query)
+    rows = {r["sku"]: r for r in resp.get_json()}
+    assert rows["A"]["period"] == today[:7]
+    # 10% de descuento en la venta: cada línea pierde su 10% de ingreso.
+    assert (rows["A"]["revenue"], rows["A"]["cost"], rows["A"]["margin"]) == ("1350.00", "500.00", "850.00")
+    assert (rows["B"]["revenue"], rows["B"]["margin"]) == ("450.00", "-50.00")
+    assert client.get("/api/reports/margins", query_string=dict(query, by="brand")).status_code == 422
+    assert app.test_client().get("/api/reports/margins", query_string=query).status_code == 401
+
+
+def test_margins_aggregate_legacy_per_line_movements(app, user):
+    # Antes de `stock.sale_out` cada línea tenía su propia salida.
+    a = make_product("A", cost_net=Decimal("900"))
+    s = _sale(user, [(a, 1, "1000"), (a, 1, "1000")])
+    s.status = "CONFIRMED"
+    for _ in range(2):
+        db.session.add(
+            StockMovement(
+                product_id=a.id, type="OUT", ref_type="SALE", ref_id=s.id, qty=1, unit_cost_net=Decimal("600")
+            )
+        )
+    db.session.commit()
+
+    (row,) = costing.margins(date.today(), date.today(), by="product")
+    assert (row.qty, row.revenue, row.cost) == (2, Decimal("2000.00"), Decimal("1200.00"))
+
+
+def test_recompute_costs_replays_history(app):
+    p = make_product("K1", stock=5, cost_net=Decimal("100"))
+    history = [
+        (datetime(2025, 1, 5), "IN", 5, "200"),
+        (datetime(2025, 1, 20), "OUT", 4, "100"),  # costeada al costo de lista, como antes
+        (datetime(2025, 3, 1), "IN", 6, "170"),
+        (datetime(2025, 3, 2), "OUT", 2, "100"),
+    ]
+    for when, type_, qty, cost in history:
+        db.session.add(
+            StockMovement(
+                product_id=p.id, type=type_, ref_type="ADJUSTMENT", qty=qty, unit_cost_net=Decimal(cost), created_at=when
+            )
+        )
+        p.stock += -qty if type_ == "OUT" else qty
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["recompute-costs"])
+    assert "2 salidas corregidas" in result.output
+    out = db.session.execute(
+        db.select(StockMovement.unit_cost_net).filter(StockMovement.type == "OUT").order_by(StockMovement.created_at)
+    ).scalars()
+    assert list(out) == [Decimal("150.00"), Decimal("160.00")]
+    assert db.session.get(Product, p.id).avg_cost == Decimal("160.00")
+    assert costing.recompute() == 0
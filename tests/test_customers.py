@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from petmaison import customers
+from petmaison.extensions import db
+from petmaison.models import Customer, CustomerStats, Sale, SaleItem
+
+from .conftest import make_product
+
+
+def _customer(**kw) -> Customer:
+    c = Customer(name=kw.pop("name", "Cliente"), **kw)
+    db.session.add(c)
+    db.session.commit()
+    return c
+
+
+def _sale(user, customer, product, when):
+    s = Sale(
+        user_id=user.id, customer_id=customer.id, payment_method="EFECTIVO", date=when, total=Decimal("1190")
+    )
+    db.session.add(s)
+    db.session.flush()
+    db.session.add(SaleItem(sale_id=s.id, product_id=product.id, qty=1, unit_price_net=Decimal("1000"), line_total=0))
+    db.session.commit()
+    return s
+
+
+def test_confirm_sale_updates_customer_stats(app, client, user):
+    c = _customer(rut="12.345.678-k")
+    p = make_product("A", stock=10)
+    late, early = _sale(user, c, p, datetime(2025, 3, 11)), _sale(user, c, p, datetime(2025, 3, 1))
+
+    for s in (late, early, late):  # confirmar dos veces no suma dos veces
+        client.post(f"/sales/{s.id}/confirm")
+
+    stats = db.session.get(CustomerStats, c.id)
+    assert (stats.tickets, stats.total) == (2, Decimal("2380.00"))
+    assert (stats.first_sale_at, stats.last_sale_at) == (datetime(2025, 3, 1), datetime(2025, 3, 11))
+    assert stats.days_between_tickets == 10.0
+
+    db.session.expire_all()
+    assert customers.rebuild_stats() == 1
+    rebuilt = db.session.get(CustomerStats, c.id)
+    assert (rebuilt.tickets, rebuilt.total, rebuilt.last_sale_at) == (2, Decimal("2380.00"), datetime(2025, 3, 11))
+
+
+def test_customer_search_by_rut_phone_and_email_prefix(app, client):
+    ana = _customer(name="Ana", rut="12.345.678-5", phone="+56 9 8765 4321", email="Ana@Example.cl")
+    _customer(name="Beto", rut="9.876.543-2", phone="22 123 4567", email="beto@example.cl")
+    assert ana.rut_key == "123456785" and ana.phone_key == "987654321" and ana.email_key == "ana@example.cl"
+
+    def names(q):
+        resp = client.get("/api/customers", query_string={"q": q})
+        assert resp.status_code == 200
+        return [c["name"] for c in resp.get_json()]
+
+    assert names("12345") == ["Ana"]
+    assert names("12.345.6") == ["Ana"]
+    assert names("+569 876") == ["Ana"]
+    assert names("ANA@ex") == ["Ana"]
+    assert names("2212") == ["Beto"]
+    assert names("zz") == []
+    assert client.get("/api/customers", query_string={"q": "1"}).status_code == 422
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from petmaison import rollups
+from petmaison.extensions import db
+from petmaison.models import Sale, SaleItem, SalesDailyRollup, SalesDailyTotal
+
+from .conftest import make_product
+
+
+def _sale(user, product, qty, price="1000", date=None, status="DRAFT", discount="0"):
+    net = Decimal(price) * qty
+    s = Sale(
+        user_id=user.id,
+        payment_method="EFECTIVO",
+        status=status,
+        date=date or datetime.utcnow(),
+        subtotal_net=net,
+        discount=Decimal(discount),
+        vat=(net - Decimal(discount)) * Decimal("0.19"),
+        total=(net - Decimal(discount)) * Decimal("1.19"),
+    )
+    db.session.add(s)
+    db.session.flush()
+    db.session.add(
+        SaleItem(
+            sale_id=s.id,
+            product_id=product.id,
+            qty=qty,
+            unit_price_net=Decimal(price),
+            line_total=net * Decimal("1.19"),
+        )
+    )
+    db.session.commit()
+    return s
+
+
+def test_confirm_sale_updates_rollup(app, client, user):
+    p = make_product("R1")
+    for qty in (2, 3):
+        s = _sale(user, p, qty)
+        client.post(f"/sales/{s.id}/confirm")
+
+    row = db.session.execute(db.select(SalesDailyRollup)).scalar_one()
+    assert (row.units, row.net, row.tickets) == (5, Decimal("5000"), 2)
+    totals = db.session.execute(db.select(SalesDailyTotal)).scalar_one()
+    assert (totals.total, totals.tickets) == (Decimal("5950"), 2)
+
+    html = client.get("/").get_data(as_text=True)
+    assert "$5.950" in html and "Producto R1" in html
+
+
+def test_rebuild_matches_incremental(app, user):
+    p = make_product("R2")
+    _sale(user, p, 4, status="CONFIRMED", date=datetime(2025, 3, 10, 15))
+    _sale(user, p, 1, status="CONFIRMED", date=datetime(2025, 3, 11))
+    _sale(user, p, 9, status="DRAFT", date=datetime(2025, 3, 11))
+
+    assert rollups.rebuild() == 2
+    rows = db.session.execute(db.select(SalesDailyRollup).order_by(SalesDailyRollup.day)).scalars().all()
+    assert [(r.day.isoformat(), r.units) for r in rows] == [("2025-03-10", 4), ("2025-03-11", 1)]
+
+    assert rollups.rebuild(fro=datetime(2025, 3, 11).date(), to=datetime(2025, 3, 11).date()) == 1
+    assert db.session.execute(db.select(db.func.count()).select_from(SalesDailyTotal)).scalar() == 2
+
+
+def test_daily_total_net_is_after_sale_discount(app, client, user):
+    p = make_product("R3")
+    client.post(f"/sales/{_sale(user, p, 2, discount='500').id}/confirm")
+    assert db.session.execute(db.select(SalesDailyTotal.net)).scalar_one() == Decimal("1500")
+
+    rollups.rebuild()
+    assert db.session.execute(db.select(SalesDailyTotal.net)).scalar_one() == Decimal("1500")
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from petmaison import idempotency
+from petmaison.extensions import db
+from petmaison.models import IdempotencyKey, Product, Sale, SaleItem, StockMovement
+
+from .conftest import make_product
+
+
+def test_pos_retry_replays_redirect_without_duplicate_lines(app, client):
+    a = make_product("A")
+    form = {"product_id": a.id, "qty": 2, "idempotency_key": "k-pos-1"}
+
+    first = client.post("/sales/pos", data=form)
+    retry = client.post("/sales/pos", data=form)
+
+    assert first.status_code == retry.status_code == 302
+    assert retry.headers["Location"] == first.headers["Location"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.session.execute(db.select(db.func.count(Sale.id))).scalar() == 1
+    assert db.session.execute(db.select(db.func.count(SaleItem.id))).scalar() == 1
+
+    # Otra clave es otro ítem
+    client.post("/sales/pos", data={**form, "idempotency_key": "k-pos-2"})
+    assert db.session.execute(db.select(db.func.count(Sale.id))).scalar() == 2
+
+
+def test_confirm_retry_replays_and_failed_attempt_is_not_stored(app, client, user):
+    a = make_product("A", stock=1)
+    sale = Sale(user_id=user.id, payment_method="EFECTIVO")
+    db.session.add(sale)
+    db.session.flush()
+    db.session.add(SaleItem(sale_id=sale.id, product_id=a.id, qty=2, unit_price_net=1000, line_total=2380))
+    db.session.commit()
+    url = f"/sales/{sale.id}/confirm"
+
+    client.post(url, data={"idempotency_key": "k-conf"})  # stock insuficiente: rollback
+    assert db.session.get(IdempotencyKey, (user.id, "k-conf")) is None
+
+    db.session.execute(db.update(Product).values(stock=5))
+    db.session.commit()
+    client.post(url, data={"idempotency_key": "k-conf"})
+    retry = client.post(url, data={"idempotency_key": "k-conf"})
+
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.session.execute(db.select(db.func.count(StockMovement.id))).scalar() == 1
+    assert db.session.get(Product, a.id).stock == 3
+
+
+def test_api_replays_body_and_rejects_reused_key(app, client):
+    a = make_product("A")
+    headers = {"Idempotency-Key": "k-api"}
+    body = {"lines": [{"product_id": a.id, "qty": 1}]}
+
+    first = client.post("/api/pos/carts", json=body, headers=headers)
+    retry = client.post("/api/pos/carts", json=body, headers=headers)
+    other = client.post("/api/pos/carts", json={"lines": [{"product_id": a.id, "qty": 5}]}, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert other.status_code == 422
+    assert db.session.execute(db.select(db.func.count(Sale.id))).scalar() == 1
+
+
+def test_purge_drops_expired_keys(app, user):
+    db.session.add_all([
+        IdempotencyKey(user_id=user.id, key="old", fingerprint="x", status_code=302,
+                       created_at=datetime.utcnow() - timedelta(hours=48)),
+        IdempotencyKey(user_id=user.id, key="new", fingerprint="x", status_code=302),
+    ])
+    db.session.commit()
+
+    assert idempotency.purge() == 1
+    assert db.session.execute(db.select(IdempotencyKey.key)).scalars().all() == ["new"]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from petmaison import images
+from petmaison.extensions import db
+from petmaison.models import Product
+
+from .conftest import make_product
+
+
+def _png(size=(1200, 800)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGBA", size, (200, 30, 30, 128)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_upload_creates_hashed_thumbnails_served_immutable(app, client, media):
+    data = _png()
+    resp = client.post(
+        "/products/create",
+        data={"sku": "A1", "name": "Collar", "cost_net": "1", "price_gross": "2", "image": (io.BytesIO(data), "foto.png")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 302
+    path = db.session.execute(db.select(Product.image_path)).scalar()
+    assert images.is_immutable(path.removeprefix("/media/"))
+    with Image.open(media / path.removeprefix("/media/").replace(".png", "-thumb.webp")) as thumb:
+        assert max(thumb.size) == 160
+    assert (media / path.removeprefix("/media/").replace(".png", "-medium.jpg")).exists()
+
+    thumb_url = images.variant_url(path, "thumb", "webp")
+    assert thumb_url in client.get("/products").get_data(as_text=True)
+
+    resp = client.get(thumb_url)
+    assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert client.get(thumb_url, headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+
+    app.config["MEDIA_ACCEL_REDIRECT"] = "/_media/"
+    try:
+        resp = client.get(thumb_url)
+    finally:
+        app.config["MEDIA_ACCEL_REDIRECT"] = None
+    assert resp.headers["X-Accel-Redirect"] == "/_media/" + thumb_url.removeprefix("/media/")
+    assert resp.mimetype == "image/webp" and resp.get_data() == b""
+
+    assert client.get("/media/../config.py").status_code == 404
+
+
+def test_invalid_upload_and_backfill_of_legacy_images(app, client, media, monkeypatch):
+    resp = client.post(
+        "/products/create",
+        data={"sku": "X", "name": "X", "image": (io.BytesIO(b"no soy imagen"), "x.jpg")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 200
+    assert db.session.execute(db.select(Product)).first() is None
+
+    with monkeypatch.context() as m, pytest.raises(images.InvalidImage):
+        m.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+        images.store(_png((300, 300)))
+
+    (media / "abc_legacy.png").write_bytes(_png((300, 300)))
+    legacy = make_product("L1", image_path="/media/abc_legacy.png")
+    make_product("L2", image_path="/media/borrada.png")
+    done, missing = images.backfill()
+    assert (done, missing) == (1, ["/media/borrada.png"])
+    db.session.refresh(legacy)
+    assert images.is_immutable(legacy.image_path.removeprefix("/media/"))
+    assert os.path.exists(media / images.variant_url(legacy.image_path, "thumb", "jpg").removeprefix("/media/"))
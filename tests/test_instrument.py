@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import logging
+
+from .conftest import make_product
+
+
+def test_server_timing_metrics_and_slow_log(app, client, caplog, monkeypatch):
+    make_product("A1")
+    monkeypatch.setitem(app.config, "SLOW_REQUEST_MS", 0.001)
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        resp = client.get("/api/products")
+        resp.close()
+    assert resp.headers["Server-Timing"].startswith('db;dur=')
+    assert '1 consultas"' in resp.headers["Server-Timing"]
+    assert any("Request lento GET /api/products" in r.getMessage() and "FROM products" in r.getMessage() for r in caplog.records)
+
+    client.get("/reports/inventory.csv").close()  # streaming: se registra al cerrar
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'petmaison_request_queries_bucket{endpoint="api_products.list_products",method="GET"' in body
+    assert 'petmaison_request_duration_seconds_count{endpoint="reports.inventory_csv",method="GET"' in body
+    assert 'petmaison_requests_total{endpoint="api_products.list_products",method="GET",status="200"' in body
+
+
+def test_metrics_is_internal(app):
+    resp = app.test_client().get("/metrics", environ_base={"REMOTE_ADDR": "10.0.0.8"})
+    assert resp.status_code == 403
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import io
+from datetime import datetime, timedelta
+
+from petmaison import jobs
+from petmaison.extensions import db
+from petmaison.models import Job, Product, Sale, SaleItem
+
+from .conftest import make_product
+
+
+def test_report_job_via_api_runs_in_worker_and_downloads_privately(app, client, media, monkeypatch):
+    make_product("A1", name="Collar", stock=3)
+    make_product("B2", name="Arena", stock=9)
+
+    resp = client.post("/api/jobs", json={"kind": "report_csv", "params": {"report": "inventory"}})
+    assert resp.status_code == 202
+    jid = resp.get_json()["id"]
+    assert client.get(f"/api/jobs/{jid}").get_json()["status"] == "QUEUED"
+
+    assert jobs.work(burst=True) == 1
+
+    job = client.get(f"/api/jobs/{jid}").get_json()
+    assert (job["status"], job["done"], job["total"], job["percent"]) == ("DONE", 2, 2, 100)
+    data = client.get(job["download_url"]).get_data(as_text=True)
+    assert data.splitlines() == ["sku,nombre,stock,min_stock,precio_bruto", "A1,Collar,3,0,1190.00", "B2,Arena,9,0,1190.00"]
+
+    result_path = db.session.get(Job, jid).result_path
+    for prefix in ("", "./", "x/../"):
+        assert client.get(f"/media/{prefix}{result_path}").status_code == 404
+
+    monkeypatch.setitem(app.config, "MEDIA_ACCEL_REDIRECT", "/_media/")
+    accel = client.get(job["download_url"])
+    assert accel.headers["X-Accel-Redirect"] == f"/_media/{result_path}"
+    assert accel.mimetype == "text/csv"
+    assert accel.headers["Content-Disposition"] == f'attachment; filename="{result_path.rsplit("/", 1)[1]}"'
+
+
+def test_failed_job_keeps_error_and_bad_params_are_rejected(app, client, media):
+    assert client.post("/api/jobs", json={"kind": "report_csv", "params": {"nope": 1}}).status_code == 422
+    # Anónimo: 401 antes de validar el cuerpo
+    assert app.test_client().post("/api/jobs", json={"kind": "nada"}).status_code == 401
+
+    jid = client.post("/api/jobs", json={"kind": "report_csv", "params": {"report": "nada"}}).get_json()["id"]
+    jobs.work(burst=True)
+
+    job = db.session.get(Job, jid)
+    assert (job.status, job.error, job.result_path) == ("FAILED", "ValueError: Reporte desconocido: nada", None)
+
+
+def test_ticket_pdf_and_large_import_are_offloaded(app, client, user, media, monkeypatch):
+    p = make_product("A1")
+    sale = Sale(user_id=user.id, payment_method="EFECTIVO", total=1190)
+    db.session.add(sale)
+    db.session.flush()
+    db.session.add(SaleItem(sale_id=sale.id, product_id=p.id, qty=1, unit_price_net=1000, line_total=1190))
+    db.session.commit()
+    assert client.get(f"/sales/{sale.id}/ticket").status_code == 200
+
+    monkeypatch.setitem(app.config, "IMPORT_INLINE_MAX_BYTES", 10)
+    upload = b"sku,name,cost_net,price_gross\nZ9,Nuevo,10,11.9\n"
+    resp = client.post(
+        "/products/import", data={"file": (io.BytesIO(upload), "cat.csv")}, content_type="multipart/form-data"
+    )
+    assert resp.status_code == 302 and "/jobs/" in resp.headers["Location"]
+    client.post(f"/sales/{sale.id}/ticket.pdf")
+    assert db.session.execute(db.select(db.func.count(Product.id))).scalar() == 1
+
+    assert jobs.work(burst=True) == 2
+
+    imported, ticket = db.session.execute(db.select(Job).order_by(Job.id)).scalars().all()
+    assert imported.status == "DONE" and imported.message.startswith("1 productos importados")
+    assert db.session.execute(db.select(Product).filter_by(sku="Z9")).scalar_one().name == "Nuevo"
+    assert not list((media / "jobs" / "uploads").iterdir())
+    assert ticket.status == "DONE", ticket.error
+    assert client.get(f"/jobs/{ticket.id}/download").data.startswith(b"%PDF")
+
+
+def test_stale_running_jobs_are_requeued_then_failed(app, user):
+    old = datetime.utcnow() - timedelta(hours=1)
+    retry = Job(kind="products_export", status="RUNNING", attempts=1, heartbeat_at=old)
+    dead = Job(kind="products_export", status="RUNNING", attempts=3, heartbeat_at=old)
+    alive = Job(kind="products_export", status="RUNNING", attempts=1, heartbeat_at=datetime.utcnow())
+    db.session.add_all([retry, dead, alive])
+    db.session.commit()
+
+    assert jobs.requeue_stale() == 2
+    assert [db.session.get(Job, j.id).status for j in (retry, dead, alive)] == ["QUEUED", "FAILED", "RUNNING"]
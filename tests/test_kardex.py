@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from petmaison import kardex
+from petmaison.extensions import db
+from petmaison.models import Product, StockMovement, StockSnapshot
+
+from .conftest import make_product
+
+
+def _move(product, when, type_, qty, cost=None):
+    db.session.add(
+        StockMovement(
+            product_id=product.id,
+            type=type_,
+            ref_type="ADJUSTMENT",
+            qty=qty,
+            unit_cost_net=Decimal(cost) if cost else None,
+            created_at=when,
+        )
+    )
+    product.stock += -qty if type_ == "OUT" else qty
+
+
+def _ledger(app):
+    # Stock inicial 5 (sin movimiento), luego enero/febrero/marzo.
+    p = make_product("K1", stock=5, cost_net=Decimal("100"))
+    _move(p, datetime(2025, 1, 5), "IN", 5, "200")
+    _move(p, datetime(2025, 1, 20), "OUT", 4)
+    _move(p, datetime(2025, 2, 3), "OUT", 1)
+    _move(p, datetime(2025, 3, 1), "IN", 10, "160")
+    _move(p, datetime(2025, 3, 2), "OUT", 2)
+    db.session.commit()
+    return p
+
+
+def test_close_months_and_opening_balance(app):
+    p = _ledger(app)
+    assert kardex.opening_balance(p, datetime(2025, 3, 1)) == 5
+    assert kardex.close_months(until=date(2025, 3, 15)) == 2
+    snaps = db.session.execute(db.select(StockSnapshot).order_by(StockSnapshot.period)).scalars().all()
+    assert [(s.period, s.qty, s.avg_cost) for s in snaps] == [
+        (date(2025, 1, 1), 6, Decimal("150.00")),
+        (date(2025, 2, 1), 5, Decimal("150.00")),
+    ]
+    # Desde el snapshot de febrero + movimientos de marzo anteriores al día 2
+    assert kardex.opening_balance(p, datetime(2025, 3, 2)) == 15
+    assert kardex.opening_balance(p, None) == 5
+    assert kardex.close_months(until=date(2025, 3, 15)) == 0
+
+
+def test_kardex_view_pages_with_running_balance(app, client):
+    p = _ledger(app)
+    kardex.close_months(until=date(2025, 3, 1))
+    page = kardex.page(p, datetime(2025, 1, 10), None, per_page=2)
+    assert page.opening == 10
+    assert [b for _, b in page.rows] == [6, 5]
+    page = kardex.page(p, datetime(2025, 1, 10), None, page.next_cursor, per_page=2)
+    assert [b for _, b in page.rows] == [15, 13] and page.next_cursor is None
+    assert db.session.get(Product, p.id).stock == 13
+
+    html = client.get(f"/inventory/kardex/{p.id}?from=2025-02-01&to=2025-03-01").get_data(as_text=True)
+    assert "Saldo inicial" in html and "<td>15</td>" in html and "<td>13</td>" not in html
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime, timedelta
+
+from petmaison.extensions import db
+from petmaison.models import Customer
+from petmaison.pagination import PER_PAGE, paginate
+
+from .conftest import make_product
+
+
+def test_keyset_walks_forward_and_back(app):
+    base = datetime(2025, 1, 1)
+    # Dos filas con el mismo created_at: el id desempata.
+    for i in range(7):
+        db.session.add(Customer(name=f"C{i}", created_at=base + timedelta(minutes=min(i, 5))))
+    db.session.commit()
+    query = db.select(Customer)
+
+    p1 = paginate(query, Customer, per_page=3)
+    assert [c.name for c in p1.items] == ["C6", "C5", "C4"] and p1.prev_cursor is None
+    p2 = paginate(query, Customer, p1.next_cursor, per_page=3)
+    assert [c.name for c in p2.items] == ["C3", "C2", "C1"]
+    p3 = paginate(query, Customer, p2.next_cursor, per_page=3)
+    assert [c.name for c in p3.items] == ["C0"] and p3.next_cursor is None
+    back = paginate(query, Customer, p3.prev_cursor, per_page=3)
+    assert [c.name for c in back.items] == ["C3", "C2", "C1"]
+    assert [c.name for c in paginate(query, Customer, back.prev_cursor, per_page=3).items] == ["C6", "C5", "C4"]
+    assert [c.name for c in paginate(query, Customer, "basura", per_page=3).items] == ["C6", "C5", "C4"]
+
+
+def test_api_products_cursor_header(app, client):
+    for i in range(3):
+        make_product(f"P{i}")
+    resp = client.get("/api/products?limit=2")
+    cursors = json.loads(resp.headers["X-Pagination"])
+    assert len(resp.get_json()) == 2 and cursors["prev"] is None
+    resp = client.get(f"/api/products?limit=2&cursor={cursors['next']}")
+    assert [p["sku"] for p in resp.get_json()] == ["P0"]
+
+
+def test_list_view_renders_pager(app, client):
+    db.session.add_all([Customer(name=f"Cliente {i:02}") for i in range(PER_PAGE + 1)])
+    db.session.commit()
+    html = client.get("/customers?q=Cliente").get_data(as_text=True)
+    assert "Cliente 00" not in html
+    link = re.search(r'href="(/customers\?[^"]*cursor=[^"]+)"', html).group(1).replace("&amp;", "&")
+    html = client.get(link).get_data(as_text=True)
+    assert "Cliente 00" in html and "q=Cliente" in link
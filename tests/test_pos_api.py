@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from petmaison.extensions import db
+from petmaison.models import Sale, SaleItem
+
+from .conftest import make_product
+
+
+def test_cart_lifecycle_keeps_incremental_totals(app, client):
+    a = make_product("A", price_gross=Decimal("1190"))
+    b = make_product("B", price_gross=Decimal("595"))
+
+    resp = client.post("/api/pos/carts", json={"lines": [{"product_id": a.id, "qty": 2}]})
+    assert resp.status_code == 201
+    cart = resp.get_json()
+    sid = cart["id"]
+    assert (cart["subtotal_net"], cart["total"]) == ("2000.00", "2380.00")
+
+    cart = client.post(
+        f"/api/pos/carts/{sid}/lines",
+        json={"lines": [{"product_id": b.id, "qty": 3}, {"product_id": a.id, "unit_price_net": "900", "discount": "100"}]},
+    ).get_json()
+    assert [(i["product_name"], i["qty"]) for i in cart["items"]] == [
+        ("Producto A", 2), ("Producto B", 3), ("Producto A", 1)
+    ]
+    assert cart["subtotal_net"] == "4300.00"
+
+    first, second, third = (i["id"] for i in cart["items"])
+    client.patch(f"/api/pos/carts/{sid}/lines/{second}", json={"qty": 1})
+    client.delete(f"/api/pos/carts/{sid}/lines/{third}")
+    resp = client.put(f"/api/pos/carts/{sid}/discount", json={"discount": "2500.01"})
+    assert resp.status_code == 422
+    cart = client.put(f"/api/pos/carts/{sid}/discount", json={"discount": "500"}).get_json()
+    assert (cart["subtotal_net"], cart["discount"], cart["vat"], cart["total"]) == (
+        "2500.00", "500.00", "380.00", "2380.00"
+    )
+
+    # Los totales incrementales coinciden con re-agregar las líneas
+    net = db.session.execute(
+        db.select(db.func.sum(SaleItem.qty * SaleItem.unit_price_net - SaleItem.discount)).filter_by(sale_id=sid)
+    ).scalar()
+    assert Decimal(net) == Decimal(cart["subtotal_net"])
+
+
+def test_cart_errors(app, client, user):
+    resp = client.post("/api/pos/carts", json={"lines": [{"product_id": 999}]})
+    assert resp.status_code == 422
+    s = Sale(user_id=user.id, payment_method="EFECTIVO", status="CONFIRMED")
+    db.session.add(s)
+    db.session.commit()
+    p = make_product("C")
+    resp = client.post(f"/api/pos/carts/{s.id}/lines", json={"lines": [{"product_id": p.id}]})
+    assert resp.status_code == 409
+    assert client.get("/api/pos/carts/12345").status_code == 404
+    client.get("/logout")
+    assert client.get(f"/api/pos/carts/{s.id}").status_code == 401
+
+
+def test_html_pos_defaults_to_list_price(app, client):
+    p = make_product("D", price_gross=Decimal("1190"))
+    resp = client.post("/sales/pos", data={"product_id": p.id, "qty": 2})
+    sale = db.session.execute(db.select(Sale)).scalar_one()
+    assert resp.status_code == 302 and sale.subtotal_net == Decimal("2000")
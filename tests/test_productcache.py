@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+
+import pytest
+
+from petmaison import productcache
+from petmaison.extensions import db
+from petmaison.models import Product, SaleItem
+
+from .conftest import make_product
+
+
+@pytest.fixture()
+def cache(app, monkeypatch):
+    monkeypatch.setitem(app.config, "PRODUCT_CACHE", True)
+    monkeypatch.setitem(app.config, "PRODUCT_CACHE_REFRESH_SECONDS", 0)
+    app.extensions.pop("product_cache", None)
+    yield
+    app.extensions.pop("product_cache", None)
+
+
+def test_lookups_by_id_sku_and_prefix(app, cache):
+    a = make_product("7801-AB", price_gross=Decimal("2990"), brand="Acme")
+    make_product("7801-AC", active=False)
+    make_product("7802-ZZ")
+    snap = productcache.get_snapshot()
+
+    row = snap.get(a.id)
+    assert (row.sku, row.price_gross, row.brand, row.stock) == ("7801-AB", Decimal("2990.00"), "Acme", 10)
+    assert snap.by_sku("7802-ZZ").name == "Producto 7802-ZZ"
+    assert snap.by_sku("7802") is None and snap.get(999) is None
+    assert [p.sku for p in snap.sku_prefix("7801")] == ["7801-AB"]  # los inactivos no se sugieren
+
+
+def test_refresh_applies_changes_in_place_and_rebuilds_on_new_or_deleted(app, cache):
+    a, b = make_product("A"), make_product("B")
+    snap = productcache.get_snapshot()
+
+    db.session.get(Product, a.id).price_gross = Decimal("5000")
+    db.session.commit()
+    assert productcache.get_snapshot() is snap
+    assert snap.get(a.id).price_gross == Decimal("5000.00")
+
+    c = make_product("C")
+    snap = productcache.get_snapshot()
+    assert snap.by_sku("C").id == c.id and len(snap) == 3
+
+    db.session.delete(db.session.get(Product, b.id))
+    db.session.commit()
+    assert productcache.get_snapshot().get(b.id) is None
+
+
+def test_api_pages_match_the_database(app, client, cache, monkeypatch):
+    for i in range(7):
+        make_product(f"P{i}", category="Arena" if i % 2 else "Snacks", active=i != 3)
+
+    def walk(query):
+        pages, cursor = [], None
+        while True:
+            resp = client.get("/api/products", query_string=dict(query, limit=2, cursor=cursor or ""))
+            pages.append([p["sku"] for p in resp.get_json()])
+            cursor = json.loads(resp.headers["X-Pagination"])["next"]
+            if not cursor:
+                return pages
+
+    for query in ({}, {"category": "Arena"}, {"active": "true"}):
+        cached = walk(query)
+        monkeypatch.setitem(app.config, "PRODUCT_CACHE", False)
+        assert walk(query) == cached
+        monkeypatch.setitem(app.config, "PRODUCT_CACHE", True)
+
+
+def test_pos_adds_by_sku_and_suggests_prefixes(app, client, cache):
+    p = make_product("7801234567890", price_gross=Decimal("1190"))
+
+    assert client.get("/sales/pos/lookup?q=78012").get_json()[0]["sku"] == "7801234567890"
+    client.post("/sales/pos", data={"product_id": "7801234567890", "qty": "2"})
+
+    item = db.session.execute(db.select(SaleItem)).scalar_one()
+    assert (item.product_id, item.qty, item.unit_price_net) == (p.id, 2, Decimal("1000.00"))
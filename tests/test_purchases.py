@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from petmaison.extensions import db
+from petmaison.models import Product, Purchase, PurchaseItem, StockMovement, Supplier
+
+from .conftest import make_product
+
+
+def test_confirm_purchase_aggregates_stock_and_keeps_line_costs(app, client):
+    a, b = make_product("A", stock=1), make_product("B", stock=0)
+    sup = Supplier(name="Prov")
+    db.session.add(sup)
+    db.session.flush()
+    p = Purchase(supplier_id=sup.id)
+    db.session.add(p)
+    db.session.flush()
+    for product, qty, cost in [(a, 2, "100"), (b, 5, "50"), (a, 3, "120")]:
+        db.session.add(
+            PurchaseItem(purchase_id=p.id, product_id=product.id, qty=qty, unit_cost_net=Decimal(cost), line_total=0)
+        )
+    db.session.commit()
+
+    assert client.post(f"/purchases/{p.id}/confirm").status_code == 302
+    client.post(f"/purchases/{p.id}/confirm")
+
+    assert db.session.get(Product, a.id).stock == 6
+    assert db.session.get(Product, b.id).stock == 5
+    moves = db.session.execute(
+        db.select(StockMovement.product_id, StockMovement.qty, StockMovement.unit_cost_net).order_by(StockMovement.id)
+    ).all()
+    assert moves == [(a.id, 2, Decimal("100")), (b.id, 5, Decimal("50")), (a.id, 3, Decimal("120"))]
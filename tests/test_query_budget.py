@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+
+from petmaison.extensions import db
+from petmaison.models import Customer, Order, Sale, SaleItem
+from petmaison.querybudget import QueryBudgetExceeded
+
+from .conftest import make_product
+
+
+@pytest.fixture()
+def sales(app, user):
+    customers = [Customer(name=f"Cliente {i}") for i in range(5)]
+    db.session.add_all(customers)
+    db.session.flush()
+    products = [make_product(f"Q{i}") for i in range(5)]
+    sale = None
+    for c in customers:
+        sale = Sale(user_id=user.id, customer_id=c.id, payment_method="EFECTIVO")
+        db.session.add(sale)
+        db.session.add(Order(customer_id=c.id, address="Calle 1"))
+        db.session.flush()
+        for p in products:
+            db.session.add(SaleItem(sale_id=sale.id, product_id=p.id, qty=1, unit_price_net=Decimal("1"), line_total=0))
+    db.session.commit()
+    return sale
+
+
+def test_list_and_pos_views_stay_within_budget(client, sales):
+    for url in ("/sales", "/orders", "/customers", "/products", f"/sales/pos?sale_id={sales.id}", "/"):
+        assert client.get(url).status_code == 200, url
+    html = client.get("/sales").get_data(as_text=True)
+    assert "Cliente 4" in html and "Test" in html
+    assert "Producto Q3" in client.get(f"/sales/pos?sale_id={sales.id}").get_data(as_text=True)
+
+
+def test_lazy_load_regression_fails(client, sales, monkeypatch):
+    monkeypatch.setattr(db, "joinedload", lambda *a, **kw: db.lazyload(*a, **kw))
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/orders")
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from petmaison.extensions import db
+from petmaison.models import Product, User
+from petmaison.replicas import ReplicaSet
+
+from .conftest import make_product
+
+
+def _replica(tmp_path, name="replica.db") -> sa.Engine:
+    # Otro archivo SQLite con los mismos usuarios y un catálogo distinto.
+    engine = sa.create_engine(f"sqlite:///{tmp_path / name}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [dict(r) for r in db.session.execute(sa.select(User.__table__)).mappings()])
+        conn.execute(
+            Product.__table__.insert(),
+            [{"sku": "REPLICA", "name": "En réplica", "cost_net": 1, "price_gross": 1, "stock": 1, "min_stock": 0}],
+        )
+    return engine
+
+
+def _skus(client) -> list[str]:
+    return [p["sku"] for p in client.get("/api/products").get_json()]
+
+
+def test_reads_go_to_replica_until_the_user_writes(app, client, tmp_path, monkeypatch):
+    make_product("PRIMARIO")
+    replicas = ReplicaSet({"replica1": _replica(tmp_path)}, check_seconds=5, max_lag=10)
+    monkeypatch.setitem(app.extensions, "replicas", replicas)
+
+    assert _skus(client) == ["REPLICA"]
+    assert client.get("/").status_code == 200
+    assert replicas.status()[0]["ok"] is True
+
+    # Leer lo propio: tras escribir, el usuario lee del primario.
+    assert client.post("/api/pos/carts", json={}).status_code == 201
+    assert _skus(client) == ["PRIMARIO"]
+    assert _skus(app.test_client()) == ["REPLICA"]
+
+
+def test_falls_back_to_primary_when_replicas_are_down_or_lagging(app, client, tmp_path, monkeypatch):
+    make_product("PRIMARIO")
+    down = sa.create_engine(f"sqlite:///{tmp_path / 'no-existe' / 'replica.db'}")
+    monkeypatch.setitem(app.extensions, "replicas", ReplicaSet({"replica1": down}, check_seconds=5, max_lag=10))
+    assert _skus(client) == ["PRIMARIO"]
+    assert app.extensions["replicas"].status()[0]["error"]
+
+    lagging = ReplicaSet({"replica1": _replica(tmp_path)}, check_seconds=5, max_lag=-1)
+    monkeypatch.setitem(app.extensions, "replicas", lagging)
+    assert _skus(client) == ["PRIMARIO"]
+    assert lagging.status()[0]["lag_seconds"] == 0
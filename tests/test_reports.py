@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from petmaison import reorder, rollups
+from petmaison.blueprints.reports import views as reports
+from petmaison.extensions import db
+from petmaison.models import Product, Purchase, PurchaseItem, Sale, SalesDailyRollup, SalesPeriodTotal, Supplier
+
+from .conftest import make_product
+
+
+def test_sales_csv_streams_in_chunks(app, client, user, monkeypatch):
+    monkeypatch.setattr(reports, "CSV_CHUNK_SIZE", 2)
+    for i in range(5):
+        db.session.add(
+            Sale(
+                user_id=user.id,
+                status="CONFIRMED",
+                payment_method="EFECTIVO",
+                date=datetime(2025, 1, i + 1),
+                total=Decimal("100") * (i + 1),
+            )
+        )
+    db.session.add(Sale(user_id=user.id, status="DRAFT", payment_method="EFECTIVO", total=Decimal("1")))
+    db.session.commit()
+
+    resp = client.get("/reports/sales.csv?from=2025-01-02")
+    assert resp.is_streamed
+    lines = resp.get_data(as_text=True).splitlines()
+    assert lines[0] == "id,fecha,cliente_id,total"
+    assert lines[1:] == [f"{i + 1},2025-01-0{i + 1},,{100 * (i + 1)}.00" for i in range(1, 5)]
+
+
+def test_inventory_csv_header_only_when_empty(app, client):
+    resp = client.get("/reports/inventory.csv")
+    assert resp.get_data(as_text=True).splitlines() == ["sku,nombre,stock,min_stock,precio_bruto"]
+    make_product("A1", stock=3)
+    resp = client.get("/reports/inventory.csv")
+    assert resp.get_data(as_text=True).splitlines()[1] == "A1,Producto A1,3,0,1190.00"
+
+
+def _confirmed(user, when, total):
+    db.session.add(
+        Sale(user_id=user.id, status="CONFIRMED", payment_method="EFECTIVO", date=when, total=Decimal(total))
+    )
+
+
+def test_sales_report_buckets_and_reads_period_totals(app, client, user):
+    _confirmed(user, datetime(2025, 1, 5, 10), "100")  # domingo, semana 2025-W01
+    _confirmed(user, datetime(2025, 1, 6, 9), "50")
+    _confirmed(user, datetime(2025, 3, 31, 23), "25")
+    db.session.commit()
+
+    resp = client.get("/api/reports/sales?from=2025-01-01&to=2025-03-31&groupBy=week")
+    assert resp.json == [
+        {"period": "2025-W01", "total": "100.00"},
+        {"period": "2025-W02", "total": "50.00"},
+        {"period": "2025-W14", "total": "25.00"},
+    ]
+    resp = client.get("/api/reports/sales?from=2025-01-01&to=2025-12-31&groupBy=month")
+    assert [r["period"] for r in resp.json] == ["2025-01", "2025-03"]
+    assert client.get("/api/reports/sales?from=2025-01-01&to=2025-01-31&groupBy=year").json == [
+        {"period": "2025", "total": "150.00"}
+    ]
+    # Leer no escribe nada: los totales por período los arma el rollup.
+    assert db.session.execute(db.select(db.func.count()).select_from(SalesPeriodTotal)).scalar() == 0
+
+    rollups.rebuild()
+    jan = db.session.get(SalesPeriodTotal, ("month", date(2025, 1, 1)))
+    assert jan.total == Decimal("150.00")
+
+    # Una venta con fecha pasada suma al período al confirmarse, en la misma transacción.
+    late = Sale(user_id=user.id, payment_method="EFECTIVO", date=datetime(2025, 1, 7), total=Decimal("1"))
+    db.session.add(late)
+    db.session.commit()
+    client.post(f"/sales/{late.id}/confirm")
+    resp = client.get("/api/reports/sales?from=2025-01-01&to=2025-01-31&groupBy=month")
+    assert resp.json == [{"period": "2025-01", "total": "151.00"}]
+    assert db.session.get(SalesPeriodTotal, ("year", date(2025, 1, 1))).total == Decimal("176.00")
+
+    assert client.get("/api/reports/sales?from=2025-01-01&to=2025-01-31&groupBy=hour").status_code == 422
+
+
+def test_reorder_alerts_group_by_last_supplier_with_velocity(app, client, user):
+    old, new = Supplier(name="Antiguo"), Supplier(name="Distribuidora Sur")
+    db.session.add_all([old, new])
+    fast = make_product("FAST", stock=3, min_stock=5)
+    make_product("IDLE", stock=0, min_stock=0)
+    make_product("OK", stock=50, min_stock=5)
+    make_product("OFF", stock=0, min_stock=5, active=False)
+    for supplier, cost, days_ago in ((old, 900, 60), (new, 1000, 10)):
+        p = Purchase(supplier_id=supplier.id, status="CONFIRMED", date=datetime.utcnow() - timedelta(days=days_ago))
+        db.session.add(p)
+        db.session.flush()
+        db.session.add(PurchaseItem(purchase_id=p.id, product_id=fast.id, qty=10, unit_cost_net=cost, line_total=0))
+    db.session.add(SalesDailyRollup(day=date.today() - timedelta(days=3), product_id=fast.id, units=28))
+    db.session.commit()
+
+    groups = client.get("/api/inventory/reorder?velocityDays=28&coverDays=10").get_json()
+
+    assert [g["supplier_name"] for g in groups] == ["Distribuidora Sur", "Sin proveedor"]
+    (item,) = groups[0]["items"]
+    # 1/día * 10 días + mínimo 5 - stock 3
+    assert (item["sku"], item["daily_velocity"], item["suggested_qty"], item["last_cost_net"]) == (
+        "FAST", 1.0, 12, "1000.00"
+    )
+    assert groups[0]["estimated_cost_net"] == "12000.00"
+    assert [i["sku"] for i in groups[1]["items"]] == ["IDLE"]
+
+    # Una compra que repone saca al producto del índice parcial
+    db.session.execute(db.update(Product).where(Product.id == fast.id).values(stock=40))
+    db.session.commit()
+    assert [it.sku for g in reorder.low_stock() for it in g.items] == ["IDLE"]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+
+from petmaison import respcache
+from petmaison.extensions import db
+from petmaison.models import Purchase, PurchaseItem, Supplier
+
+from .conftest import make_product
+
+
+@pytest.fixture()
+def cache(app, monkeypatch):
+    backend = respcache.MemoryCache(maxsize=16, ttl=60)
+    monkeypatch.setitem(app.extensions, "respcache", backend)
+    return backend
+
+
+def test_products_api_cached_until_invalidated(app, client, cache):
+    make_product("A1")
+    first = client.get("/api/products")
+    assert [p["sku"] for p in first.json] == ["A1"]
+    assert first.headers["ETag"]
+
+    make_product("B2")  # escritura directa, sin hook: sigue la respuesta cacheada
+    assert client.get("/api/products").get_data() == first.get_data()
+    assert client.get("/api/products?limit=5").json[0]["sku"] == "B2"  # otros args, otra clave
+
+    notmod = client.get("/api/products", headers={"If-None-Match": first.headers["ETag"]})
+    assert notmod.status_code == 304
+    assert notmod.get_data() == b""
+
+    client.post(f"/products/{first.json[0]['id']}/edit", data={"name": "Nuevo", "price_gross": "1190"})
+    fresh = client.get("/api/products")
+    assert {p["sku"] for p in fresh.json} == {"A1", "B2"}
+    assert fresh.headers["ETag"] != first.headers["ETag"]
+
+
+def test_streamed_csv_cached_and_purchase_confirm_invalidates(app, client, cache):
+    p = make_product("A1", stock=3)
+    assert client.get("/reports/inventory.csv").get_data(as_text=True).splitlines()[1].startswith("A1,Producto A1,3,")
+    cached = client.get("/reports/inventory.csv")
+    assert cached.headers["ETag"] and cached.content_length  # réplica desde caché, no stream
+    assert cached.headers["Content-Disposition"] == "attachment;filename=inventario.csv"
+
+    sup = Supplier(name="Prov")
+    db.session.add(sup)
+    db.session.flush()
+    purchase = Purchase(supplier_id=sup.id)
+    db.session.add(purchase)
+    db.session.flush()
+    db.session.add(
+        PurchaseItem(purchase_id=purchase.id, product_id=p.id, qty=2, unit_cost_net=Decimal("1000"), line_total=0)
+    )
+    db.session.commit()
+    client.post(f"/purchases/{purchase.id}/confirm")
+    assert client.get("/reports/inventory.csv").get_data(as_text=True).splitlines()[1].startswith("A1,Producto A1,5,")
+
+
+def test_memory_cache_lru_and_ttl(monkeypatch):
+    c = respcache.MemoryCache(maxsize=2, ttl=10)
+    entry = respcache.CachedResponse(b"x", 200, [], "e")
+    c.set("a", entry)
+    c.set("b", entry)
+    c.get("a")
+    c.set("c", entry)
+    assert c.get("b") is None and c.get("a") is entry
+    now = respcache.time.monotonic()
+    monkeypatch.setattr(respcache.time, "monotonic", lambda: now + 11)
+    assert c.get("a") is None
+
+
+def test_pending_flash_bypasses_cached_dashboard(app, client, cache):
+    first = client.get("/").get_data(as_text=True)
+    with client.session_transaction() as sess:
+        sess["_flashes"] = [("success", "Aviso único")]
+
+    assert "Aviso único" in client.get("/").get_data(as_text=True)  # se muestra y se consume
+    again = client.get("/").get_data(as_text=True)
+    assert "Aviso único" not in again
+    assert again == first
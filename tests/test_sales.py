@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from petmaison.extensions import db
+from petmaison.models import Product, Sale, SaleItem, StockMovement
+
+from .conftest import make_product
+
+
+def _draft(user, lines):
+    s = Sale(user_id=user.id, payment_method="EFECTIVO")
+    db.session.add(s)
+    db.session.flush()
+    for product, qty in lines:
+        db.session.add(
+            SaleItem(sale_id=s.id, product_id=product.id, qty=qty, unit_price_net=Decimal("1000"), line_total=0)
+        )
+    db.session.commit()
+    return s
+
+
+def test_confirm_sale_decrements_stock_once_per_product(app, client, user):
+    a, b = make_product("A", stock=5), make_product("B", stock=2)
+    s = _draft(user, [(a, 2), (b, 2), (a, 1)])
+
+    client.post(f"/sales/{s.id}/confirm")
+    client.post(f"/sales/{s.id}/confirm")
+
+    assert db.session.get(Product, a.id).stock == 2
+    assert db.session.get(Product, b.id).stock == 0
+    moves = db.session.execute(db.select(StockMovement.product_id, StockMovement.qty)).all()
+    assert sorted(moves) == [(a.id, 3), (b.id, 2)]
+    assert db.session.get(Sale, s.id).status == "CONFIRMED"
+
+
+def test_confirm_sale_insufficient_stock_leaves_nothing_applied(app, client, user):
+    a, b = make_product("A", stock=5), make_product("B", stock=1)
+    s = _draft(user, [(a, 2), (b, 2)])
+
+    resp = client.post(f"/sales/{s.id}/confirm", follow_redirects=True)
+
+    assert "Stock insuficiente para Producto B" in resp.get_data(as_text=True)
+    assert db.session.get(Product, a.id).stock == 5
+    assert db.session.get(Sale, s.id).status == "DRAFT"
+    assert db.session.execute(db.select(db.func.count(StockMovement.id))).scalar() == 0
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from petmaison.extensions import db
+from petmaison.models import Product
+from petmaison.search import search_products
+
+from .conftest import make_product
+
+
+def _search(term):
+    return [p.sku for p in db.session.execute(search_products(db.select(Product), term)).scalars()]
+
+
+def test_sku_prefix_ranks_first_and_index_follows_updates(app):
+    make_product("CAT-100", name="Alimento gato adulto")
+    make_product("DOG-200", name="Alimento perro cachorro")
+    make_product("ARENA-1", name="Arena sanitaria para gatos")
+
+    assert _search("alim") == ["CAT-100", "DOG-200"]
+    assert _search("cat")[0] == "CAT-100"
+    assert _search("perro cach") == ["DOG-200"]
+
+    p = db.session.execute(db.select(Product).filter_by(sku="DOG-200")).scalar_one()
+    p.name = "Snack perro"
+    db.session.commit()
+    assert _search("alimento") == ["CAT-100"]
+    db.session.delete(p)
+    db.session.commit()
+    assert _search("snack") == []
+
+
+def test_api_products_search(app, client):
+    make_product("SKU-1", name="Collar rojo")
+    make_product("SKU-2", name="Correa roja")
+    data = client.get("/api/products?search=roja").get_json()
+    assert [d["sku"] for d in data] == ["SKU-2"]
+    html = client.get("/products?q=sku-").get_data(as_text=True)
+    assert "Collar rojo" in html and "Correa roja" in html
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+
+from petmaison import synth
+from petmaison.extensions import db
+from petmaison.models import Product, Sale, SalesDailyTotal, StockMovement
+
+
+def test_scale_seed_is_consistent_and_refuses_non_empty_db(app):
+    counts = synth.generate(400, days=60, seed=7, batch_size=500)
+    assert 350 < counts["sales"] <= 400
+    assert counts["stock_movements"] == counts["sale_items"] + counts["purchase_items"]
+
+    signed = db.case((StockMovement.type == "IN", StockMovement.qty), else_=-StockMovement.qty)
+    moved = dict(
+        db.session.execute(
+            db.select(StockMovement.product_id, db.func.sum(signed)).group_by(StockMovement.product_id)
+        ).all()
+    )
+    for pid, stock in db.session.execute(db.select(Product.id, Product.stock)):
+        assert stock == moved.get(pid, 0) >= 0
+
+    sales_total = db.session.execute(db.select(db.func.sum(Sale.total))).scalar()
+    assert db.session.execute(db.select(db.func.sum(SalesDailyTotal.total))).scalar() == sales_total
+
+    with pytest.raises(synth.SynthError):
+        synth.generate(10)
+
+
+def test_seed_command_loads_demo_data(app):
+    result = app.test_cli_runner().invoke(args=["seed"])
+    assert result.exception is None, result.output
+    assert "Seed completado." in result.output
+    assert db.session.execute(db.select(db.func.count(Sale.id))).scalar() == 10